@@ -0,0 +1,273 @@
+"""Deterministic REDCap-like datasets for the benchmarks: an export with hhid and
+redcap_event_name, coded columns and free text (other) columns with the skew of real answers
+(a few common answers with typos and case/whitespace variants, junk entries and a long tail of
+one off answers), the lookup dictionary of the free text columns and a filled out suggestions
+sheet.
+
+Write a dataset with: python -m benchmarks.redcap_data 100000 ./redcap_100k
+"""
+
+import json
+import string
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import click
+import numpy as np
+import pandas as pd
+
+from research_workflow_tools.other_entry_handler import build_human_entry_df
+
+EVENT_NAMES = [
+    "baseline_arm_1",
+    "visit_1_arm_1",
+    "visit_2_arm_1",
+    "visit_3_arm_1",
+]
+
+COMMON_ANSWERS = [
+    "farmer",
+    "trader",
+    "teacher",
+    "fisherman",
+    "tailor",
+    "carpenter",
+    "mason",
+    "driver",
+    "shop keeper",
+    "casual labourer",
+    "health worker",
+    "student",
+    "housewife",
+    "retired",
+    "unemployed",
+]
+
+JUNK_ANSWERS = ["n/a", "NA", "-", ".", "none", "dont know", "99", "x"]
+
+# The share of the free text cells that are filled in
+FILLED_SHARE = 0.25
+
+# The share of the filled in cells with a one off answer (the long tail of unique values)
+ONE_OFF_SHARE = 0.05
+
+
+def _answer_variants(
+    answer: str, rng: np.random.Generator, typo_count: int = 8
+) -> List[str]:
+    # The ways the enumerators type the same answer
+    variants = [answer, answer.upper(), answer.title(), f" {answer}", f"{answer}  "]
+    for _ in range(typo_count):
+        letters = list(answer)
+        position = int(rng.integers(len(letters)))
+        if rng.random() < 0.5:
+            letters[position] = str(rng.choice(list(string.ascii_lowercase)))
+        else:
+            del letters[position]
+        variants.append("".join(letters))
+    return list(dict.fromkeys(variants))
+
+
+def column_vocabulary(
+    column_position: int, seed: int = 0
+) -> Tuple[List[str], List[Optional[str]]]:
+    """Gets the answers of a free text column (most common first) and the common answer each of
+    them is a variant of (None for the junk answers)
+
+    Args:
+        column_position (int): The position of the free text column
+        seed (int, optional): The seed of the dataset. Defaults to 0.
+
+    Returns:
+        Tuple[List[str], List[Optional[str]]]: The answers and their common answers
+    """
+    rng = np.random.default_rng([seed, column_position])
+    answers = []
+    common_answers = []
+    for answer in rng.permutation(COMMON_ANSWERS):
+        for variant in _answer_variants(str(answer), rng):
+            if variant not in answers:
+                answers.append(variant)
+                common_answers.append(str(answer))
+    for junk in JUNK_ANSWERS:
+        if junk not in answers:
+            answers.append(junk)
+            common_answers.append(None)
+    return answers, common_answers
+
+
+def free_text_column_name(column_position: int) -> str:
+    return f"q{column_position}_other"
+
+
+def generate_redcap_dataset(
+    row_count: int, free_text_column_count: int = 20, seed: int = 0
+) -> pd.DataFrame:
+    """Generates a REDCap-like export, the same arguments always give the same dataset
+
+    Args:
+        row_count (int): The number of rows (a row per household and event)
+        free_text_column_count (int, optional): The number of free text columns. Defaults to 20.
+        seed (int, optional): The seed of the dataset. Defaults to 0.
+
+    Returns:
+        pd.DataFrame: The dataset
+    """
+    rng = np.random.default_rng(seed)
+    rows = np.arange(row_count)
+    columns: Dict[str, Any] = {
+        "hhid": rows // len(EVENT_NAMES) + 1,
+        "redcap_event_name": np.array(EVENT_NAMES, dtype=object)[
+            rows % len(EVENT_NAMES)
+        ],
+    }
+
+    for column_position in range(free_text_column_count):
+        # The coded question the free text column is the "other" answer of
+        columns[f"q{column_position}"] = rng.integers(1, 10, row_count)
+
+        answers, _ = column_vocabulary(column_position, seed)
+        # Zipf-like skew, a few answers make up most of the column
+        weights = 1.0 / np.arange(1, len(answers) + 1) ** 1.2
+        values = np.array(answers, dtype=object)[
+            rng.choice(len(answers), row_count, p=weights / weights.sum())
+        ]
+
+        is_one_off = rng.random(row_count) < ONE_OFF_SHARE
+        values[is_one_off] = [
+            f"other {column_position}-{row}" for row in rows[is_one_off]
+        ]
+        values[rng.random(row_count) >= FILLED_SHARE] = None
+        columns[free_text_column_name(column_position)] = values
+
+    return pd.DataFrame(columns)
+
+
+def generate_lookup_dictionary(
+    free_text_column_count: int = 20,
+) -> Dict[str, Dict[str, int]]:
+    """Generates the lookup dictionary of the free text columns, a code per common answer
+
+    Args:
+        free_text_column_count (int, optional): The number of free text columns. Defaults to 20.
+
+    Returns:
+        Dict[str, Dict[str, int]]: The lookup dictionary ({column name: {label: code}})
+    """
+    return {
+        free_text_column_name(column_position): {
+            answer: code for code, answer in enumerate(COMMON_ANSWERS, start=1)
+        }
+        for column_position in range(free_text_column_count)
+    }
+
+
+def generate_suggestions_sheet(
+    data_frame: pd.DataFrame, free_text_column_count: int = 20, seed: int = 0
+) -> pd.DataFrame:
+    """Generates the suggestions sheet of a dataset the way a curator fills it out: the
+    variants of the common answers are replaced by their code, the junk answers are deleted and
+    the one off answers are left as they are
+
+    Args:
+        data_frame (pd.DataFrame): The dataset (see generate_redcap_dataset)
+        free_text_column_count (int, optional): The number of free text columns. Defaults to 20.
+        seed (int, optional): The seed of the dataset. Defaults to 0.
+
+    Returns:
+        pd.DataFrame: The filled out suggestions sheet
+    """
+    codes = {answer: code for code, answer in enumerate(COMMON_ANSWERS, start=1)}
+    human_entry_column_values = {}
+    decisions: Dict[str, Dict[str, Optional[str]]] = {}
+    for column_position in range(free_text_column_count):
+        col = free_text_column_name(column_position)
+        human_entry_column_values[col] = (
+            data_frame[col].dropna().str.strip().unique().tolist()
+        )
+        answers, common_answers = column_vocabulary(column_position, seed)
+        decisions[col] = {
+            answer.strip(): common_answer
+            for answer, common_answer in zip(answers, common_answers)
+        }
+
+    human_entry_df = build_human_entry_df(human_entry_column_values)
+    replacement_values = []
+    delete_values = []
+    for col, value in zip(
+        human_entry_df["column_name"], human_entry_df["unique_value"]
+    ):
+        if value not in decisions[col]:
+            replacement_values.append(None)
+            delete_values.append(False)
+        elif decisions[col][value] is None:
+            replacement_values.append(None)
+            delete_values.append(True)
+        else:
+            replacement_values.append(str(codes[decisions[col][value]]))
+            delete_values.append(False)
+    human_entry_df["replacement_value"] = replacement_values
+    human_entry_df["delete_value"] = delete_values
+    return human_entry_df
+
+
+def write_redcap_dataset(
+    output_path: Path,
+    row_count: int,
+    free_text_column_count: int = 20,
+    seed: int = 0,
+) -> Dict[str, Path]:
+    """Writes a dataset (data.tsv), its lookup dictionary (lookup_fields.json), its filled out
+    suggestions sheet (human_entry_suggestions.tsv) and the ignore list (other_ignore_list.txt)
+    of the coded columns
+
+    Args:
+        output_path (Path): The folder of the files
+        row_count (int): The number of rows of the dataset
+        free_text_column_count (int, optional): The number of free text columns. Defaults to 20.
+        seed (int, optional): The seed of the dataset. Defaults to 0.
+
+    Returns:
+        Dict[str, Path]: The paths of the data, lookup_fields, suggestions and ignore_list files
+    """
+    output_path.mkdir(parents=True, exist_ok=True)
+    paths = {
+        "data": output_path / "data.tsv",
+        "lookup_fields": output_path / "lookup_fields.json",
+        "suggestions": output_path / "human_entry_suggestions.tsv",
+        "ignore_list": output_path / "other_ignore_list.txt",
+    }
+
+    data_frame = generate_redcap_dataset(row_count, free_text_column_count, seed)
+    data_frame.to_csv(paths["data"], sep="\t", index=False)
+    with open(paths["lookup_fields"], "w") as file_ptr:
+        json.dump(
+            generate_lookup_dictionary(free_text_column_count), file_ptr, indent=4
+        )
+    generate_suggestions_sheet(data_frame, free_text_column_count, seed).to_csv(
+        paths["suggestions"], sep="\t", index=False
+    )
+    paths["ignore_list"].write_text(
+        "\n".join(
+            ["hhid", "redcap_event_name"]
+            + [f"q{position}" for position in range(free_text_column_count)]
+        )
+        + "\n"
+    )
+    return paths
+
+
+@click.command()
+@click.argument("row_count", type=click.IntRange(min=1))
+@click.argument("output_path", type=click.Path(file_okay=False, path_type=Path))
+@click.option("--free-text-columns", type=click.IntRange(min=1), default=20)
+@click.option("--seed", type=int, default=0)
+def main(row_count: int, output_path: Path, free_text_columns: int, seed: int):
+    for name, path in write_redcap_dataset(
+        output_path, row_count, free_text_columns, seed
+    ).items():
+        click.echo(f"{name}: {path}")
+
+
+if __name__ == "__main__":
+    main()
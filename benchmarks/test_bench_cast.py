@@ -0,0 +1,49 @@
+"""Benchmarks for casting the suggestion values, per cell (cast_value) and per column
+(cast_series)
+
+Run with: pytest benchmarks/test_bench_cast.py
+"""
+
+import random
+
+import pandas as pd
+import pytest
+
+from research_workflow_tools.utils import cast_series, cast_value
+
+VALUE_COUNT = 1_000_000
+
+
+def generate_suggestion_values(value_count: int, distinct_count: int):
+    # Codes, decimals, flags and free text like the replacement_value column
+    rng = random.Random(0)
+    distinct_values = []
+    for index in range(distinct_count):
+        kind = index % 4
+        if kind == 0:
+            distinct_values.append(str(index))
+        elif kind == 1:
+            distinct_values.append(f"{index / 7:.3f}")
+        elif kind == 2:
+            distinct_values.append(rng.choice(["true", "False", "TRUE"]))
+        else:
+            distinct_values.append(f"other {index}")
+    return pd.Series(rng.choices(distinct_values, k=value_count), dtype=object)
+
+
+@pytest.mark.parametrize("distinct_count", [100, VALUE_COUNT])
+def test_bench_cast_value(benchmark, distinct_count):
+    values = generate_suggestion_values(VALUE_COUNT, distinct_count).tolist()
+
+    casted_values = benchmark.pedantic(
+        lambda: [cast_value(value) for value in values], rounds=1
+    )
+    assert len(casted_values) == VALUE_COUNT
+
+
+@pytest.mark.parametrize("distinct_count", [100, VALUE_COUNT])
+def test_bench_cast_series(benchmark, distinct_count):
+    values = generate_suggestion_values(VALUE_COUNT, distinct_count)
+
+    casted_values = benchmark.pedantic(cast_series, args=(values,), rounds=1)
+    assert casted_values.tolist() == [cast_value(value) for value in values]
@@ -0,0 +1,57 @@
+"""Benchmarks for reading the xlsx suggestions sheets returned by the curators
+
+Run with: pytest benchmarks/test_bench_excel.py
+"""
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from research_workflow_tools.loaders import load_human_entry_file
+from research_workflow_tools.other_entry_handler import build_human_entry_df
+from research_workflow_tools.workbook import write_suggestions_workbook
+
+ROW_COUNTS = [10_000, 100_000]
+
+
+@pytest.fixture(scope="module", params=ROW_COUNTS)
+def suggestions_workbook(request, tmp_path_factory) -> Path:
+    row_count = request.param
+    values = [f"other entry {index}" for index in range(row_count)]
+    column_values = {f"q{column}_other": values[column::10] for column in range(10)}
+    human_entry_df = build_human_entry_df(
+        column_values,
+        suggested_values={col: list(values) for col, values in column_values.items()},
+        occurrence_counts={
+            col: {value: 1 for value in values} for col, values in column_values.items()
+        },
+        source_files={
+            col: [["site_a.csv", "site_b.csv"]] * len(values)
+            for col, values in column_values.items()
+        },
+    )
+    # The curators fill out some of the rows
+    human_entry_df.loc[::5, "replacement_value"] = "1"
+    human_entry_df.loc[::7, "delete_value"] = True
+
+    workbook_path = tmp_path_factory.mktemp("excel") / f"suggestions_{row_count}.xlsx"
+    return write_suggestions_workbook(human_entry_df, workbook_path)
+
+
+def test_bench_read_excel(benchmark, suggestions_workbook: Path):
+    # The previous loader: pandas with the default engine, all the columns
+    human_entry_df = benchmark.pedantic(
+        pd.read_excel, args=(suggestions_workbook,), rounds=1
+    )
+
+    assert "column_name" in human_entry_df.columns
+
+
+def test_bench_load_human_entry_file(benchmark, suggestions_workbook: Path):
+    human_entry_df = benchmark.pedantic(
+        load_human_entry_file, args=(suggestions_workbook,), rounds=1
+    )
+
+    assert "column_name" in human_entry_df.columns
+    assert "source_files" not in human_entry_df.columns
@@ -0,0 +1,167 @@
+"""Benchmarks for the whole workflow on REDCap-like datasets (see redcap_data): generating the
+suggestions workbook and processing the filled out suggestions sheet, a phase at a time.
+
+Every phase runs in a new process so the peak RSS (extra_info["peak_rss_mb"]) is the memory of
+that phase alone (start_rss_mb is the memory of the imports), the wall time of the phase is in
+extra_info["seconds"]. The 1M row datasets
+are only generated when RWT_BENCH_LARGE is set.
+
+Run with: pytest benchmarks/test_bench_pipeline.py --benchmark-columns=min
+"""
+
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Tuple
+
+import pytest
+
+from benchmarks.redcap_data import write_redcap_dataset
+from research_workflow_tools.aggregation import aggregate_human_entry_values
+from research_workflow_tools.other_entry_handler import (
+    apply_suggestions_sheet,
+    generate_other_entry_workbook,
+    load_suggestions_sheet,
+    process_other_entry_replacements,
+)
+
+ROW_COUNTS = [10_000, 100_000] + (
+    [1_000_000] if os.environ.get("RWT_BENCH_LARGE") else []
+)
+
+
+def _peak_rss_mb() -> float:
+    # VmHWM starts over in the new process, ru_maxrss keeps the peak of the parent process
+    # (before the exec) on Linux so it is only used where there is no /proc
+    try:
+        with open("/proc/self/status", "r") as file_ptr:
+            for line in file_ptr:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 2**10
+    except OSError:
+        pass
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak_rss / (2**20 if sys.platform == "darwin" else 2**10)
+
+
+def _run_phase(
+    function: Callable[..., Any], args: Tuple[Any, ...], kwargs: Dict[str, Any]
+) -> Tuple[float, float, float]:
+    # Runs in the new process, returns the wall time, the peak RSS (MB) before the phase (the
+    # imports) and the peak RSS of the phase
+    start_rss_mb = _peak_rss_mb()
+    start_time = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start_time, start_rss_mb, _peak_rss_mb()
+
+
+def run_phase(benchmark, function: Callable[..., Any], *args, **kwargs):
+    """Benchmarks a phase of the workflow in a new (spawned) process and records its wall time
+    and peak RSS in the extra info of the benchmark"""
+    with ProcessPoolExecutor(
+        max_workers=1, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        seconds, start_rss_mb, peak_rss_mb = benchmark.pedantic(
+            lambda: executor.submit(_run_phase, function, args, kwargs).result(),
+            rounds=1,
+        )
+    benchmark.extra_info["seconds"] = round(seconds, 3)
+    benchmark.extra_info["start_rss_mb"] = round(start_rss_mb, 1)
+    benchmark.extra_info["peak_rss_mb"] = round(peak_rss_mb, 1)
+
+
+@pytest.fixture(scope="module", params=ROW_COUNTS, ids=lambda count: f"{count}_rows")
+def redcap_dataset(request, tmp_path_factory) -> Dict[str, Path]:
+    return write_redcap_dataset(
+        tmp_path_factory.mktemp(f"redcap_{request.param}"), request.param
+    )
+
+
+def _count_values(data_in_path: Path, ignore_list_path: Path, chunksize=None):
+    ignore_list = ignore_list_path.read_text().splitlines()
+    aggregate_human_entry_values([data_in_path], ignore_list, chunksize=chunksize)
+
+
+def _process_replacements(
+    data_in_path: Path, human_suggestions_path: Path, output_path: Path, **kwargs
+):
+    apply_suggestions_sheet(
+        data_in_path,
+        *load_suggestions_sheet(human_suggestions_path),
+        output_path=output_path,
+        diff_path=output_path / "others_diff",
+        **kwargs,
+    )
+
+
+@pytest.mark.parametrize("chunksize", [None, 20_000])
+def test_bench_count_values(benchmark, redcap_dataset, chunksize):
+    run_phase(
+        benchmark,
+        _count_values,
+        redcap_dataset["data"],
+        redcap_dataset["ignore_list"],
+        chunksize=chunksize,
+    )
+
+
+@pytest.mark.parametrize("output_format", ["tsv", "xlsx"])
+def test_bench_generate_other_entry_workbook(
+    benchmark, redcap_dataset, tmp_path, output_format
+):
+    run_phase(
+        benchmark,
+        generate_other_entry_workbook,
+        redcap_dataset["data"],
+        redcap_dataset["ignore_list"],
+        output_path=tmp_path,
+        output_format=output_format,
+        lookup_fields_path=redcap_dataset["lookup_fields"],
+    )
+    assert (tmp_path / f"human_entry_suggestions.{output_format}").exists()
+
+
+def test_bench_load_suggestions_sheet(benchmark, redcap_dataset):
+    run_phase(benchmark, load_suggestions_sheet, redcap_dataset["suggestions"])
+
+
+@pytest.mark.parametrize("chunksize", [None, 20_000])
+def test_bench_apply_suggestions_sheet(benchmark, redcap_dataset, tmp_path, chunksize):
+    run_phase(
+        benchmark,
+        _process_replacements,
+        redcap_dataset["data"],
+        redcap_dataset["suggestions"],
+        tmp_path,
+        chunksize=chunksize,
+    )
+    assert (tmp_path / "others_diff.tsv").exists()
+
+
+def test_bench_apply_suggestions_sheet_sqlite(benchmark, redcap_dataset, tmp_path):
+    run_phase(
+        benchmark,
+        _process_replacements,
+        redcap_dataset["data"],
+        redcap_dataset["suggestions"],
+        tmp_path,
+        backend="sqlite",
+    )
+    assert (tmp_path / "others_diff.tsv").exists()
+
+
+def test_bench_process_other_entry_replacements(benchmark, redcap_dataset, tmp_path):
+    # Loading, validating and applying the suggestions sheet
+    run_phase(
+        benchmark,
+        process_other_entry_replacements,
+        redcap_dataset["data"],
+        redcap_dataset["suggestions"],
+        redcap_dataset["lookup_fields"],
+        output_path=tmp_path,
+    )
@@ -0,0 +1,37 @@
+"""Benchmarks for the start up of the command line: importing research_workflow_tools.cmdline
+(the -X importtime cumulative time is in extra_info["import_ms"]) and running rwt --help in a
+new interpreter, which is what every call of the scripts pays before the work starts.
+
+Run with: pytest benchmarks/test_bench_startup.py
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+from tests.test_cmdline import import_times
+
+
+@pytest.mark.parametrize(
+    "module_name",
+    ["research_workflow_tools.cmdline", "research_workflow_tools.other_entry_handler"],
+)
+def test_bench_import(benchmark, module_name):
+    times = benchmark.pedantic(import_times, args=(module_name,), rounds=5)
+    benchmark.extra_info["import_ms"] = round(times[module_name] / 1000, 1)
+
+
+def test_bench_rwt_help(benchmark):
+    benchmark.pedantic(
+        subprocess.run,
+        args=(
+            [
+                sys.executable,
+                "-c",
+                "from research_workflow_tools.cmdline import rwt; rwt(['--help'])",
+            ],
+        ),
+        kwargs={"capture_output": True, "check": True},
+        rounds=5,
+    )
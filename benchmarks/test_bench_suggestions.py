@@ -0,0 +1,61 @@
+"""Benchmarks for the fuzzy suggestions of the workbook (Step 4)
+
+Run with: pytest benchmarks/test_bench_suggestions.py
+"""
+
+import random
+import string
+
+import pytest
+
+from research_workflow_tools.suggestions import suggest_column_values
+
+UNIQUE_VALUE_COUNTS = [1_000, 10_000, 100_000]
+
+OCCUPATIONS = [
+    "farmer",
+    "trader",
+    "teacher",
+    "fisherman",
+    "tailor",
+    "carpenter",
+    "mason",
+    "driver",
+    "shop keeper",
+    "casual labourer",
+]
+
+
+def generate_free_text_values(unique_value_count: int):
+    # Misspelled variants of common answers mixed with one off entries
+    rng = random.Random(0)
+    values = {}
+    while len(values) < unique_value_count:
+        if rng.random() < 0.5:
+            value = list(rng.choice(OCCUPATIONS))
+            position = rng.randrange(len(value))
+            value[position] = rng.choice(string.ascii_lowercase)
+            value = "".join(value)
+            if rng.random() < 0.3:
+                value = f"{value} {rng.choice(OCCUPATIONS)}"
+        else:
+            value = " ".join(
+                "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9)))
+                for _ in range(rng.randint(1, 3))
+            )
+        values[value] = rng.randint(1, 50)
+    return list(values.keys()), values
+
+
+@pytest.mark.parametrize("unique_value_count", UNIQUE_VALUE_COUNTS)
+def test_bench_suggest_column_values(benchmark, unique_value_count):
+    unique_values, value_counts = generate_free_text_values(unique_value_count)
+
+    suggested_values = benchmark.pedantic(
+        suggest_column_values, args=(unique_values, value_counts), rounds=1
+    )
+
+    benchmark.extra_info["suggestions_per_second"] = (
+        unique_value_count / benchmark.stats.stats.mean
+    )
+    assert len(suggested_values) == unique_value_count
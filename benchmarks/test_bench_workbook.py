@@ -0,0 +1,66 @@
+"""Benchmarks for the workbook generation
+
+Run with: pytest benchmarks/test_bench_workbook.py
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from research_workflow_tools.other_entry_handler import (
+    build_human_entry_df,
+    generate_other_entry_workbook,
+)
+
+UNIQUE_VALUE_COUNTS = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def generate_column_values(unique_value_count: int, column_count: int = 300):
+    # Spread the unique values over the free text columns of a wide survey export
+    values = [f"other entry {index}" for index in range(unique_value_count)]
+    return {
+        f"q{column}_other": values[column::column_count]
+        for column in range(column_count)
+    }
+
+
+@pytest.mark.parametrize("unique_value_count", UNIQUE_VALUE_COUNTS)
+def test_bench_build_human_entry_df(benchmark, unique_value_count):
+    human_entry_column_values = generate_column_values(unique_value_count)
+
+    human_entry_df = benchmark(build_human_entry_df, human_entry_column_values)
+
+    assert len(human_entry_df) == unique_value_count
+
+
+@pytest.mark.parametrize("unique_value_count", UNIQUE_VALUE_COUNTS[:3])
+def test_bench_generate_other_entry_workbook(
+    benchmark, tmp_path: Path, monkeypatch, unique_value_count
+):
+    rng = np.random.default_rng(0)
+    row_count = unique_value_count * 2
+    data_frame = pd.DataFrame(
+        {
+            "hhid": [f"HH-{index}" for index in range(row_count)],
+            "redcap_event_name": "visit_1_arm_1",
+        }
+    )
+    for column in range(10):
+        data_frame[f"q{column}_other"] = [
+            f"other entry {value}"
+            for value in rng.integers(0, unique_value_count // 10, row_count)
+        ]
+    data_in_path = tmp_path / "data.tsv"
+    data_frame.to_csv(data_in_path, sep="\t", index=False)
+
+    ignore_list_path = tmp_path / "other_ignore_list.txt"
+    ignore_list_path.write_text("hhid\nredcap_event_name\n")
+
+    monkeypatch.chdir(tmp_path)
+    benchmark.pedantic(
+        generate_other_entry_workbook,
+        args=(data_in_path, ignore_list_path),
+        rounds=1,
+    )
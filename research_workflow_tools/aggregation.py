@@ -0,0 +1,244 @@
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, TypedDict
+
+import numpy as np
+import pandas as pd
+
+from research_workflow_tools.cache import DatasetCache, load_cached_data_file
+from research_workflow_tools.loaders import get_workbook_columns, read_header
+from research_workflow_tools.streaming import count_human_entry_values_in_chunks
+from research_workflow_tools.utils import make_process_pool
+from research_workflow_tools.value_index import ValueIndex
+
+
+class _WorkerState(TypedDict):
+    """The ignore list and the load options of count_human_entry_values that are the same for
+    all the data files"""
+
+    ignore_list: List[str]
+    chunksize: Optional[int]
+    engine: Optional[str]
+    cache: Optional[DatasetCache]
+
+
+# The state the worker processes use (inherited when the processes are forked)
+_worker_state: Optional[_WorkerState] = None
+
+
+def count_human_entry_values(
+    data_in_path: Path,
+    ignore_list: List[str],
+    chunksize: Optional[int] = None,
+    engine: Optional[str] = None,
+    cache: Optional[DatasetCache] = None,
+) -> Tuple[Dict[str, Dict[str, int]], Dict[str, pd.DataFrame]]:
+    """Counts the rows of the (stripped) unique values of all the string columns of a data file
+    that are not in the ignore list and the households (hhids) they show up in, in one pass
+
+    Args:
+        data_in_path (Path): Path of the data file
+        ignore_list (List[str]): The columns to ignore
+        chunksize (Optional[int], optional): Read the data file in chunks of this many rows and only keep the unique values in memory. Defaults to None.
+        engine (Optional[str], optional): The parser to use for csv/tsv files ("c" or "pyarrow"), not used when reading in chunks. Defaults to None.
+        cache (Optional[DatasetCache], optional): Cache of the parsed data files, not used when reading in chunks. Defaults to None.
+
+    Returns:
+        Tuple[Dict[str, Dict[str, int]], Dict[str, pd.DataFrame]]: The number of rows of each
+        unique value (in the order they show up) for each of the columns and the distinct
+        (value, hhid) pairs of each of the columns (empty when the file has no hhid column)
+    """
+    if chunksize is not None:
+        return count_human_entry_values_in_chunks(data_in_path, ignore_list, chunksize)
+
+    # Load the data into a dataframe, skipping the columns in the ignore list
+    usecols = get_workbook_columns(read_header(data_in_path), ignore_list)
+    df = load_cached_data_file(
+        data_in_path, usecols=usecols, engine=engine, cache=cache
+    )
+
+    # The value index strips the values and keeps track of the occurrence counts
+    value_index = ValueIndex(df)
+    human_entry_column_counts = {}
+    human_entry_column_households = {}
+    for col in df.columns:
+        if (df[col].dtype == "object") and (col not in ignore_list):
+            column_index = value_index.column(col)
+            human_entry_column_counts[col] = {
+                value: int(count)
+                for value, count in zip(column_index.unique_values, column_index.counts)
+                if type(value) == str
+            }
+
+            if "hhid" not in df.columns:
+                continue
+            unique_values = np.array(column_index.unique_values + [None], dtype=object)
+            value_households = pd.DataFrame(
+                {"code": column_index.codes, "hhid": df["hhid"].to_numpy()}
+            ).drop_duplicates()
+            values = unique_values[value_households["code"].to_numpy()]
+            is_text = np.fromiter(
+                (type(value) == str for value in values), dtype=bool, count=len(values)
+            )
+            human_entry_column_households[col] = pd.DataFrame(
+                {
+                    "value": values[is_text],
+                    "hhid": value_households["hhid"].to_numpy()[is_text],
+                }
+            )
+
+    return human_entry_column_counts, human_entry_column_households
+
+
+class ValueAggregate:
+    """The unique values of the columns of many data files, with the number of rows, the
+    households and the data files each value shows up in. Only the unique values (and the
+    distinct value and hhid pairs) are kept, so the memory does not depend on the number of rows.
+    """
+
+    def __init__(self, data_in_paths: List[Path]):
+        self.data_in_paths = data_in_paths
+        # {column: {value: number of rows}}, in the order the values show up
+        self.counts: Dict[str, Dict[str, int]] = {}
+        # {column: {value: positions of the data files in data_in_paths}}
+        self.sources: Dict[str, Dict[str, List[int]]] = {}
+        # {column: frames with the distinct (value, hhid) pairs of each data file}
+        self._households: Dict[str, List[pd.DataFrame]] = {}
+
+    def add(
+        self,
+        file_position: int,
+        column_counts: Dict[str, Dict[str, int]],
+        column_households: Optional[Dict[str, pd.DataFrame]] = None,
+    ):
+        """Merges the value counts of a data file (see count_human_entry_values)
+
+        Args:
+            file_position (int): The position of the data file in data_in_paths
+            column_counts (Dict[str, Dict[str, int]]): The value counts of the data file
+            column_households (Optional[Dict[str, pd.DataFrame]], optional): The distinct (value, hhid) pairs of the data file. Defaults to None.
+        """
+        for col, value_counts in column_counts.items():
+            counts = self.counts.setdefault(col, {})
+            sources = self.sources.setdefault(col, {})
+            for value, count in value_counts.items():
+                counts[value] = counts.get(value, 0) + count
+                sources.setdefault(value, []).append(file_position)
+
+        for col, value_households in (column_households or {}).items():
+            self._households.setdefault(col, []).append(value_households)
+
+    def unique_values(self) -> Dict[str, List[str]]:
+        """Gets the unique values of each of the columns
+
+        Returns:
+            Dict[str, List[str]]: The unique values for each of the columns
+        """
+        return {col: list(value_counts) for col, value_counts in self.counts.items()}
+
+    def value_households(self) -> Dict[str, pd.DataFrame]:
+        """Gets the distinct (value, hhid) pairs of each of the columns across the data files
+
+        Returns:
+            Dict[str, pd.DataFrame]: The value and hhid columns of the pairs
+        """
+        for col, frames in self._households.items():
+            if len(frames) > 1:
+                # Merged once, the pairs of the data files are replaced by the merged pairs
+                self._households[col] = [
+                    pd.concat(frames, ignore_index=True).drop_duplicates(
+                        ignore_index=True
+                    )
+                ]
+        return {col: frames[0] for col, frames in self._households.items()}
+
+    def household_counts(self) -> Dict[str, Dict[str, int]]:
+        """Gets the number of households (distinct hhids) each of the unique values of the
+        columns shows up in, a household in many data files is counted once
+
+        Returns:
+            Dict[str, Dict[str, int]]: The number of households of each unique value for each of
+            the columns (only the columns of the data files with an hhid column)
+        """
+        return {
+            col: value_households.groupby("value", sort=False).size().to_dict()
+            for col, value_households in self.value_households().items()
+        }
+
+    def source_files(self) -> Dict[str, List[List[str]]]:
+        """Gets the data files each of the unique values of the columns shows up in
+
+        Returns:
+            Dict[str, List[List[str]]]: The data files of each of the unique values (in the order of unique_values)
+        """
+        return {
+            col: [
+                [str(self.data_in_paths[position]) for position in positions]
+                for positions in value_sources.values()
+            ]
+            for col, value_sources in self.sources.items()
+        }
+
+
+def _init_worker(state: _WorkerState) -> None:
+    global _worker_state
+    _worker_state = state
+
+
+def _count_in_worker(
+    data_in_path: Path,
+) -> Tuple[Dict[str, Dict[str, int]], Dict[str, pd.DataFrame]]:
+    if _worker_state is None:
+        raise RuntimeError("The worker process was not initialized")
+    return count_human_entry_values(data_in_path, **_worker_state)
+
+
+def aggregate_human_entry_values(
+    data_in_paths: List[Path],
+    ignore_list: List[str],
+    workers: int = 1,
+    chunksize: Optional[int] = None,
+    engine: Optional[str] = None,
+    cache: Optional[DatasetCache] = None,
+) -> ValueAggregate:
+    """Counts the unique values of many data files (e.g. one export per site) in a pool of
+    processes, one data file per process, and merges them in the order of the data files
+
+    Args:
+        data_in_paths (List[Path]): The data files
+        ignore_list (List[str]): The columns to ignore
+        workers (int, optional): The number of data files read at the same time. Defaults to 1.
+        chunksize (Optional[int], optional): Read the data files in chunks of this many rows. Defaults to None.
+        engine (Optional[str], optional): The parser to use for csv/tsv files ("c" or "pyarrow"), not used when reading in chunks. Defaults to None.
+        cache (Optional[DatasetCache], optional): Cache of the parsed data files, not used when reading in chunks. Defaults to None.
+
+    Returns:
+        ValueAggregate: The merged unique values
+    """
+    state: _WorkerState = {
+        "ignore_list": ignore_list,
+        "chunksize": chunksize,
+        "engine": engine,
+        "cache": cache,
+    }
+    aggregate = ValueAggregate(data_in_paths)
+
+    if workers <= 1 or len(data_in_paths) <= 1:
+        for file_position, data_in_path in enumerate(data_in_paths):
+            aggregate.add(
+                file_position, *count_human_entry_values(data_in_path, **state)
+            )
+        return aggregate
+
+    with make_process_pool(
+        min(workers, len(data_in_paths)), _init_worker, (state,)
+    ) as executor:
+        futures = [
+            executor.submit(_count_in_worker, data_in_path)
+            for data_in_path in data_in_paths
+        ]
+        # Merged in the order of the data files so the workbook doesn't depend on which
+        # process finishes first
+        for file_position, future in enumerate(futures):
+            aggregate.add(file_position, *future.result())
+
+    return aggregate
@@ -0,0 +1,268 @@
+import glob
+import json
+import logging
+import time
+import traceback
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple, TypedDict
+
+import pandas as pd
+
+from research_workflow_tools.cache import DatasetCache
+from research_workflow_tools.loaders import DATA_FILE_SUFFIXES
+from research_workflow_tools.other_entry_handler import (
+    apply_suggestions_sheet,
+    load_suggestions_sheet,
+    validate_suggestions_sheet,
+)
+from research_workflow_tools.utils import make_process_pool
+from research_workflow_tools.validation import LookupValidator
+
+logger = logging.getLogger(__name__)
+
+# The name of the summary of a batch run (in the output folder)
+MANIFEST_FILE_NAME = "batch_manifest.json"
+
+
+class _WorkerState(TypedDict):
+    """The suggestions sheet, the validator and the options of process_dataset that are the
+    same for all the data files of a batch"""
+
+    sheet: Tuple[pd.DataFrame, List[str], List[str], List[str]]
+    validator: Optional[LookupValidator]
+    chunksize: Optional[int]
+    engine: Optional[str]
+    output_format: str
+    use_cache: bool
+    string_storage: str
+
+
+# The state the worker processes use (inherited when the processes are forked)
+_worker_state: Optional[_WorkerState] = None
+
+
+def find_datasets(patterns: List[str]) -> List[Path]:
+    """Finds the data files of a batch. Every pattern is a data file, a folder (all the data
+    files in it) or a glob pattern (** goes through the sub folders)
+
+    Args:
+        patterns (List[str]): The files, folders and glob patterns
+
+    Returns:
+        List[Path]: The data files (sorted, without duplicates)
+    """
+    data_in_paths: Set[Path] = set()
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            candidates = list(path.iterdir())
+        elif path.is_file():
+            candidates = [path]
+        else:
+            candidates = [Path(match) for match in glob.glob(pattern, recursive=True)]
+
+        data_in_paths.update(
+            candidate
+            for candidate in candidates
+            if candidate.is_file() and candidate.suffix in DATA_FILE_SUFFIXES
+        )
+
+    return sorted(data_in_paths)
+
+
+def _dataset_output_paths(data_in_paths: List[Path], output_path: Path) -> List[Path]:
+    # Every data file gets its own folder (named after the file), the files with the same
+    # name in different folders get a number
+    used_names = set()
+    dataset_output_paths = []
+    for data_in_path in data_in_paths:
+        name = data_in_path.stem
+        suffix = 2
+        while name in used_names:
+            name = f"{data_in_path.stem}_{suffix}"
+            suffix += 1
+        used_names.add(name)
+        dataset_output_paths.append(output_path / name)
+    return dataset_output_paths
+
+
+def _init_worker(state: _WorkerState) -> None:
+    global _worker_state
+    _worker_state = state
+
+
+def _process_in_worker(data_in_path: Path, dataset_output_path: Path) -> Dict[str, Any]:
+    if _worker_state is None:
+        raise RuntimeError("The worker process was not initialized")
+    return process_dataset(data_in_path, dataset_output_path, **_worker_state)
+
+
+def process_dataset(
+    data_in_path: Path,
+    dataset_output_path: Path,
+    sheet: Tuple[pd.DataFrame, List[str], List[str], List[str]],
+    validator: Optional[LookupValidator],
+    chunksize: Optional[int],
+    engine: Optional[str],
+    output_format: str,
+    use_cache: bool,
+    string_storage: str = "object",
+) -> Dict[str, Any]:
+    """Applies the loaded suggestions sheet to one data file of a batch. The errors are recorded
+    instead of stopping the batch.
+
+    Args:
+        data_in_path (Path): Path of the data file
+        dataset_output_path (Path): Output folder of the data file (patch file and others diff)
+        sheet (Tuple[pd.DataFrame, List[str], List[str], List[str]]): The loaded suggestions sheet (see load_suggestions_sheet)
+        validator (Optional[LookupValidator]): The compiled lookup dictionary, None to skip the validation
+        chunksize (Optional[int]): Read the data file in chunks of this many rows
+        engine (Optional[str]): The parser to use for csv/tsv files
+        output_format (str): The format of the others diff file ("tsv" or "parquet")
+        use_cache (bool): Use the cache of the parsed data files
+        string_storage (str, optional): How the columns that get cleaned are kept in memory ("object" or "category"). Defaults to "object".
+
+    Returns:
+        Dict[str, Any]: The entry of the data file in the manifest
+    """
+    start_time = time.perf_counter()
+    entry: Dict[str, Any] = {
+        "data": str(data_in_path),
+        "output": str(dataset_output_path),
+        "status": "ok",
+        "patch": None,
+        "patch_count": 0,
+        "errors": [],
+    }
+
+    try:
+        if validator is not None:
+            report = validate_suggestions_sheet(validator, data_in_path, *sheet)
+            if not report.ok:
+                entry["status"] = "invalid"
+                entry["errors"] = report.failures["reason"].tolist()
+                return entry
+
+        dataset_output_path.mkdir(parents=True, exist_ok=True)
+        patch_file_path = apply_suggestions_sheet(
+            data_in_path,
+            *sheet,
+            output_path=dataset_output_path,
+            chunksize=chunksize,
+            engine=engine,
+            output_format=output_format,
+            cache=DatasetCache() if use_cache else None,
+            diff_path=dataset_output_path / "others_diff",
+            string_storage=string_storage,
+        )
+        with open(patch_file_path, "r") as file_ptr:
+            entry["patch_count"] = len(json.load(file_ptr)["patches"])
+        entry["patch"] = str(patch_file_path)
+    except (Exception, SystemExit) as e:
+        # The loaders exit on the files they can't read
+        entry["status"] = "error"
+        entry["errors"] = ["".join(traceback.format_exception_only(type(e), e)).strip()]
+    finally:
+        entry["seconds"] = round(time.perf_counter() - start_time, 3)
+
+    return entry
+
+
+def process_other_entry_batch(
+    data_in_paths: List[Path],
+    human_suggestions_path: Path,
+    json_dictionary_path: Path = Path("./lookup_fields.json"),
+    output_path: Path = Path("./"),
+    workers: int = 1,
+    chunksize: Optional[int] = None,
+    engine: Optional[str] = None,
+    output_format: str = "tsv",
+    use_cache: bool = True,
+    validate: bool = True,
+    string_storage: str = "object",
+) -> Path:
+    """Processes many data files (e.g. one export per site or visit) against one suggestions
+    sheet. The suggestions sheet and the lookup dictionary are loaded once, the data files are
+    processed in a pool of processes and each one gets a folder with its patch file and others
+    diff. The manifest lists the result of every data file.
+
+    Args:
+        data_in_paths (List[Path]): The data files (see find_datasets)
+        human_suggestions_path (Path): Path of the human entry suggestions file filled out by the user
+        json_dictionary_path (Path, optional): The json dictionary that has all the valid values for the different columns. Defaults to Path("./lookup_fields.json").
+        output_path (Path, optional): Output folder of the batch. Defaults to Path("./").
+        workers (int, optional): The number of data files processed at the same time. Defaults to 1.
+        chunksize (Optional[int], optional): Read the data files in chunks of this many rows. Defaults to None.
+        engine (Optional[str], optional): The parser to use for csv/tsv files ("c" or "pyarrow"), not used when reading in chunks. Defaults to None.
+        output_format (str, optional): The format of the others diff files ("tsv" or "parquet"). Defaults to "tsv".
+        use_cache (bool, optional): Use the cache of the parsed data files, not used when reading in chunks. Defaults to True.
+        validate (bool, optional): Check the suggestions against the json dictionary and the columns of every data file, the data files that fail are skipped. Defaults to True.
+        string_storage (str, optional): How the columns that get cleaned are kept in memory ("object" or "category", see options.STRING_STORAGES). Defaults to "object".
+
+    Returns:
+        Path: Path of the manifest
+    """
+    validator = None
+    if validate and json_dictionary_path.exists():
+        validator = LookupValidator.from_json(json_dictionary_path)
+    elif validate:
+        logger.warning(
+            "Lookup dictionary %s not found, the replacement values are not checked",
+            json_dictionary_path,
+        )
+
+    state: _WorkerState = {
+        "sheet": load_suggestions_sheet(human_suggestions_path),
+        "validator": validator,
+        "chunksize": chunksize,
+        "engine": engine,
+        "output_format": output_format,
+        "use_cache": use_cache,
+        "string_storage": string_storage,
+    }
+    dataset_output_paths = _dataset_output_paths(data_in_paths, output_path)
+    logger.info("Processing %d data files", len(data_in_paths))
+
+    if workers <= 1 or len(data_in_paths) <= 1:
+        entries = [
+            process_dataset(data_in_path, dataset_output_path, **state)
+            for data_in_path, dataset_output_path in zip(
+                data_in_paths, dataset_output_paths
+            )
+        ]
+    else:
+        with make_process_pool(
+            min(workers, len(data_in_paths)), _init_worker, (state,)
+        ) as executor:
+            futures = [
+                executor.submit(_process_in_worker, data_in_path, dataset_output_path)
+                for data_in_path, dataset_output_path in zip(
+                    data_in_paths, dataset_output_paths
+                )
+            ]
+            # The manifest keeps the order of the data files
+            entries = [future.result() for future in futures]
+
+    for entry in entries:
+        logger.info(
+            "%s: %s (%d patches)", entry["data"], entry["status"], entry["patch_count"]
+        )
+        for error in entry["errors"]:
+            logger.warning("    %s", error)
+
+    output_path.mkdir(parents=True, exist_ok=True)
+    manifest_path = output_path / MANIFEST_FILE_NAME
+    with open(manifest_path, "w") as file_ptr:
+        json.dump(
+            {
+                "suggestions": str(human_suggestions_path),
+                "lookup_dictionary": (
+                    None if validator is None else str(json_dictionary_path)
+                ),
+                "datasets": entries,
+            },
+            file_ptr,
+            indent=4,
+        )
+
+    return manifest_path
@@ -0,0 +1,286 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from research_workflow_tools.loaders import is_arrow_file, load_data_file
+
+logger = logging.getLogger(__name__)
+
+# The folder (in the current working directory) where the parsed datasets are kept
+CACHE_DIR = Path("./.rwt_cache")
+
+# The cache is trimmed down to this size (in bytes) after every write
+DEFAULT_CACHE_SIZE_LIMIT = 2 * 1024**3
+
+CACHE_SUFFIX = ".feather"
+
+# Goes in the key so the entries written in another layout are not read
+CACHE_FORMAT_VERSION = 3
+
+# The entries keep the original text of the trimmed cells of a column in a column with this
+# prefix (the other cells are missing)
+UNSTRIPPED_PREFIX = "__rwt_unstripped__:"
+
+
+class DatasetCache:
+    """On-disk cache of the parsed data files. The data frames are stored as Feather (Arrow IPC)
+    files keyed by the path, the size and the modification time of the data file, so editing the
+    data file invalidates its entry. Every data file has a single entry with all of its columns
+    (see load_cached_data_file), whatever columns and options the commands load it with.
+
+    The least recently used entries are evicted when the cache goes over the size limit.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path = CACHE_DIR,
+        size_limit: int = DEFAULT_CACHE_SIZE_LIMIT,
+    ):
+        self.cache_dir = cache_dir
+        self.size_limit = size_limit
+
+    def cache_key(self, data_in_path: Path) -> str:
+        """Generates the key of a data file
+
+        Args:
+            data_in_path (Path): Path of the data file
+
+        Returns:
+            str: The cache key
+        """
+        stat = data_in_path.stat()
+        key_parts = {
+            "path": str(data_in_path.resolve()),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "version": CACHE_FORMAT_VERSION,
+        }
+        return hashlib.sha1(
+            json.dumps(key_parts, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{CACHE_SUFFIX}"
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """Gets the data frame stored under the key and marks it as recently used
+
+        Args:
+            key (str): The cache key
+
+        Returns:
+            Optional[pd.DataFrame]: The data frame or None if it's not in the cache
+        """
+        entry_path = self._entry_path(key)
+        if not entry_path.exists():
+            return None
+
+        try:
+            data_frame = pd.read_feather(entry_path)
+        except Exception as e:
+            logger.warning(
+                "Unable to read the cache entry %s, ignoring it: %s", entry_path, e
+            )
+            entry_path.unlink(missing_ok=True)
+            return None
+
+        # The access time is kept in the modification time of the entry (another process can
+        # have evicted it since it was read)
+        try:
+            os.utime(entry_path)
+        except FileNotFoundError:
+            pass
+
+        # Arrow has a single null value, the text columns get NaN back like read_csv gives
+        for col in data_frame.columns:
+            if data_frame[col].dtype == "object":
+                data_frame[col] = data_frame[col].where(data_frame[col].notna(), np.nan)
+
+        return data_frame
+
+    def put(self, key: str, data_frame: pd.DataFrame) -> bool:
+        """Stores the data frame under the key and evicts the least recently used entries if the
+        cache goes over the size limit
+
+        Args:
+            key (str): The cache key
+            data_frame (pd.DataFrame): The data frame to store
+
+        Returns:
+            bool: True if the data frame was stored
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry_path = self._entry_path(key)
+        temp_path = entry_path.with_suffix(".tmp")
+
+        try:
+            data_frame.to_feather(temp_path)
+        except Exception as e:
+            # e.g. columns that mix numbers and strings can't be stored in Arrow
+            logger.warning("Unable to cache the data frame, skipping the cache: %s", e)
+            temp_path.unlink(missing_ok=True)
+            return False
+
+        temp_path.replace(entry_path)
+        self.evict(keep=entry_path)
+        return True
+
+    def evict(self, keep: Optional[Path] = None):
+        """Removes the least recently used entries until the cache fits in the size limit
+
+        Args:
+            keep (Optional[Path], optional): An entry that is never removed. Defaults to None.
+        """
+        # The workers of a batch share the cache, an entry can be removed by another process
+        # between the listing and the stat
+        entries = []
+        for entry in self.cache_dir.glob(f"*{CACHE_SUFFIX}"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry))
+        entries.sort()
+        total_size = sum(size for _, size, _ in entries)
+
+        for _, size, entry in entries:
+            if total_size <= self.size_limit:
+                break
+            if entry == keep:
+                continue
+            entry.unlink(missing_ok=True)
+            total_size -= size
+
+
+def _parse_data_file(data_in_path: Path, engine: Optional[str]) -> pd.DataFrame:
+    """Parses all the columns of the data file for the cache and strips the text columns, the
+    original text of the trimmed cells is kept in the UNSTRIPPED_PREFIX columns
+
+    Args:
+        data_in_path (Path): Path of the data file
+        engine (Optional[str]): The parser to use for csv/tsv files
+
+    Returns:
+        pd.DataFrame: The data frame
+    """
+    data_frame = load_data_file(data_in_path, engine=engine)
+
+    unstripped_columns = {}
+    for col in data_frame.columns:
+        if data_frame[col].dtype != "object":
+            continue
+        stripped_column = data_frame[col].str.strip()
+        trimmed = (stripped_column != data_frame[col]) & data_frame[col].notna()
+        if trimmed.any():
+            unstripped_columns[f"{UNSTRIPPED_PREFIX}{col}"] = data_frame[col].where(
+                trimmed
+            )
+        data_frame[col] = stripped_column
+
+    if len(unstripped_columns) == 0:
+        return data_frame
+    return pd.concat([data_frame, pd.DataFrame(unstripped_columns)], axis=1)
+
+
+def load_cached_data_file(
+    data_in_path: Path,
+    usecols: Optional[List[str]] = None,
+    dtype: Optional[Dict[str, Any]] = None,
+    engine: Optional[str] = None,
+    cache: Optional[DatasetCache] = None,
+    strip_columns: Optional[List[str]] = None,
+    trimmed_cells: Optional[Dict[Hashable, Tuple[np.ndarray, np.ndarray]]] = None,
+) -> pd.DataFrame:
+    """Loads the data file (see load_data_file) through the cache, so the next run with the same
+    file doesn't parse it again.
+
+    The cache has all the columns of the file, parsed and stripped once (see _parse_data_file),
+    and the columns that are asked for are picked out of it. The columns that are not in
+    strip_columns get their original text back. The text columns of strip_columns are returned
+    stripped and the row positions and the original values of their trimmed cells are added to
+    trimmed_cells, the columns of strip_columns that are not in trimmed_cells (the file was not
+    read from the cache or the column is not text in the cache) still need to be stripped.
+
+    Args:
+        data_in_path (Path): Path of the data file
+        usecols (Optional[List[str]], optional): Only load these columns. Defaults to None.
+        dtype (Optional[Dict[str, Any]], optional): The dtypes of the columns. Defaults to None.
+        engine (Optional[str], optional): The parser to use for csv/tsv files ("c" or "pyarrow"). Defaults to None.
+        cache (Optional[DatasetCache], optional): The cache to use, the file is always parsed if None. Defaults to None.
+        strip_columns (Optional[List[str]], optional): The columns that can be returned stripped, only used along with trimmed_cells. Defaults to None.
+        trimmed_cells (Optional[Dict[Hashable, Tuple[np.ndarray, np.ndarray]]], optional): Gets the trimmed cells of the columns that are returned stripped. Defaults to None.
+
+    Returns:
+        pd.DataFrame: The data frame
+    """
+    # Arrow files are already memory-mapped, there is nothing to gain from caching them
+    if cache is None or is_arrow_file(data_in_path):
+        return load_data_file(data_in_path, usecols=usecols, dtype=dtype, engine=engine)
+
+    key = cache.cache_key(data_in_path)
+    cached_df = cache.get(key)
+    if cached_df is not None:
+        logger.info("Loaded %s from the cache", data_in_path)
+    else:
+        cached_df = _parse_data_file(data_in_path, engine)
+        cache.put(key, cached_df)
+
+    columns = [
+        col
+        for col in cached_df.columns
+        if not str(col).startswith(UNSTRIPPED_PREFIX)
+        and (usecols is None or col in usecols)
+    ]
+    data_frame = cached_df[columns].copy()
+    if dtype is None:
+        dtype = {}
+    if strip_columns is None or trimmed_cells is None:
+        # Nothing to hand the trimmed cells to, all the columns get their original text back
+        strip_columns = []
+        trimmed_cells = {}
+
+    # The columns that need to be text but were parsed as numbers are read again
+    reread_columns = []
+    for col in columns:
+        col_type = dtype.get(col)
+        if col_type in (str, "category") and data_frame[col].dtype != "object":
+            reread_columns.append(col)
+            continue
+
+        unstripped_col = f"{UNSTRIPPED_PREFIX}{col}"
+        if unstripped_col in cached_df.columns:
+            unstripped = cached_df[unstripped_col]
+            if col in strip_columns:
+                positions = np.flatnonzero(unstripped.notna().to_numpy())
+                trimmed_cells[col] = (
+                    positions,
+                    unstripped.to_numpy(dtype=object)[positions],
+                )
+            else:
+                data_frame[col] = unstripped.where(unstripped.notna(), data_frame[col])
+        elif col in strip_columns and data_frame[col].dtype == "object":
+            trimmed_cells[col] = (
+                np.array([], dtype=np.int64),
+                np.array([], dtype=object),
+            )
+
+        if col_type is not None and col_type is not str:
+            data_frame[col] = data_frame[col].astype(col_type)
+
+    if len(reread_columns) > 0:
+        text_df = load_data_file(
+            data_in_path,
+            usecols=reread_columns,
+            dtype={col: dtype[col] for col in reread_columns},
+            engine=engine,
+        )
+        for col in reread_columns:
+            data_frame[col] = text_df[col]
+
+    return data_frame
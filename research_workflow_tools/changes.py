@@ -0,0 +1,201 @@
+from typing import Any, Dict, Hashable, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def _json_value(value: Any) -> Any:
+    """Converts a cell value to the value that goes in the patch file (missing values are null
+    and the numpy scalars become python values)
+
+    Args:
+        value (Any): The cell value
+
+    Returns:
+        Any: The json value
+    """
+    if value is None:
+        return None
+    if not isinstance(value, (list, tuple, dict)) and pd.isna(value):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class CellChanges:
+    """Keeps track of the cells that are written to in a data frame along with the value each
+    cell had before the first write, so the patch can be built from the touched cells instead
+    of comparing the whole data frame with a copy of the original.
+
+    The positions are row positions in the data frame (not index labels).
+    """
+
+    def __init__(self, row_count: int):
+        self.row_count = row_count
+        self._touched: Dict[Hashable, np.ndarray] = {}
+        self._positions: Dict[Hashable, List[np.ndarray]] = {}
+        self._old_values: Dict[Hashable, List[np.ndarray]] = {}
+
+    def record(
+        self, data_frame: pd.DataFrame, column_name: Hashable, positions: np.ndarray
+    ) -> None:
+        """Records the cells that are about to be written to, this needs to be called before the
+        data frame is updated
+
+        Args:
+            data_frame (pd.DataFrame): The data frame before the write
+            column_name (Hashable): The column that is written to
+            positions (np.ndarray): The row positions that are written to
+        """
+        positions = np.asarray(positions)
+        if positions.dtype == bool:
+            positions = np.flatnonzero(positions)
+        if len(positions) == 0:
+            return
+
+        if column_name in data_frame.columns:
+            old_values = data_frame[column_name].to_numpy()[positions]
+        else:
+            old_values = np.full(len(positions), np.nan, dtype=object)
+        self.record_values(column_name, positions, old_values)
+
+    def record_values(
+        self, column_name: Hashable, positions: np.ndarray, old_values: np.ndarray
+    ) -> None:
+        """Records cells that were written to along with the values they had before, for the
+        writes that happened before the data frame was loaded (e.g. the cells that were trimmed
+        in the cache)
+
+        Args:
+            column_name (Hashable): The column that is written to
+            positions (np.ndarray): The row positions that are written to
+            old_values (np.ndarray): The value of each of the cells before the write
+        """
+        positions = np.asarray(positions)
+        if len(positions) == 0:
+            return
+
+        touched = self._touched.get(column_name)
+        if touched is None:
+            touched = np.zeros(self.row_count, dtype=bool)
+            self._touched[column_name] = touched
+            self._positions[column_name] = []
+            self._old_values[column_name] = []
+
+        # Only the value before the first write to a cell is kept
+        new_positions, first_positions = np.unique(positions, return_index=True)
+        not_touched = ~touched[new_positions]
+        new_positions = new_positions[not_touched]
+        if len(new_positions) == 0:
+            return
+        touched[new_positions] = True
+
+        self._positions[column_name].append(new_positions)
+        self._old_values[column_name].append(
+            np.asarray(old_values, dtype=object)[first_positions[not_touched]]
+        )
+
+    def touched_counts(self) -> Tuple[int, int]:
+        """Counts the rows that have a touched cell and the touched cells
+
+        Returns:
+            Tuple[int, int]: The number of rows and the number of cells
+        """
+        if len(self._touched) == 0:
+            return 0, 0
+        touched_rows = np.zeros(self.row_count, dtype=bool)
+        cell_count = 0
+        for touched in self._touched.values():
+            touched_rows |= touched
+            cell_count += int(touched.sum())
+        return int(touched_rows.sum()), cell_count
+
+    def columns(self) -> List[Hashable]:
+        """Gets the columns that have touched cells
+
+        Returns:
+            List[Hashable]: The column names
+        """
+        return list(self._touched.keys())
+
+    def changed_cells(
+        self, data_frame: pd.DataFrame
+    ) -> Dict[Hashable, Tuple[np.ndarray, np.ndarray]]:
+        """Compares the touched cells with their old values, the cells that were written to with
+        the value they already had are left out
+
+        Args:
+            data_frame (pd.DataFrame): The updated data frame
+
+        Returns:
+            Dict[Hashable, Tuple[np.ndarray, np.ndarray]]: The row positions and the new values of
+            the cells that changed in each column
+        """
+        changed_cells = {}
+        for column_name, position_list in self._positions.items():
+            positions = np.concatenate(position_list)
+            old_values = pd.Series(
+                np.concatenate(self._old_values[column_name]), dtype=object
+            )
+            new_values = pd.Series(
+                data_frame[column_name].to_numpy()[positions].astype(object),
+                dtype=object,
+            )
+
+            unchanged = (new_values == old_values) | (
+                new_values.isna() & old_values.isna()
+            )
+            changed = ~unchanged.to_numpy()
+            if changed.any():
+                changed_cells[column_name] = (
+                    positions[changed],
+                    new_values.to_numpy()[changed],
+                )
+
+        return changed_cells
+
+    def patch_deltas(
+        self,
+        data_frame: pd.DataFrame,
+        id_columns: List[str],
+        columns: List[Hashable],
+    ) -> List[Tuple[int, Dict[str, Any], Dict[Hashable, Any]]]:
+        """Groups the changed cells by row into patch deltas
+
+        Args:
+            data_frame (pd.DataFrame): The updated data frame
+            id_columns (List[str]): The columns that identify a row
+            columns (List[Hashable]): The columns to generate deltas on (in this order)
+
+        Returns:
+            List[Tuple[int, Dict[str, Any], Dict[Hashable, Any]]]: (row position, target, deltas)
+            for every row that changed, in the order of the rows
+        """
+        changed_cells = self.changed_cells(data_frame)
+
+        row_deltas: Dict[int, Dict[Hashable, Any]] = {}
+        for column_name in columns:
+            if column_name in id_columns or column_name not in changed_cells:
+                continue
+            positions, new_values = changed_cells[column_name]
+            for position, new_value in zip(positions.tolist(), new_values):
+                row_deltas.setdefault(position, {})[column_name] = _json_value(
+                    new_value
+                )
+
+        row_positions = sorted(row_deltas)
+        id_values = {
+            id_column: data_frame[id_column].to_numpy()[row_positions]
+            for id_column in id_columns
+        }
+
+        patch_deltas = []
+        for index, position in enumerate(row_positions):
+            target = {
+                id_column: _json_value(id_values[id_column][index])
+                for id_column in id_columns
+            }
+            patch_deltas.append((position, target, row_deltas[position]))
+
+        return patch_deltas
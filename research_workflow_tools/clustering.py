@@ -0,0 +1,363 @@
+import json
+import logging
+import zlib
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from research_workflow_tools.suggestions import normalize_text, text_numbers, trigrams
+
+logger = logging.getLogger(__name__)
+
+# The minimum trigram similarity (Jaccard) for two values to be in the same cluster
+DEFAULT_CLUSTER_SIMILARITY = 0.6
+
+# The MinHash signature is split into bands of rows, two texts are compared when all the rows
+# of one of the bands are the same. With 16 bands of 3 rows the texts that are 0.6 similar
+# are compared 98% of the time and the texts that are 0.2 similar 12% of the time.
+MINHASH_BANDS = 16
+MINHASH_ROWS = 3
+
+# The Mersenne prime used by the MinHash hash functions
+_MINHASH_PRIME = (1 << 31) - 1
+
+# The number of grams hashed at once, keeps the (hash functions x grams) array small
+_MINHASH_BATCH_SIZE = 200_000
+
+# The columns of the human entry dataframe that hold the decision made on a value
+DECISION_COLUMNS = ["replacement_value", "delete_value"]
+
+
+def minhash_signatures(
+    gram_sets: List[Any], hash_count: int, seed: int = 0
+) -> np.ndarray:
+    """Computes the MinHash signature of each set of trigrams
+
+    Args:
+        gram_sets (List[Any]): The sets of trigrams (they must not be empty)
+        hash_count (int): The number of hash functions (length of the signatures)
+        seed (int, optional): Seed of the hash functions. Defaults to 0.
+
+    Returns:
+        np.ndarray: (number of sets, hash_count) array with the signatures
+    """
+    rng = np.random.RandomState(seed)
+    multipliers = rng.randint(1, _MINHASH_PRIME, size=hash_count).astype(np.uint64)
+    offsets = rng.randint(0, _MINHASH_PRIME, size=hash_count).astype(np.uint64)
+
+    signatures = np.empty((len(gram_sets), hash_count), dtype=np.uint64)
+    start = 0
+    while start < len(gram_sets):
+        # Take as many sets as fit in a batch (at least one)
+        stop = start
+        gram_count = 0
+        while stop < len(gram_sets) and (
+            stop == start or gram_count + len(gram_sets[stop]) <= _MINHASH_BATCH_SIZE
+        ):
+            gram_count += len(gram_sets[stop])
+            stop += 1
+
+        batch = gram_sets[start:stop]
+        # crc32 is stable across processes, unlike hash() on strings
+        gram_hashes = np.fromiter(
+            (zlib.crc32(gram.encode("utf-8")) for grams in batch for gram in grams),
+            dtype=np.uint64,
+            count=gram_count,
+        )
+        set_starts = np.cumsum([0] + [len(grams) for grams in batch[:-1]])
+
+        hashed = (
+            multipliers[:, None] * (gram_hashes[None, :] % _MINHASH_PRIME)
+            + offsets[:, None]
+        ) % _MINHASH_PRIME
+        signatures[start:stop] = np.minimum.reduceat(hashed, set_starts, axis=1).T
+        start = stop
+
+    return signatures
+
+
+def cluster_column_values(
+    unique_values: List[Any],
+    min_similarity: float = DEFAULT_CLUSTER_SIMILARITY,
+    bands: int = MINHASH_BANDS,
+    rows: int = MINHASH_ROWS,
+) -> List[int]:
+    """Clusters the near-duplicate values of a column ("Vemula FPC", "vemula fpc." and
+    "Vemla FPC"). The values with the same normalized text are always in the same cluster. The
+    other values are matched with locality-sensitive hashing (MinHash with banding) and the
+    candidates that are at least min_similarity similar (trigram Jaccard) and have the same
+    numbers in them are merged.
+
+    Args:
+        unique_values (List[Any]): The unique values of the column
+        min_similarity (float, optional): The minimum trigram similarity of the values in a cluster. Defaults to DEFAULT_CLUSTER_SIMILARITY.
+        bands (int, optional): The number of bands of the MinHash signatures. Defaults to MINHASH_BANDS.
+        rows (int, optional): The number of rows in each band. Defaults to MINHASH_ROWS.
+
+    Returns:
+        List[int]: The cluster of each value, the clusters are numbered from 0 in the order of
+        their first value
+    """
+    # The values with the same normalized text share a key
+    key_ids: Dict[str, int] = {}
+    value_keys = []
+    for value in unique_values:
+        value_keys.append(key_ids.setdefault(normalize_text(value), len(key_ids)))
+    keys = list(key_ids.keys())
+
+    parents = list(range(len(keys)))
+
+    def find(key_id):
+        while parents[key_id] != key_id:
+            parents[key_id] = parents[parents[key_id]]
+            key_id = parents[key_id]
+        return key_id
+
+    key_grams = [trigrams(key) for key in keys]
+    key_numbers = [text_numbers(key) for key in keys]
+    hashed_keys = [key_id for key_id, grams in enumerate(key_grams) if len(grams) > 0]
+
+    if len(hashed_keys) > 1:
+        signatures = minhash_signatures(
+            [key_grams[key_id] for key_id in hashed_keys], bands * rows
+        )
+        for band in range(bands):
+            band_signatures = signatures[:, band * rows : (band + 1) * rows]
+            # Every key of a bucket is only compared with the first key of the bucket, so a
+            # bucket costs one comparison per key
+            bucket_leaders: Dict[bytes, int] = {}
+            for position, key_id in enumerate(hashed_keys):
+                bucket = band_signatures[position].tobytes()
+                leader_id = bucket_leaders.setdefault(bucket, key_id)
+                if leader_id == key_id or find(leader_id) == find(key_id):
+                    continue
+                if key_numbers[leader_id] != key_numbers[key_id]:
+                    continue
+                shared = len(key_grams[leader_id] & key_grams[key_id])
+                similarity = shared / (
+                    len(key_grams[leader_id]) + len(key_grams[key_id]) - shared
+                )
+                if similarity >= min_similarity:
+                    parents[find(key_id)] = find(leader_id)
+
+    cluster_ids: Dict[int, int] = {}
+    return [
+        cluster_ids.setdefault(find(key_id), len(cluster_ids)) for key_id in value_keys
+    ]
+
+
+def collapse_cluster_rows(
+    human_entry_df: pd.DataFrame,
+    column_value_counts: Optional[Dict[str, Dict[str, int]]] = None,
+    value_households: Optional[Dict[str, pd.DataFrame]] = None,
+) -> pd.DataFrame:
+    """Keeps one row per cluster of the human entry dataframe, the most common value of the
+    cluster (the first one when the counts aren't known). All the values of the cluster are
+    listed (as json) in the cluster_values column so the decision can be applied to them. The
+    occurrence_count and household_count columns are the totals of the cluster.
+
+    Args:
+        human_entry_df (pd.DataFrame): The human entry dataframe with a cluster_id column
+        column_value_counts (Optional[Dict[str, Dict[str, int]]], optional): The number of rows for each unique value of each column. Defaults to None.
+        value_households (Optional[Dict[str, pd.DataFrame]], optional): The distinct (value, hhid) pairs of each column, used for the household_count of the clusters. Defaults to None.
+
+    Returns:
+        pd.DataFrame: The collapsed human entry dataframe
+    """
+    rows = human_entry_df.to_dict("records")
+    cluster_values: Dict[Any, List[Any]] = {}
+    representatives: Dict[Any, int] = {}
+    # The cluster shows up in all the data files of its values (merged workbooks)
+    cluster_sources: Dict[Any, Dict[str, None]] = {}
+    cluster_occurrences: Dict[Any, int] = {}
+    for position, row in enumerate(rows):
+        cluster_key = (row["column_name"], row["cluster_id"])
+        cluster_values.setdefault(cluster_key, []).append(row["unique_value"])
+        if "source_files" in row:
+            cluster_sources.setdefault(cluster_key, {}).update(
+                dict.fromkeys(json.loads(row["source_files"]))
+            )
+        if "occurrence_count" in row and not pd.isna(row["occurrence_count"]):
+            cluster_occurrences[cluster_key] = (
+                cluster_occurrences.get(cluster_key, 0) + row["occurrence_count"]
+            )
+
+        value_counts = (
+            {}
+            if column_value_counts is None
+            else column_value_counts.get(row["column_name"], {})
+        )
+        best_position = representatives.get(cluster_key)
+        if best_position is None or value_counts.get(
+            row["unique_value"], 0
+        ) > value_counts.get(rows[best_position]["unique_value"], 0):
+            representatives[cluster_key] = position
+
+    cluster_households = _count_cluster_households(rows, value_households)
+
+    collapsed_rows = []
+    for cluster_key, position in representatives.items():
+        collapsed_row = {
+            **rows[position],
+            "cluster_values": json.dumps(cluster_values[cluster_key]),
+        }
+        if cluster_key in cluster_occurrences:
+            collapsed_row["occurrence_count"] = cluster_occurrences[cluster_key]
+        if cluster_key in cluster_households:
+            collapsed_row["household_count"] = cluster_households[cluster_key]
+        if cluster_key in cluster_sources:
+            collapsed_row["source_files"] = json.dumps(
+                list(cluster_sources[cluster_key])
+            )
+        collapsed_rows.append(collapsed_row)
+
+    logger.info(
+        "Collapsed %d values into %d clusters in the workbook",
+        len(rows),
+        len(collapsed_rows),
+    )
+    return pd.DataFrame(
+        collapsed_rows, columns=human_entry_df.columns.tolist() + ["cluster_values"]
+    )
+
+
+def _count_cluster_households(
+    rows: List[Dict[str, Any]], value_households: Optional[Dict[str, pd.DataFrame]]
+) -> Dict[Any, int]:
+    # A household with many values of a cluster is counted once
+    if value_households is None:
+        return {}
+
+    column_value_clusters: Dict[Any, Dict[Any, Any]] = {}
+    for row in rows:
+        column_value_clusters.setdefault(row["column_name"], {})[
+            row["unique_value"]
+        ] = row["cluster_id"]
+
+    cluster_households = {}
+    for col, households in value_households.items():
+        clusters = households["value"].map(column_value_clusters.get(col, {}))
+        counts = households["hhid"].groupby(clusters).nunique()
+        for cluster_id, count in counts.items():
+            cluster_households[(col, cluster_id)] = int(count)
+    return cluster_households
+
+
+def _has_decision(row: Dict[str, Any], decision_columns: List[str]) -> bool:
+    for column_name in decision_columns:
+        value = row[column_name]
+        if column_name == "delete_value":
+            if value is True:
+                return True
+        elif not pd.isna(value):
+            return True
+    return False
+
+
+def _same_decision(decision: Dict[str, Any], other_decision: Dict[str, Any]) -> bool:
+    # The empty cells of both decisions are the same
+    for column_name, value in decision.items():
+        other_value = other_decision[column_name]
+        if pd.isna(value) and pd.isna(other_value):
+            continue
+        if pd.isna(value) or pd.isna(other_value) or value != other_value:
+            return False
+    return True
+
+
+def expand_cluster_decisions(
+    human_entry_df: pd.DataFrame,
+    new_column_name_columns: List[str],
+    new_column_value_columns: List[str],
+    delete_column_value_columns: List[str],
+    fill_undecided: bool = True,
+) -> pd.DataFrame:
+    """Applies the decision made on one value of a cluster to the whole cluster.
+
+    The rows of a collapsed workbook (cluster_values column) are expanded back into a row for
+    every value of the cluster. Then, within each column and cluster_id, the rows without a
+    decision (replacement, deletion or followup update) get the decision of the rows of the
+    cluster that have one. The rows that have their own decision keep it. When the decided
+    rows of a cluster don't agree, the rows without a decision are left alone.
+
+    Args:
+        human_entry_df (pd.DataFrame): The (stripped) human entry dataframe
+        new_column_name_columns (List[str]): A list of the new column name columns
+        new_column_value_columns (List[str]): A list of the new column value columns
+        delete_column_value_columns (List[str]): A list of the delete column value columns
+        fill_undecided (bool, optional): Give the rows without a decision the decision of their cluster (the collapsed rows are expanded either way). Defaults to True.
+
+    Returns:
+        pd.DataFrame: The human entry dataframe with the cluster decisions filled out
+    """
+    if "cluster_values" in human_entry_df.columns:
+        rows = []
+        for row in human_entry_df.to_dict("records"):
+            if pd.isna(row["cluster_values"]):
+                rows.append(row)
+                continue
+            cluster_values = json.loads(row["cluster_values"])
+            if row["unique_value"] not in cluster_values:
+                cluster_values.insert(0, row["unique_value"])
+            for value in cluster_values:
+                rows.append({**row, "unique_value": value})
+        human_entry_df = pd.DataFrame(rows, columns=human_entry_df.columns)
+        logger.info("Expanded the clusters into %d values", len(human_entry_df))
+
+    if not fill_undecided or "cluster_id" not in human_entry_df.columns:
+        return human_entry_df
+
+    decision_columns = (
+        DECISION_COLUMNS
+        + new_column_name_columns
+        + new_column_value_columns
+        + delete_column_value_columns
+    )
+
+    rows = human_entry_df.to_dict("records")
+    cluster_decisions: Dict[Any, Optional[Dict[str, Any]]] = {}
+    for row in rows:
+        if pd.isna(row["cluster_id"]) or not _has_decision(row, decision_columns):
+            continue
+        cluster_key = (row["column_name"], row["cluster_id"])
+        decision = {column_name: row[column_name] for column_name in decision_columns}
+        if cluster_key not in cluster_decisions:
+            cluster_decisions[cluster_key] = decision
+            continue
+        other_decision = cluster_decisions[cluster_key]
+        if other_decision is not None and not _same_decision(decision, other_decision):
+            logger.warning(
+                "The values of cluster %s of %s have different decisions, the values "
+                "without a decision are left alone",
+                row["cluster_id"],
+                row["column_name"],
+            )
+            # None marks a cluster with conflicting decisions
+            cluster_decisions[cluster_key] = None
+
+    filled_positions = []
+    for position, row in enumerate(rows):
+        if pd.isna(row["cluster_id"]) or _has_decision(row, decision_columns):
+            continue
+        cluster_decision = cluster_decisions.get(
+            (row["column_name"], row["cluster_id"])
+        )
+        if cluster_decision is None:
+            continue
+        logger.info(
+            "Applying the decision of cluster %s of %s to %s",
+            row["cluster_id"],
+            row["column_name"],
+            row["unique_value"],
+        )
+        filled_positions.append(position)
+        rows[position] = {**row, **cluster_decision}
+
+    if len(filled_positions) == 0:
+        return human_entry_df
+
+    logger.info(
+        "Applying the cluster decisions to %d more values", len(filled_positions)
+    )
+    return pd.DataFrame(rows, columns=human_entry_df.columns)
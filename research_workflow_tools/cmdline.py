@@ -1,13 +1,23 @@
+import logging
 from pathlib import Path
 import traceback
+from typing import Optional, Tuple
 
 import click
 
-from research_workflow_tools.other_entry_handler import (
-    generate_other_entry_workbook,
-    process_other_entry_replacements,
+# The modules that import pandas are imported in the commands, so --help and the argument
+# errors don't wait for them to load
+from research_workflow_tools.options import (
+    APPLY_CHUNKSIZE,
+    BACKENDS,
+    CSV_ENGINES,
+    OUTPUT_FORMATS,
+    STRING_STORAGES,
+    WORKBOOK_FORMATS,
 )
+from research_workflow_tools.profiling import PhaseProfiler, configure_logging
 
+logger = logging.getLogger(__name__)
 
 
 @click.command()
@@ -24,8 +34,116 @@ from research_workflow_tools.other_entry_handler import (
     type=click.Path(exists=True, path_type=Path),
     default=Path("./other_ignore_list.txt"),
 )
-def process_human_entered_fields(data_in: Path, ignore_list: Path):
-    generate_other_entry_workbook(data_in, ignore_list)
+@click.option(
+    "--chunksize",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Read the data file in chunks of this many rows (for files that don't fit in memory)",
+)
+@click.option(
+    "--engine",
+    type=click.Choice(CSV_ENGINES),
+    default=None,
+    help="Parser to use for csv/tsv data files (pyarrow needs the pyarrow package and is not used with --chunksize)",
+)
+@click.option(
+    "--output-format",
+    type=click.Choice(WORKBOOK_FORMATS),
+    default="xlsx",
+    help="Format of the generated workbook (parquet needs the pyarrow package)",
+)
+@click.option(
+    "--output-path",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=Path("./"),
+    help="Folder the workbook is written to",
+)
+@click.option(
+    "--lookup-fields",
+    type=click.Path(exists=True, path_type=Path),
+    default=None,
+    help="JSON dictionary with the valid values of the columns, used to suggest values",
+)
+@click.option(
+    "--no-suggestions",
+    is_flag=True,
+    default=False,
+    help="Leave the suggested_value column empty",
+)
+@click.option(
+    "--no-clusters",
+    is_flag=True,
+    default=False,
+    help="Don't group the near-duplicate values in clusters (cluster_id column)",
+)
+@click.option(
+    "--collapse-clusters",
+    is_flag=True,
+    default=False,
+    help="Write one row per cluster, the decision is applied to all the values of the cluster",
+)
+@click.option(
+    "--min-count",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Leave out the values (clusters) that show up in fewer rows",
+)
+@click.option(
+    "--top-k",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Only write the values (clusters) that show up in the most rows",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    help="Parse the data file again instead of using the parsed copy in .rwt_cache/",
+)
+@click.option(
+    "-v",
+    "--verbose",
+    count=True,
+    help="Show the summaries of the steps (-v) and the messages of every suggestion row (-vv), by default only the warnings and the errors are shown",
+)
+def process_human_entered_fields(
+    data_in: Path,
+    ignore_list: Path,
+    chunksize: Optional[int],
+    engine: Optional[str],
+    output_format: str,
+    output_path: Path,
+    no_cache: bool,
+    lookup_fields: Optional[Path],
+    no_suggestions: bool,
+    no_clusters: bool,
+    collapse_clusters: bool,
+    min_count: int,
+    top_k: Optional[int],
+    verbose: int,
+):
+    """Generates the suggestions workbook with the unique values of the human entered fields of DATA_IN"""
+    from research_workflow_tools.cache import DatasetCache
+    from research_workflow_tools.other_entry_handler import (
+        generate_other_entry_workbook,
+    )
+
+    configure_logging(verbose)
+    generate_other_entry_workbook(
+        data_in,
+        ignore_list,
+        output_path=output_path,
+        chunksize=chunksize,
+        engine=engine,
+        output_format=output_format,
+        cache=None if no_cache else DatasetCache(),
+        lookup_fields_path=lookup_fields,
+        suggest=not no_suggestions,
+        cluster=not no_clusters,
+        collapse_clusters=collapse_clusters,
+        min_count=min_count,
+        top_k=top_k,
+    )
 
 
 @click.command()
@@ -49,7 +167,426 @@ def process_human_entered_fields(data_in: Path, ignore_list: Path):
     type=click.Path(exists=True, path_type=Path),
     default=Path("./lookup_fields.json"),
 )
+@click.option(
+    "--chunksize",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Read the data file in chunks of this many rows (for files that don't fit in memory)",
+)
+@click.option(
+    "--engine",
+    type=click.Choice(CSV_ENGINES),
+    default=None,
+    help="Parser to use for csv/tsv data files (pyarrow needs the pyarrow package and is not used with --chunksize)",
+)
+@click.option(
+    "--output-format",
+    type=click.Choice(OUTPUT_FORMATS),
+    default="tsv",
+    help="Format of the generated table (parquet needs the pyarrow package)",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of processes that apply the independent groups of suggestions",
+)
+@click.option(
+    "--string-storage",
+    type=click.Choice(STRING_STORAGES),
+    default="object",
+    help="How the cleaned columns are kept in memory (category stores every unique value once, for columns with many repeated answers)",
+)
+@click.option(
+    "--backend",
+    type=click.Choice(BACKENDS),
+    default="pandas",
+    help="Where the suggestions are applied (sqlite copies the data file to a temporary database on disk, for files that don't fit in memory)",
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    default=False,
+    help="Only apply the suggestions that changed since the previous run of the suggestions file",
+)
+@click.option(
+    "--no-validation",
+    is_flag=True,
+    default=False,
+    help="Don't check the replacement values against the input dictionary",
+)
+@click.option(
+    "--no-cluster-expansion",
+    is_flag=True,
+    default=False,
+    help="Only apply the decisions that are filled out, instead of applying them to the values of the same cluster (cluster_id column) that have none",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    help="Parse the data file again instead of using the parsed copy in .rwt_cache/",
+)
+@click.option(
+    "-v",
+    "--verbose",
+    count=True,
+    help="Show the summaries of the steps (-v) and the messages of every suggestion row (-vv), by default only the warnings and the errors are shown",
+)
+@click.option(
+    "--profile",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="Write the time, the peak memory and the rows and cells of each phase to this json file",
+)
 def process_human_suggesstions(
-    data_in: Path, replacement_list: Path, input_dictionary: Path
+    data_in: Path,
+    replacement_list: Path,
+    input_dictionary: Path,
+    chunksize: Optional[int],
+    engine: Optional[str],
+    output_format: str,
+    no_cache: bool,
+    incremental: bool,
+    workers: int,
+    string_storage: str,
+    backend: str,
+    no_validation: bool,
+    no_cluster_expansion: bool,
+    verbose: int,
+    profile: Optional[Path],
+):
+    """Applies REPLACEMENT_LIST to DATA_IN and writes the patch file and the others diff"""
+    from research_workflow_tools.cache import DatasetCache
+    from research_workflow_tools.other_entry_handler import (
+        process_other_entry_replacements,
+    )
+    from research_workflow_tools.validation import SuggestionsValidationError
+
+    configure_logging(verbose)
+    profiler = PhaseProfiler() if profile is not None else None
+    try:
+        process_other_entry_replacements(
+            data_in,
+            replacement_list,
+            input_dictionary,
+            chunksize=chunksize,
+            engine=engine,
+            output_format=output_format,
+            cache=None if no_cache else DatasetCache(),
+            incremental=incremental,
+            workers=workers,
+            validate=not no_validation,
+            profiler=profiler,
+            string_storage=string_storage,
+            backend=backend,
+            cluster_expansion=not no_cluster_expansion,
+        )
+    except SuggestionsValidationError as e:
+        logger.error("%s", e.report)
+        logger.error("Exiting, Please check the entries in the human entry file")
+        exit(1)
+    if profiler is not None and profile is not None:
+        profiler.write(profile)
+
+
+@click.command()
+@click.argument("datasets", nargs=-1, required=True)
+@click.option(
+    "--ignore-list",
+    type=click.Path(exists=True, path_type=Path),
+    default=Path("./other_ignore_list.txt"),
+    help="File with the columns to ignore (one per line)",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of data files read at the same time",
+)
+@click.option(
+    "--chunksize",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Read the data files in chunks of this many rows (for files that don't fit in memory)",
+)
+@click.option(
+    "--engine",
+    type=click.Choice(CSV_ENGINES),
+    default=None,
+    help="Parser to use for csv/tsv data files (pyarrow needs the pyarrow package and is not used with --chunksize)",
+)
+@click.option(
+    "--output-format",
+    type=click.Choice(WORKBOOK_FORMATS),
+    default="xlsx",
+    help="Format of the generated workbook (parquet needs the pyarrow package)",
+)
+@click.option(
+    "--output-path",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=Path("./"),
+    help="Folder the workbook is written to",
+)
+@click.option(
+    "--lookup-fields",
+    type=click.Path(exists=True, path_type=Path),
+    default=None,
+    help="JSON dictionary with the valid values of the columns, used to suggest values",
+)
+@click.option(
+    "--no-suggestions",
+    is_flag=True,
+    default=False,
+    help="Leave the suggested_value column empty",
+)
+@click.option(
+    "--no-clusters",
+    is_flag=True,
+    default=False,
+    help="Don't group the near-duplicate values in clusters (cluster_id column)",
+)
+@click.option(
+    "--collapse-clusters",
+    is_flag=True,
+    default=False,
+    help="Write one row per cluster, the decision is applied to all the values of the cluster",
+)
+@click.option(
+    "--min-count",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Leave out the values (clusters) that show up in fewer rows",
+)
+@click.option(
+    "--top-k",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Only write the values (clusters) that show up in the most rows",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    help="Parse the data files again instead of using the parsed copies in .rwt_cache/",
+)
+@click.option(
+    "-v",
+    "--verbose",
+    count=True,
+    help="Show the summaries of the steps (-v) and the messages of every suggestion row (-vv), by default only the warnings and the errors are shown",
+)
+def process_human_entered_fields_batch(
+    datasets: Tuple[str, ...],
+    ignore_list: Path,
+    workers: int,
+    chunksize: Optional[int],
+    engine: Optional[str],
+    output_format: str,
+    output_path: Path,
+    lookup_fields: Optional[Path],
+    no_suggestions: bool,
+    no_clusters: bool,
+    collapse_clusters: bool,
+    min_count: int,
+    top_k: Optional[int],
+    no_cache: bool,
+    verbose: int,
 ):
-    process_other_entry_replacements(data_in, replacement_list, input_dictionary)
+    """Generates one workbook with the unique values of all the data files in DATASETS (files, folders or glob patterns)"""
+    from research_workflow_tools.batch import find_datasets
+    from research_workflow_tools.cache import DatasetCache
+    from research_workflow_tools.other_entry_handler import (
+        generate_other_entry_workbook,
+    )
+
+    configure_logging(verbose)
+    data_in_paths = find_datasets(list(datasets))
+    if len(data_in_paths) == 0:
+        logger.error("No data files found")
+        exit(1)
+
+    generate_other_entry_workbook(
+        data_in_paths,
+        ignore_list,
+        output_path=output_path,
+        chunksize=chunksize,
+        engine=engine,
+        output_format=output_format,
+        cache=None if no_cache else DatasetCache(),
+        lookup_fields_path=lookup_fields,
+        suggest=not no_suggestions,
+        cluster=not no_clusters,
+        collapse_clusters=collapse_clusters,
+        min_count=min_count,
+        top_k=top_k,
+        workers=workers,
+    )
+
+
+@click.command()
+@click.argument(
+    "replacement_list",
+    nargs=1,
+    required=True,
+    type=click.Path(exists=True, path_type=Path),
+)
+@click.argument("datasets", nargs=-1, required=True)
+@click.option(
+    "--input-dictionary",
+    type=click.Path(path_type=Path),
+    default=Path("./lookup_fields.json"),
+    help="JSON dictionary with the valid values of the columns",
+)
+@click.option(
+    "--output-path",
+    type=click.Path(file_okay=False, path_type=Path),
+    default=Path("./"),
+    help="Folder for the patch files (one sub folder per data file) and the batch manifest",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of data files processed at the same time",
+)
+@click.option(
+    "--chunksize",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Read the data files in chunks of this many rows (for files that don't fit in memory)",
+)
+@click.option(
+    "--engine",
+    type=click.Choice(CSV_ENGINES),
+    default=None,
+    help="Parser to use for csv/tsv data files (pyarrow needs the pyarrow package and is not used with --chunksize)",
+)
+@click.option(
+    "--output-format",
+    type=click.Choice(OUTPUT_FORMATS),
+    default="tsv",
+    help="Format of the generated table (parquet needs the pyarrow package)",
+)
+@click.option(
+    "--no-validation",
+    is_flag=True,
+    default=False,
+    help="Don't check the replacement values against the input dictionary",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    help="Parse the data files again instead of using the parsed copies in .rwt_cache/",
+)
+@click.option(
+    "--string-storage",
+    type=click.Choice(STRING_STORAGES),
+    default="object",
+    help="How the cleaned columns are kept in memory (category stores every unique value once, for columns with many repeated answers)",
+)
+@click.option(
+    "-v",
+    "--verbose",
+    count=True,
+    help="Show the summaries of the steps (-v) and the messages of every suggestion row (-vv), by default only the warnings and the errors are shown",
+)
+def process_human_suggestions_batch(
+    replacement_list: Path,
+    datasets: Tuple[str, ...],
+    input_dictionary: Path,
+    output_path: Path,
+    workers: int,
+    chunksize: Optional[int],
+    engine: Optional[str],
+    output_format: str,
+    no_validation: bool,
+    no_cache: bool,
+    string_storage: str,
+    verbose: int,
+):
+    """Applies REPLACEMENT_LIST to every data file in DATASETS (files, folders or glob patterns)"""
+    from research_workflow_tools.batch import find_datasets, process_other_entry_batch
+
+    configure_logging(verbose)
+    data_in_paths = find_datasets(list(datasets))
+    if len(data_in_paths) == 0:
+        logger.error("No data files found")
+        exit(1)
+
+    manifest_path = process_other_entry_batch(
+        data_in_paths,
+        replacement_list,
+        input_dictionary,
+        output_path=output_path,
+        workers=workers,
+        chunksize=chunksize,
+        engine=engine,
+        output_format=output_format,
+        use_cache=not no_cache,
+        validate=not no_validation,
+        string_storage=string_storage,
+    )
+    logger.info("Batch manifest: %s", manifest_path)
+
+
+@click.command()
+@click.argument(
+    "data_in",
+    nargs=1,
+    required=True,
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+)
+@click.argument(
+    "patch_file",
+    nargs=1,
+    required=True,
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+)
+@click.argument(
+    "data_out",
+    nargs=1,
+    required=True,
+    type=click.Path(dir_okay=False, path_type=Path),
+)
+@click.option(
+    "--chunksize",
+    type=click.IntRange(min=1),
+    default=APPLY_CHUNKSIZE,
+    help="Number of rows of the data file that are patched at a time",
+)
+@click.option(
+    "-v",
+    "--verbose",
+    count=True,
+    help="Show the summaries of the steps (-v) and the targets of the patches that didn't match a row (-vv), by default only the warnings and the errors are shown",
+)
+def apply_patch(
+    data_in: Path,
+    patch_file: Path,
+    data_out: Path,
+    chunksize: int,
+    verbose: int,
+):
+    """Applies PATCH_FILE to DATA_IN (csv or tsv) and writes the new version to DATA_OUT"""
+    from research_workflow_tools.patching import apply_patch_file
+
+    configure_logging(verbose)
+    try:
+        apply_patch_file(data_in, patch_file, data_out, chunksize=chunksize)
+    except (ValueError, KeyError) as e:
+        logger.error("%s", e.args[0])
+        exit(1)
+
+
+@click.group()
+def rwt():
+    """Research workflow tools, every command can also be run as its own script"""
+
+
+rwt.add_command(process_human_entered_fields, "generate-others-suggestions")
+rwt.add_command(process_human_entered_fields_batch, "generate-others-suggestions-batch")
+rwt.add_command(process_human_suggesstions, "process-others-suggestions")
+rwt.add_command(process_human_suggestions_batch, "process-others-suggestions-batch")
+rwt.add_command(apply_patch, "apply-others-patch")
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import logging
+import pickle
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from research_workflow_tools.cache import CACHE_DIR
+from research_workflow_tools.changes import CellChanges
+from research_workflow_tools.suggestion_groups import (
+    GroupEffects,
+    compute_group_effects,
+    find_suggestion_groups,
+)
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout of the saved state changes, the old states are then ignored
+STATE_VERSION = 2
+
+
+def get_incremental_state_path(
+    data_in_path: Path, human_suggestions_path: Path, state_dir: Path = CACHE_DIR
+) -> Path:
+    """Gets the path of the file that keeps the effects of the previous run of the suggestions
+    file against the data file. Editing the data file starts a new state.
+
+    Args:
+        data_in_path (Path): Path of the data file
+        human_suggestions_path (Path): Path of the human entry suggestions file
+        state_dir (Path, optional): The folder where the states are kept. Defaults to CACHE_DIR.
+
+    Returns:
+        Path: Path of the state file
+    """
+    stat = data_in_path.stat()
+    key_parts = {
+        "data": str(data_in_path.resolve()),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+        "suggestions": str(human_suggestions_path.resolve()),
+    }
+    key = hashlib.sha1(json.dumps(key_parts, sort_keys=True).encode("utf-8"))
+    return state_dir / f"incremental_{key.hexdigest()}.pkl"
+
+
+def _row_hash(row: Dict[str, Any]) -> str:
+    normalized_row = {
+        column_name: None if pd.isna(value) else repr(value)
+        for column_name, value in row.items()
+    }
+    return hashlib.sha1(
+        json.dumps(normalized_row, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def apply_incremental_replacements(
+    data_frame: pd.DataFrame,
+    human_entry_df: pd.DataFrame,
+    new_column_name_columns: List[str],
+    new_column_value_columns: List[str],
+    delete_column_value_columns: List[str],
+    state_path: Path,
+    changes: Optional[CellChanges] = None,
+    workers: int = 1,
+) -> Tuple[List[Any], List[str]]:
+    """Applies the suggestions to the data frame reusing the effects of the previous run of the
+    suggestions file. The suggestions are split into groups that touch disjoint columns (see
+    find_suggestion_groups) and only the groups that have a changed, added or removed row are
+    applied again, the others write the changes they made last time.
+
+    Args:
+        data_frame (pd.DataFrame): The (stripped) data frame to update (updated in place)
+        human_entry_df (pd.DataFrame): The (stripped) human entry dataframe
+        new_column_name_columns (List[str]): A list of the new column name columns
+        new_column_value_columns (List[str]): A list of the new column value columns
+        delete_column_value_columns (List[str]): A list of the delete column value columns
+        state_path (Path): Path of the file with the effects of the previous run
+        changes (Optional[CellChanges], optional): Records the cells that are written to. Defaults to None.
+        workers (int, optional): The number of processes that apply the changed groups. Defaults to 1.
+
+    Returns:
+        Tuple[List[Any], List[str]]: The hhids that need to be edited and the columns that had values deleted
+    """
+    previous_effects: Dict[str, GroupEffects] = {}
+    if state_path.exists():
+        try:
+            with open(state_path, "rb") as file_ptr:
+                state = pickle.load(file_ptr)
+            if state["version"] == STATE_VERSION:
+                previous_effects = state["groups"]
+        except Exception as e:
+            logger.warning(
+                "Unable to read the previous run from %s, ignoring it: %s",
+                state_path,
+                e,
+            )
+
+    row_hashes = [_row_hash(row) for row in human_entry_df.to_dict("records")]
+    groups = find_suggestion_groups(
+        human_entry_df, new_column_name_columns, delete_column_value_columns
+    )
+
+    group_keys = [
+        hashlib.sha1(
+            "".join(row_hashes[position] for position in group).encode("utf-8")
+        ).hexdigest()
+        for group in groups
+    ]
+    changed_groups = [
+        group
+        for group, group_key in zip(groups, group_keys)
+        if group_key not in previous_effects
+    ]
+
+    # All the groups are computed against the data frame before any of them is written
+    computed_effects = iter(
+        compute_group_effects(
+            data_frame,
+            [human_entry_df.iloc[group] for group in changed_groups],
+            new_column_name_columns,
+            new_column_value_columns,
+            delete_column_value_columns,
+            workers=workers,
+        )
+    )
+    group_effects: Dict[str, GroupEffects] = {}
+    for group_key in group_keys:
+        if group_key in previous_effects:
+            group_effects[group_key] = previous_effects[group_key]
+        else:
+            group_effects[group_key] = next(computed_effects)
+
+    reused_count = len(set(group_effects) & set(previous_effects))
+    logger.info(
+        "Reusing %d of %d suggestion groups from the previous run",
+        reused_count,
+        len(groups),
+    )
+
+    edit_hhids = []
+    to_delete_columns = []
+    for effects in group_effects.values():
+        effects.apply(data_frame, changes)
+        edit_hhids += effects.edit_hhids
+        to_delete_columns += effects.to_delete_columns
+
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(state_path, "wb") as file_ptr:
+        pickle.dump({"version": STATE_VERSION, "groups": group_effects}, file_ptr)
+
+    return edit_hhids, to_delete_columns
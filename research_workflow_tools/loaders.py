@@ -0,0 +1,456 @@
+import importlib.util
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# The columns that identify a row, they are always loaded
+ID_COLUMNS = ["hhid", "redcap_event_name"]
+
+# The columnar (Arrow) file formats, they need the pyarrow package
+PARQUET_SUFFIXES = [".parquet", ".pq"]
+FEATHER_SUFFIXES = [".feather", ".arrow"]
+
+# The data files that can be loaded
+DATA_FILE_SUFFIXES = [".csv", ".tsv", ".xlsx"] + PARQUET_SUFFIXES + FEATHER_SUFFIXES
+
+# The columns of the suggestions sheet that are used to apply it, the other columns of an xlsx
+# sheet (suggested_value, the counts, source_files, ...) are not parsed
+SUGGESTION_COLUMNS = [
+    "column_name",
+    "unique_value",
+    "cluster_id",
+    "cluster_values",
+    "replacement_value",
+    "delete_value",
+]
+SUGGESTION_COLUMN_PREFIXES = (
+    "new_column_name",
+    "new_column_value",
+    "delete_column_value",
+)
+
+# The values openpyxl gives for the error cells (#N/A, #DIV/0!, ...), they are missing values
+_EXCEL_ERROR_VALUES = {
+    "#NULL!",
+    "#DIV/0!",
+    "#VALUE!",
+    "#REF!",
+    "#NAME?",
+    "#NUM!",
+    "#N/A",
+}
+
+
+def is_arrow_file(data_in_path: Path) -> bool:
+    """Checks if the file is a Parquet or a Feather (Arrow IPC) file
+
+    Args:
+        data_in_path (Path): Path of the file
+
+    Returns:
+        bool: True if the file is a Parquet or a Feather file
+    """
+    return data_in_path.suffix in PARQUET_SUFFIXES + FEATHER_SUFFIXES
+
+
+def _read_arrow_table(data_in_path: Path, columns: Optional[List[str]] = None):
+    """Reads a Parquet or a Feather file into an Arrow table. The file is memory-mapped and only
+    the columns that are asked for are read.
+
+    Args:
+        data_in_path (Path): Path of the file
+        columns (Optional[List[str]], optional): Only read these columns. Defaults to None.
+
+    Returns:
+        pyarrow.Table: The Arrow table
+    """
+    if data_in_path.suffix in PARQUET_SUFFIXES:
+        import pyarrow.parquet as pq
+
+        return pq.read_table(data_in_path, columns=columns, memory_map=True)
+
+    import pyarrow.feather as feather
+
+    return feather.read_table(data_in_path, columns=columns, memory_map=True)
+
+
+def has_calamine() -> bool:
+    """Checks if the python-calamine package is installed, pandas can use it to read xlsx files
+    many times faster than openpyxl
+
+    Returns:
+        bool: True if it's installed
+    """
+    return importlib.util.find_spec("python_calamine") is not None
+
+
+def _convert_excel_value(value: Any) -> Any:
+    # Same as the openpyxl reader of pandas: empty cells are "", whole floats are ints and the
+    # error cells are missing
+    if value is None:
+        return ""
+    if type(value) == float and value.is_integer():
+        return int(value)
+    if type(value) == str and value in _EXCEL_ERROR_VALUES:
+        return np.nan
+    return value
+
+
+def _trim_excel_row(row: List[Any]) -> List[Any]:
+    while row and row[-1] == "":
+        row.pop()
+    return row
+
+
+def read_excel_file(
+    data_in_path: Path,
+    usecols: Optional[Union[List[str], Callable[[Any], bool]]] = None,
+    dtype: Optional[Any] = None,
+    nrows: Optional[int] = None,
+) -> pd.DataFrame:
+    """Reads the first sheet of an xlsx file, the result is the same as pd.read_excel.
+
+    pandas uses python-calamine when it's installed. Otherwise the sheet is parsed with a
+    read-only openpyxl workbook that only gives the values of the cells (no cell objects) and only
+    the columns in usecols are converted.
+
+    Args:
+        data_in_path (Path): Path of the xlsx file
+        usecols (Optional[Union[List[str], Callable[[Any], bool]]], optional): Only load these columns (or the columns the function returns True for). Defaults to None.
+        dtype (Optional[Any], optional): The dtypes to pass to the parser. Defaults to None.
+        nrows (Optional[int], optional): Only read this many rows. Defaults to None.
+
+    Returns:
+        pd.DataFrame: The data frame
+    """
+    if has_calamine():
+        return pd.read_excel(
+            data_in_path, usecols=usecols, dtype=dtype, nrows=nrows, engine="calamine"
+        )
+
+    from openpyxl import load_workbook
+    from pandas.io.parsers import TextParser
+
+    workbook = load_workbook(data_in_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        sheet.reset_dimensions()
+        rows = sheet.iter_rows(values_only=True)
+        header = _trim_excel_row(
+            [_convert_excel_value(value) for value in next(rows, ())]
+        )
+
+        # Without usecols all the cells are loaded (the cells past the header become Unnamed
+        # columns like in pandas)
+        positions = None
+        if callable(usecols):
+            positions = [
+                position
+                for position, column_name in enumerate(header)
+                if usecols(column_name)
+            ]
+        elif usecols is not None:
+            wanted_columns = set(usecols)
+            positions = [
+                position
+                for position, column_name in enumerate(header)
+                if column_name in wanted_columns
+            ]
+
+        data = [header if positions is None else [header[i] for i in positions]]
+        last_row_with_data = 0
+        for row in rows:
+            if nrows is not None and len(data) > nrows:
+                break
+            if positions is None:
+                data.append(
+                    _trim_excel_row([_convert_excel_value(value) for value in row])
+                )
+            else:
+                data.append(
+                    [
+                        _convert_excel_value(row[i]) if i < len(row) else ""
+                        for i in positions
+                    ]
+                )
+            # The empty rows at the end of the sheet are dropped (a row only counts as empty
+            # when all of its cells are, not only the loaded ones)
+            if any(value is not None and value != "" for value in row):
+                last_row_with_data = len(data) - 1
+    finally:
+        workbook.close()
+
+    data = data[: last_row_with_data + 1]
+    width = max(len(data_row) for data_row in data)
+    data = [data_row + [""] * (width - len(data_row)) for data_row in data]
+    return TextParser(
+        data,
+        header=0,
+        dtype=dtype,
+        usecols=usecols,
+        skip_blank_lines=False,
+    ).read()
+
+
+def _get_separator(data_in_path: Path) -> str:
+    if data_in_path.suffix == ".csv":
+        return ","
+    elif data_in_path.suffix == ".tsv":
+        return "\t"
+
+    logger.error("Unknown file extension")
+    exit(1)
+
+
+def read_header(data_in_path: Path) -> List[str]:
+    """Reads the column names of the data file without parsing any of the rows
+
+    Args:
+        data_in_path (Path): Path of the data file
+
+    Returns:
+        List[str]: The column names
+    """
+    if data_in_path.suffix == ".xlsx":
+        return read_excel_file(data_in_path, nrows=0).columns.tolist()
+    elif data_in_path.suffix in PARQUET_SUFFIXES:
+        import pyarrow.parquet as pq
+
+        return pq.read_schema(data_in_path, memory_map=True).names
+    elif data_in_path.suffix in FEATHER_SUFFIXES:
+        import pyarrow.ipc as ipc
+
+        with ipc.open_file(data_in_path) as reader:
+            return reader.schema.names
+
+    return pd.read_csv(
+        data_in_path, sep=_get_separator(data_in_path), nrows=0
+    ).columns.tolist()
+
+
+def get_workbook_columns(header: List[str], ignore_list: List[str]) -> List[str]:
+    """Gets the columns that need to be loaded to generate the workbook, i.e. the id columns and
+    all the columns that are not in the ignore list
+
+    Args:
+        header (List[str]): The column names of the data file
+        ignore_list (List[str]): The columns to ignore
+
+    Returns:
+        List[str]: The columns to load
+    """
+    return [col for col in header if col in ID_COLUMNS or col not in ignore_list]
+
+
+def get_replacement_columns(
+    header: List[str],
+    human_entry_df: pd.DataFrame,
+    new_column_name_columns: List[str],
+    delete_column_value_columns: List[str],
+) -> List[str]:
+    """Gets the columns that need to be loaded to apply the suggestions, i.e. the id columns, the
+    columns that get cleaned (column_name) and the columns the suggestions write to
+    (new_column_name* and delete_column_value*)
+
+    Args:
+        header (List[str]): The column names of the data file
+        human_entry_df (pd.DataFrame): The human entry dataframe
+        new_column_name_columns (List[str]): A list of the new column name columns
+        delete_column_value_columns (List[str]): A list of the delete column value columns
+
+    Returns:
+        List[str]: The columns to load (in the order of the data file)
+    """
+    needed_columns = set(ID_COLUMNS)
+    for column_name in (
+        ["column_name"] + new_column_name_columns + delete_column_value_columns
+    ):
+        needed_columns |= set(human_entry_df[column_name].dropna().tolist())
+
+    return [col for col in header if col in needed_columns]
+
+
+def apply_string_storage(
+    data_frame: pd.DataFrame, columns: List[str], string_storage: str = "object"
+) -> None:
+    """Stores the text columns among the given columns as categories when string_storage is
+    "category", the columns keep the dtypes they were inferred with (numbers stay numbers)
+
+    Args:
+        data_frame (pd.DataFrame): The data frame to update (updated in place)
+        columns (List[str]): The columns that get cleaned
+        string_storage (str, optional): "object" or "category" (see options.STRING_STORAGES). Defaults to "object".
+    """
+    if string_storage != "category":
+        return
+    for col in columns:
+        if col in data_frame.columns and data_frame[col].dtype == "object":
+            data_frame[col] = data_frame[col].astype("category")
+
+
+def load_data_file(
+    data_in_path: Path,
+    usecols: Optional[List[str]] = None,
+    dtype: Optional[Dict[str, Any]] = None,
+    engine: Optional[str] = None,
+) -> pd.DataFrame:
+    """Loads the data file into a dataframe based on the file extension
+
+    Args:
+        data_in_path (Path): Path of the data file
+        usecols (Optional[List[str]], optional): Only load these columns. Defaults to None.
+        dtype (Optional[Dict[str, Any]], optional): The dtypes of the columns. Defaults to None.
+        engine (Optional[str], optional): The parser to use for csv/tsv files ("c" or "pyarrow"). Defaults to None.
+
+    Returns:
+        pd.DataFrame: The data frame
+    """
+    if data_in_path.suffix == ".xlsx":
+        return read_excel_file(data_in_path, usecols=usecols, dtype=dtype)
+    elif is_arrow_file(data_in_path):
+        # The columns keep the types they were stored with
+        return _read_arrow_table(data_in_path, columns=usecols).to_pandas()
+
+    return pd.read_csv(
+        data_in_path,
+        sep=_get_separator(data_in_path),
+        usecols=usecols,
+        dtype=dtype,
+        engine=engine,
+    )
+
+
+def read_data_chunks(
+    data_in_path: Path,
+    chunksize: int,
+    usecols: Optional[List[str]] = None,
+    dtype: Optional[Any] = None,
+) -> Iterator[pd.DataFrame]:
+    """Reads the data file in chunks of rows
+
+    Args:
+        data_in_path (Path): Path of the data file
+        chunksize (int): Number of rows in each chunk
+        usecols (Optional[List[str]], optional): Only load these columns. Defaults to None.
+        dtype (Optional[Any], optional): The dtypes to pass to the reader. Defaults to None.
+
+    Yields:
+        Iterator[pd.DataFrame]: The chunks of the data file
+    """
+    if data_in_path.suffix == ".xlsx":
+        # Excel files can't be read in chunks so they are loaded in one go
+        logger.warning("Excel files can't be read in chunks, loading the whole file")
+        yield read_excel_file(data_in_path, usecols=usecols, dtype=dtype)
+        return
+    elif is_arrow_file(data_in_path):
+        # The file is memory-mapped so only the rows of the current chunk get converted
+        table = _read_arrow_table(data_in_path, columns=usecols)
+        for offset in range(0, table.num_rows, chunksize):
+            chunk = table.slice(offset, chunksize).to_pandas()
+            chunk.index += offset
+            yield chunk
+        return
+
+    with pd.read_csv(
+        data_in_path,
+        sep=_get_separator(data_in_path),
+        chunksize=chunksize,
+        usecols=usecols,
+        dtype=dtype,
+    ) as reader:
+        yield from reader
+
+
+def is_suggestion_column(column_name: Any) -> bool:
+    """Checks if the column of the suggestions sheet is used to apply the suggestions
+
+    Args:
+        column_name (Any): The column name
+
+    Returns:
+        bool: True if the column is needed
+    """
+    column_name = str(column_name)
+    return column_name in SUGGESTION_COLUMNS or column_name.startswith(
+        SUGGESTION_COLUMN_PREFIXES
+    )
+
+
+def load_human_entry_file(human_suggestions_path: Path) -> pd.DataFrame:
+    """Loads the human entry suggestions file filled out by the user
+
+    Args:
+        human_suggestions_path (Path): Path of the human entry suggestions file
+
+    Returns:
+        pd.DataFrame: The human entry dataframe
+    """
+    # Check file extension
+    if human_suggestions_path.suffix == ".xlsx":
+        return read_excel_file(human_suggestions_path, usecols=is_suggestion_column)
+    elif human_suggestions_path.suffix == ".csv":
+        return pd.read_csv(human_suggestions_path, sep=",", header=0)
+    elif human_suggestions_path.suffix == ".tsv":
+        return pd.read_csv(human_suggestions_path, sep="\t", header=0)
+    elif is_arrow_file(human_suggestions_path):
+        return _read_arrow_table(human_suggestions_path).to_pandas()
+
+    logger.error("Unknown file extension")
+    exit(1)
+
+
+def _make_arrow_compatible(data_frame: pd.DataFrame) -> pd.DataFrame:
+    """Converts the object columns that mix types (e.g. numbers and strings) to strings since
+    Arrow needs a single type per column
+
+    Args:
+        data_frame (pd.DataFrame): The data frame
+
+    Returns:
+        pd.DataFrame: The data frame that can be written to an Arrow file
+    """
+    data_frame = data_frame.copy()
+    for col in data_frame.columns:
+        if isinstance(data_frame[col].dtype, pd.CategoricalDtype):
+            # The categories can mix types too
+            data_frame[col] = data_frame[col].astype(object)
+        if data_frame[col].dtype != "object":
+            continue
+        not_null = data_frame[col].notna()
+        if data_frame[col][not_null].map(type).nunique() > 1:
+            data_frame.loc[not_null, col] = data_frame[col][not_null].astype(str)
+    return data_frame
+
+
+def write_table(
+    data_frame: pd.DataFrame,
+    file_stem: Path,
+    output_format: str = "tsv",
+    index: bool = False,
+) -> Path:
+    """Writes a table in the given format, the suffix is added to the file stem
+
+    Args:
+        data_frame (pd.DataFrame): The data frame to write
+        file_stem (Path): Path of the file without the suffix
+        output_format (str, optional): "tsv" or "parquet". Defaults to "tsv".
+        index (bool, optional): Write the index of the data frame too. Defaults to False.
+
+    Returns:
+        Path: Path of the written file
+    """
+    file_path = Path(f"{file_stem}.{output_format}")
+    if output_format == "tsv":
+        data_frame.to_csv(file_path, sep="\t", index=index)
+    elif output_format == "parquet":
+        _make_arrow_compatible(data_frame).to_parquet(file_path, index=index)
+    else:
+        logger.error("Unknown output format %s", output_format)
+        exit(1)
+
+    return file_path
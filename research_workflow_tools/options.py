@@ -0,0 +1,22 @@
+"""The choices of the command line options. This module doesn't import pandas (or any other
+package) so the command line can be parsed before the modules that do the work are loaded."""
+
+# The parsers that can be used for csv/tsv files
+CSV_ENGINES = ["c", "pyarrow"]
+
+# The formats the output tables (the workbook and the others diff) can be written in
+OUTPUT_FORMATS = ["tsv", "parquet"]
+
+# The formats of the suggestions workbook (xlsx needs the openpyxl package)
+WORKBOOK_FORMATS = ["xlsx"] + OUTPUT_FORMATS
+
+# How the columns that get cleaned are kept in memory, "object" keeps a python string per cell
+# and "category" keeps every unique value once (the cells are codes)
+STRING_STORAGES = ["object", "category"]
+
+# Where the suggestions are applied, "pandas" loads the data file in a data frame and "sqlite"
+# copies it to a temporary SQLite database on disk
+BACKENDS = ["pandas", "sqlite"]
+
+# The number of rows that are patched at a time
+APPLY_CHUNKSIZE = 50_000
@@ -1,37 +1,63 @@
 import json
+import logging
 from pathlib import Path
-from typing import Dict, List, Optional, Union
+from typing import Dict, Hashable, List, Optional, Tuple, Union
 import numpy as np
 
 import pandas as pd
 
-from panda_patches.utils import generate_update_patch_file
-from research_workflow_tools.utils import generate_timestamp
+from research_workflow_tools.aggregation import aggregate_human_entry_values
+from research_workflow_tools.cache import (
+    CACHE_DIR,
+    DatasetCache,
+    load_cached_data_file,
+)
+from research_workflow_tools.changes import CellChanges
+from research_workflow_tools.clustering import (
+    cluster_column_values,
+    collapse_cluster_rows,
+    expand_cluster_decisions,
+)
+from research_workflow_tools.incremental import (
+    apply_incremental_replacements,
+    get_incremental_state_path,
+)
+from research_workflow_tools.loaders import (
+    ID_COLUMNS,
+    apply_string_storage,
+    get_replacement_columns,
+    load_human_entry_file,
+    read_header,
+    write_table,
+)
+from research_workflow_tools.patching import write_other_entry_patch
+from research_workflow_tools.profiling import PhaseProfiler, profile_phase
+from research_workflow_tools.replacement_engine import (
+    categorical_columns_to_object,
+    get_newly_generated_columns,
+    select_replacement_function,
+    strip_string_columns,
+)
+from research_workflow_tools.sqlite_store import (
+    SQLITE_CHUNKSIZE,
+    process_other_entry_replacements_in_sqlite,
+)
+from research_workflow_tools.streaming import (
+    process_other_entry_replacements_in_chunks,
+)
+from research_workflow_tools.suggestion_groups import apply_parallel_replacements
+from research_workflow_tools.suggestions import generate_suggestions
+from research_workflow_tools.utils import cast_value
+from research_workflow_tools.validation import (
+    LookupValidator,
+    SuggestionsValidationError,
+    ValidationReport,
+)
+from research_workflow_tools.workbook import write_suggestions_workbook
 from typing import Any
 from typing import Any, Optional
 
-
-def cast_value(value: Any) -> Union[str, int, float, bool]:
-    """Casts the value to the appropriate type
-
-    Args:
-        value (Any): The value to be cast
-
-    Returns:
-        Union[str, int, float, bool]: The casted value
-    """
-    # Try to convert to boolean
-    if str(value).lower() in ["true", "false"]:
-        return str(value).lower() == "true"
-    # Try to convert to number
-    try:
-        return int(value)
-    except ValueError:
-        try:
-            return float(value)
-        except ValueError:
-            # Return as string
-            return str(value)
+logger = logging.getLogger(__name__)
 
 
 def check_entry_against_value_dictionary(
@@ -49,30 +75,213 @@ def check_entry_against_value_dictionary(
     """
     # Check if the column name is in the dictionary
     if column_name not in input_dictionary:
-        print(f"Column name {column_name} not in the dictionary, unable to check entry")
+        logger.warning(
+            "Column name %s not in the dictionary, unable to check entry", column_name
+        )
         return True
 
     # Check if the column value is in the dictionary
-    if cast_value(column_value) not in list(input_dictionary[column_name].values()):
-        print(
-            f"Column value {cast_value(column_value)} not in the dictionary for column {column_name}, please check your entry"
+    casted_value = cast_value(column_value)
+    if casted_value not in set(input_dictionary[column_name].values()):
+        logger.warning(
+            "Column value %s not in the dictionary for column %s, please check your entry",
+            casted_value,
+            column_name,
         )
         return False
 
     return True
 
 
+def build_human_entry_df(
+    human_entry_column_values: Dict[str, List[Any]],
+    suggested_values: Optional[Dict[str, List[Any]]] = None,
+    cluster_ids: Optional[Dict[str, List[int]]] = None,
+    source_files: Optional[Dict[str, List[List[str]]]] = None,
+    occurrence_counts: Optional[Dict[str, Dict[str, int]]] = None,
+    household_counts: Optional[Dict[str, Dict[str, int]]] = None,
+) -> pd.DataFrame:
+    """Builds the human entry dataframe (one row per column name and unique value) that the
+    user fills out with the replacements
+
+    Args:
+        human_entry_column_values (Dict[str, List[Any]]): The unique values for each of the columns
+        suggested_values (Optional[Dict[str, List[Any]]], optional): The suggested value for each of the unique values of the columns. Defaults to None.
+        cluster_ids (Optional[Dict[str, List[int]]], optional): The cluster of each of the unique values of the columns (see cluster_column_values), adds a cluster_id column and keeps the values of a cluster next to each other. Defaults to None.
+        source_files (Optional[Dict[str, List[List[str]]]], optional): The data files each of the unique values of the columns shows up in, adds a source_files column (json). Defaults to None.
+        occurrence_counts (Optional[Dict[str, Dict[str, int]]], optional): The number of rows of each of the unique values of the columns, adds an occurrence_count column. Defaults to None.
+        household_counts (Optional[Dict[str, Dict[str, int]]], optional): The number of households (hhids) of each of the unique values of the columns, adds a household_count column. Defaults to None.
+
+    Returns:
+        pd.DataFrame: The human entry dataframe
+    """
+    column_names = []
+    unique_values = []
+    column_suggestions = []
+    column_clusters = []
+    column_sources = []
+    # The cluster ids are numbered across the columns so an id is unique in the workbook
+    cluster_offset = 0
+    for col, values in human_entry_column_values.items():
+        suggestions = (
+            [None] * len(values)
+            if suggested_values is None or col not in suggested_values
+            else suggested_values[col]
+        )
+        # If val is nan, then skip
+        kept_positions = [
+            position for position, val in enumerate(values) if not pd.isna(val)
+        ]
+        if cluster_ids is not None:
+            clusters = cluster_ids[col]
+            kept_positions.sort(key=lambda position: clusters[position])
+            column_clusters += [
+                cluster_offset + clusters[position] for position in kept_positions
+            ]
+            cluster_offset += max(clusters, default=-1) + 1
+        column_names += [col] * len(kept_positions)
+        unique_values += [values[position] for position in kept_positions]
+        column_suggestions += [suggestions[position] for position in kept_positions]
+        if source_files is not None:
+            column_sources += [
+                json.dumps(source_files[col][position]) for position in kept_positions
+            ]
+
+    row_count = len(unique_values)
+    count_columns = {}
+    for count_column, value_counts in [
+        ("occurrence_count", occurrence_counts),
+        ("household_count", household_counts),
+    ]:
+        if value_counts is not None:
+            count_columns[count_column] = pd.Series(
+                [
+                    value_counts.get(col, {}).get(value)
+                    for col, value in zip(column_names, unique_values)
+                ],
+                dtype="Int64",
+            )
+    cluster_column = (
+        {}
+        if cluster_ids is None
+        else {"cluster_id": pd.Series(column_clusters, dtype="int64")}
+    )
+    source_column = (
+        {}
+        if source_files is None
+        else {"source_files": pd.Series(column_sources, dtype=object)}
+    )
+    return pd.DataFrame(
+        {
+            "column_name": pd.Series(column_names, dtype=object),
+            "unique_value": pd.Series(unique_values, dtype=object),
+            **count_columns,
+            **cluster_column,
+            "replacement_value": pd.Series([None] * row_count, dtype=object),
+            "suggested_value": pd.Series(column_suggestions, dtype=object),
+            "delete_value": pd.Series([False] * row_count, dtype=object),
+            "new_column_name": pd.Series([None] * row_count, dtype=object),
+            "new_column_value": pd.Series([None] * row_count, dtype=object),
+            "delete_column_value": pd.Series([None] * row_count, dtype=object),
+            **source_column,
+        }
+    )
+
+
+def rank_human_entry_rows(
+    human_entry_df: pd.DataFrame, min_count: int = 1, top_k: Optional[int] = None
+) -> pd.DataFrame:
+    """Sorts the rows of the human entry dataframe by impact, the values with the most rows
+    (then the most households) first, so the values that fix the most cells are decided first.
+    The values of a cluster are ranked together by the total of the cluster and stay next to
+    each other.
+
+    Args:
+        human_entry_df (pd.DataFrame): The human entry dataframe with an occurrence_count column
+        min_count (int, optional): Drop the values (clusters) with fewer rows. Defaults to 1.
+        top_k (Optional[int], optional): Only keep this many values (clusters) with the most impact. Defaults to None.
+
+    Returns:
+        pd.DataFrame: The sorted human entry dataframe
+    """
+    if "occurrence_count" not in human_entry_df.columns:
+        return human_entry_df
+
+    occurrence_counts = human_entry_df["occurrence_count"].fillna(0).astype("int64")
+    household_counts = (
+        human_entry_df["household_count"].fillna(0).astype("int64")
+        if "household_count" in human_entry_df.columns
+        else pd.Series(0, index=human_entry_df.index)
+    )
+    groups = (
+        human_entry_df["cluster_id"]
+        if "cluster_id" in human_entry_df.columns
+        else pd.Series(np.arange(len(human_entry_df)), index=human_entry_df.index)
+    )
+    ranking = pd.DataFrame(
+        {
+            "group_occurrences": occurrence_counts.groupby(groups).transform("sum"),
+            "group_households": household_counts.groupby(groups).transform("sum"),
+            "group": groups,
+            "occurrences": occurrence_counts,
+            "households": household_counts,
+        }
+    ).sort_values(
+        ["group_occurrences", "group_households", "group", "occurrences", "households"],
+        ascending=[False, False, True, False, False],
+        kind="stable",
+    )
+
+    ranking = ranking[ranking["group_occurrences"] >= min_count]
+    if top_k is not None:
+        kept_groups = ranking["group"].drop_duplicates().iloc[:top_k]
+        ranking = ranking[ranking["group"].isin(kept_groups)]
+
+    if len(ranking) < len(human_entry_df):
+        logger.info(
+            "Keeping the %d values with the most impact out of %d",
+            len(ranking),
+            len(human_entry_df),
+        )
+    return human_entry_df.loc[ranking.index].reset_index(drop=True)
+
+
 def generate_other_entry_workbook(
-    data_in_path: Path = Path("./data_v0006.tsv"),
+    data_in_path: Union[Path, List[Path]] = Path("./data_v0006.tsv"),
     ignore_list_path: Path = Path("./other_ignore_list.txt"),
     output_path: Path = Path("./"),
-):
+    chunksize: Optional[int] = None,
+    engine: Optional[str] = None,
+    output_format: str = "tsv",
+    cache: Optional[DatasetCache] = None,
+    lookup_fields_path: Optional[Path] = None,
+    suggest: bool = True,
+    cluster: bool = True,
+    collapse_clusters: bool = False,
+    workers: int = 1,
+    min_count: int = 1,
+    top_k: Optional[int] = None,
+) -> Path:
     """Generates a workbook that can be used to generate the other entry suggestions
 
     Args:
-        data_in_path (Path, optional): _description_. Defaults to Path("./data_v0006.tsv").
+        data_in_path (Union[Path, List[Path]], optional): The data file or the data files to merge in one workbook (adds a source_files column). Defaults to Path("./data_v0006.tsv").
         ignore_list_path (Path, optional): _description_. Defaults to Path("./other_ignore_list.txt").
-        output_path (Path, optional): _description_. Defaults to Path("./").
+        output_path (Path, optional): The folder the workbook is written to. Defaults to Path("./").
+        chunksize (Optional[int], optional): Read the data file in chunks of this many rows and only keep the unique values in memory. Defaults to None.
+        engine (Optional[str], optional): The parser to use for csv/tsv files ("c" or "pyarrow"), not used when reading in chunks. Defaults to None.
+        output_format (str, optional): The format of the suggestions workbook ("xlsx", "tsv" or "parquet"). Defaults to "tsv".
+        cache (Optional[DatasetCache], optional): Cache of the parsed data files, not used when reading in chunks. Defaults to None.
+        lookup_fields_path (Optional[Path], optional): The json dictionary with the valid values of the columns, used for the suggestions and the dropdowns of the xlsx workbook. Defaults to None.
+        suggest (bool, optional): Fill out the suggested_value column. Defaults to True.
+        cluster (bool, optional): Group the near-duplicate values of each column in clusters (cluster_id column), a decision made on one value of a cluster is applied to the whole cluster. Defaults to True.
+        collapse_clusters (bool, optional): Only write one row per cluster (its most common value), the values of the cluster go in the cluster_values column. Defaults to False.
+        workers (int, optional): The number of data files read at the same time. Defaults to 1.
+        min_count (int, optional): Leave out the values (clusters) with fewer rows. Defaults to 1.
+        top_k (Optional[int], optional): Only write this many values (clusters), the ones with the most rows. Defaults to None.
+
+    Returns:
+        Path: Path of the workbook
     """
 
     # Step 0 - Create an ignore list
@@ -82,119 +291,103 @@ def generate_other_entry_workbook(
     with open(ignore_list_path, "r") as file_ptr:
         ignore_list += [line.strip() for line in file_ptr.read().splitlines()]
 
-    # Step 1
-    # Load the data into a dataframe
-    # Load based on the file extension
-    if data_in_path.suffix == ".xlsx":
-        df = pd.read_excel(data_in_path)
-    elif data_in_path.suffix == ".csv":
-        df = pd.read_csv(data_in_path)
-    elif data_in_path.suffix == ".tsv":
-        df = pd.read_csv(data_in_path, sep="\t")
-    else:
-        print("Unknown file extension")
-        exit(1)
-
-    # Step 2 : Cycle through each of the columns and see if its type is a string column.
-    human_entry_column_names = []
-    for col in df.columns:
-        if (df[col].dtype == "object") and (col not in ignore_list):
-            human_entry_column_names.append(col)
-
-    # Step 3:  Store all the unique values for each of the columns in a dictionary
-    human_entry_column_values = {}
-    for col in human_entry_column_names:
-        human_entry_column_values[col] = list(
-            set(
-                [
-                    item.strip()
-                    for item in df[col].unique().tolist()
-                    if type(item) == str
-                ]
-            )
+    # Steps 1 - 3: Count the rows of the (stripped) unique values of the string columns, the
+    # data files are read in a pool of processes and only their unique values are merged
+    data_in_paths = [data_in_path] if isinstance(data_in_path, Path) else data_in_path
+    aggregate = aggregate_human_entry_values(
+        data_in_paths,
+        ignore_list,
+        workers=workers,
+        chunksize=chunksize,
+        engine=engine,
+        cache=cache,
+    )
+    human_entry_column_values = aggregate.unique_values()
+    column_value_counts = aggregate.counts
+    if len(data_in_paths) > 1:
+        logger.info(
+            "Merged the unique values of %d data files into %d values",
+            len(data_in_paths),
+            sum(len(values) for values in human_entry_column_values.values()),
         )
 
-    # TODO: Step 4: Generate the suggested values for each of the column values
-    # This will need to be a fuzzy / AI mediated step and will be done in the future
-
-    # Step 5: Generate an Excel Sheet with column names unique values, and the suggested values for each of the columns
-
-    # Step 5.1: Create a multi-indexed dataframe
-    header = [
-        "column_name",
-        "unique_value",
-        "replacement_value",
-        "suggested_value",
-        "delete_value",
-        "new_column_name",
-        "new_column_value",
-        "delete_column_value",
-    ]
-
-    # Step 5.2: Create a dataframe with the header
-    human_entry_df = pd.DataFrame(columns=header)
+    # Step 4: Generate the suggested values for each of the column values by fuzzy matching
+    # them against the lookup dictionary and the other values of the column
+    lookup_dictionary = None
+    if lookup_fields_path is not None:
+        with open(lookup_fields_path, "r") as file_ptr:
+            lookup_dictionary = json.load(file_ptr)
+
+    suggested_values = None
+    if suggest:
+        suggested_values = generate_suggestions(
+            human_entry_column_values,
+            column_value_counts=column_value_counts,
+            lookup_dictionary=lookup_dictionary,
+        )
 
-    # Step 5.3: Add the data to the dataframe
-    for col in human_entry_column_values:
-        for val in human_entry_column_values[col]:
-            # If val is nan, then skip
-            if pd.isna(val):
-                continue
+    # Step 4.1: Group the near-duplicate values of each column in clusters
+    cluster_ids = None
+    if cluster:
+        cluster_ids = {
+            col: cluster_column_values(values)
+            for col, values in human_entry_column_values.items()
+        }
 
-            data_to_append = {}
-            data_to_append["column_name"] = col
-            data_to_append["unique_value"] = val
-            data_to_append["replacement_value"] = None
-            data_to_append["suggested_value"] = None
-            data_to_append["delete_value"] = False
-            data_to_append["new_column_name"] = None
-            data_to_append["new_column_value"] = None
-            data_to_append["delete_column_value"] = None
+    # Step 5: Generate an Excel Sheet with column names unique values, and the suggested values for each of the columns
 
-            human_entry_df.loc[len(human_entry_df)] = data_to_append
+    # Step 5.1: Create the dataframe with all the column names and unique values in one go
+    value_households = aggregate.value_households()
+    human_entry_df = build_human_entry_df(
+        human_entry_column_values,
+        suggested_values,
+        cluster_ids,
+        source_files=aggregate.source_files() if len(data_in_paths) > 1 else None,
+        occurrence_counts=column_value_counts,
+        household_counts=(
+            aggregate.household_counts() if len(value_households) > 0 else None
+        ),
+    )
+    if cluster and collapse_clusters:
+        human_entry_df = collapse_cluster_rows(
+            human_entry_df, column_value_counts, value_households
+        )
 
-    # Step 5.4: Write the dataframe to an excel file
-    human_entry_df.to_csv("human_entry_suggestions.tsv", sep="\t", index=False)
+    # Step 5.2: Put the values that fix the most cells first
+    human_entry_df = rank_human_entry_rows(human_entry_df, min_count, top_k)
+
+    # Step 5.3: Write the dataframe to an excel file, the rows are streamed to the workbook
+    output_path.mkdir(parents=True, exist_ok=True)
+    file_stem = output_path / "human_entry_suggestions"
+    if output_format == "xlsx":
+        workbook_path = write_suggestions_workbook(
+            human_entry_df,
+            Path(f"{file_stem}.xlsx"),
+            lookup_dictionary=lookup_dictionary,
+        )
+    else:
+        workbook_path = write_table(human_entry_df, file_stem, output_format)
+    logger.info("Wrote %d values to %s", len(human_entry_df), workbook_path)
+    return workbook_path
 
 
-def process_other_entry_replacements(
-    data_in_path: Path,
+def load_suggestions_sheet(
     human_suggestions_path: Path,
-    json_dictionary_path: Path = Path("./lookup-table/JSON_fields.json"),
-    output_path: Path = Path("./"),
-) -> Path:
-    """Processes the other entry replacements
+    cluster_expansion: bool = True,
+) -> Tuple[pd.DataFrame, List[str], List[str], List[str]]:
+    """Loads the human entry suggestions file filled out by the user, strips the values and
+    applies the decisions made on one value of a cluster to the whole cluster
 
     Args:
-        data_in_path (Path): Path of the data file against which we do the comparison
         human_suggestions_path (Path): Path of the human entry suggestions file filled out by the user
-        json_dictionary_path (Path, optional): The json dictionary that has all the valid values for the different columns. Defaults to Path("./lookup-table/JSON_fields.json").
-        output_path (Path, optional): Output folder where the patch file needs to go. Defaults to Path("./").
+        cluster_expansion (bool, optional): Give the values without a decision the decision of their cluster (see expand_cluster_decisions). Defaults to True.
 
     Returns:
-        Path: Path of the patch file
+        Tuple[pd.DataFrame, List[str], List[str], List[str]]: The human entry dataframe and the
+        new column name, new column value and delete column value columns
     """
-    # Read data based on the file extension
-    if data_in_path.suffix == ".xlsx":
-        data_frame = pd.read_excel(data_in_path)
-    elif data_in_path.suffix == ".csv":
-        data_frame = pd.read_csv(data_in_path, sep=",")
-    elif data_in_path.suffix == ".tsv":
-        data_frame = pd.read_csv(data_in_path, sep="\t")
-
-    data_frame_backup = data_frame.copy()
-
     # Read the csv/tsv/excel file into a dataframe
-    # Check file extension
-    if human_suggestions_path.suffix == ".xlsx":
-        human_entry_df = pd.read_excel(human_suggestions_path)
-    elif human_suggestions_path.suffix == ".csv":
-        human_entry_df = pd.read_csv(human_suggestions_path, sep=",", header=0)
-    elif human_suggestions_path.suffix == ".tsv":
-        human_entry_df = pd.read_csv(human_suggestions_path, sep="\t", header=0)
-    else:
-        print("Unknown file extension")
-        exit(1)
+    human_entry_df = load_human_entry_file(human_suggestions_path)
 
     # Retrieve all the new_column_name columns (they start with new_column_name)
     new_column_name_columns = [
@@ -230,195 +423,400 @@ def process_other_entry_replacements(
         delete_column_value_columns,
     )
 
-    # Step 0.2: Check if the values match the json dictionary
+    # Step 0.2: Apply the decisions made on one value of a cluster to the whole cluster
+    human_entry_df = expand_cluster_decisions(
+        human_entry_df,
+        new_column_name_columns,
+        new_column_value_columns,
+        delete_column_value_columns,
+        fill_undecided=cluster_expansion,
+    )
 
-    # Get the replacement_value column's unique values
+    return (
+        human_entry_df,
+        new_column_name_columns,
+        new_column_value_columns,
+        delete_column_value_columns,
+    )
+
+
+def validate_suggestions_sheet(
+    validator: LookupValidator,
+    data_in_path: Path,
+    human_entry_df: pd.DataFrame,
+    new_column_name_columns: List[str],
+    new_column_value_columns: List[str],
+    delete_column_value_columns: List[str],
+) -> ValidationReport:
+    """Checks the suggestions against the lookup dictionary and the columns of the data file
+    (only the header of the data file is read)
+
+    Args:
+        validator (LookupValidator): The compiled lookup dictionary
+        data_in_path (Path): Path of the data file
+        human_entry_df (pd.DataFrame): The (stripped) human entry dataframe
+        new_column_name_columns (List[str]): A list of the new column name columns
+        new_column_value_columns (List[str]): A list of the new column value columns
+        delete_column_value_columns (List[str]): A list of the delete column value columns
 
+    Returns:
+        ValidationReport: The failed checks
+    """
+    return validator.validate(
+        human_entry_df,
+        read_header(data_in_path)
+        + get_newly_generated_columns(human_entry_df, new_column_name_columns),
+        new_column_name_columns,
+        new_column_value_columns,
+        delete_column_value_columns,
+    )
+
+
+def process_other_entry_replacements(
+    data_in_path: Path,
+    human_suggestions_path: Path,
+    json_dictionary_path: Path = Path("./lookup-table/JSON_fields.json"),
+    output_path: Path = Path("./"),
+    chunksize: Optional[int] = None,
+    engine: Optional[str] = None,
+    output_format: str = "tsv",
+    cache: Optional[DatasetCache] = None,
+    incremental: bool = False,
+    workers: int = 1,
+    validate: bool = True,
+    profiler: Optional[PhaseProfiler] = None,
+    string_storage: str = "object",
+    backend: str = "pandas",
+    cluster_expansion: bool = True,
+) -> Path:
+    """Processes the other entry replacements
+
+    Args:
+        data_in_path (Path): Path of the data file against which we do the comparison
+        human_suggestions_path (Path): Path of the human entry suggestions file filled out by the user
+        json_dictionary_path (Path, optional): The json dictionary that has all the valid values for the different columns. Defaults to Path("./lookup-table/JSON_fields.json").
+        output_path (Path, optional): Output folder where the patch file needs to go. Defaults to Path("./").
+        chunksize (Optional[int], optional): Read the data file in chunks of this many rows and only keep the rows that change in memory. Defaults to None.
+        engine (Optional[str], optional): The parser to use for csv/tsv files ("c" or "pyarrow"), not used when reading in chunks. Defaults to None.
+        output_format (str, optional): The format of the others diff file ("tsv" or "parquet"). Defaults to "tsv".
+        cache (Optional[DatasetCache], optional): Cache of the parsed data files, not used when reading in chunks. Defaults to None.
+        incremental (bool, optional): Only apply the suggestions that changed since the previous run of the suggestions file, not used when reading in chunks. Defaults to False.
+        workers (int, optional): The number of processes that apply the independent groups of suggestions, not used when reading in chunks. Defaults to 1.
+        validate (bool, optional): Check the replacement values against the json dictionary before applying them. Defaults to True.
+        profiler (Optional[PhaseProfiler], optional): Measures the time, the memory and the rows and cells of each phase. Defaults to None.
+        string_storage (str, optional): How the columns that get cleaned are kept in memory ("object" or "category", see options.STRING_STORAGES). Defaults to "object".
+        backend (str, optional): Where the suggestions are applied ("pandas" or "sqlite", see BACKENDS). Defaults to "pandas".
+        cluster_expansion (bool, optional): Give the values without a decision the decision of their cluster (see expand_cluster_decisions). Defaults to True.
+
+    Raises:
+        SuggestionsValidationError: Some of the replacement values are not valid (see validate)
+
+    Returns:
+        Path: Path of the patch file
+    """
+    with profile_phase(profiler, "load_suggestions") as record:
+        (
+            human_entry_df,
+            new_column_name_columns,
+            new_column_value_columns,
+            delete_column_value_columns,
+        ) = load_suggestions_sheet(human_suggestions_path, cluster_expansion)
+        record.rows += len(human_entry_df)
+        record.cells += human_entry_df.size
+
+    # Step 1.2: Check if the replacement values are in the dictionary, all the failed checks
+    # are reported at once
+    if validate and json_dictionary_path.exists():
+        with profile_phase(profiler, "validate") as record:
+            report = validate_suggestions_sheet(
+                LookupValidator.from_json(json_dictionary_path),
+                data_in_path,
+                human_entry_df,
+                new_column_name_columns,
+                new_column_value_columns,
+                delete_column_value_columns,
+            )
+            record.rows += len(human_entry_df)
+        if not report.ok:
+            raise SuggestionsValidationError(report)
+        logger.info("%s", report)
+    elif validate:
+        logger.warning(
+            "Lookup dictionary %s not found, the replacement values are not checked",
+            json_dictionary_path,
+        )
+
+    incremental_state_path = None
+    if incremental:
+        incremental_state_path = get_incremental_state_path(
+            data_in_path,
+            human_suggestions_path,
+            cache.cache_dir if cache is not None else CACHE_DIR,
+        )
+
+    return apply_suggestions_sheet(
+        data_in_path,
+        human_entry_df,
+        new_column_name_columns,
+        new_column_value_columns,
+        delete_column_value_columns,
+        output_path=output_path,
+        chunksize=chunksize,
+        engine=engine,
+        output_format=output_format,
+        cache=cache,
+        incremental_state_path=incremental_state_path,
+        workers=workers,
+        profiler=profiler,
+        string_storage=string_storage,
+        backend=backend,
+    )
+
+
+def apply_suggestions_sheet(
+    data_in_path: Path,
+    human_entry_df: pd.DataFrame,
+    new_column_name_columns: List[str],
+    new_column_value_columns: List[str],
+    delete_column_value_columns: List[str],
+    output_path: Path = Path("./"),
+    chunksize: Optional[int] = None,
+    engine: Optional[str] = None,
+    output_format: str = "tsv",
+    cache: Optional[DatasetCache] = None,
+    incremental_state_path: Optional[Path] = None,
+    workers: int = 1,
+    diff_path: Path = Path("others_diff"),
+    profiler: Optional[PhaseProfiler] = None,
+    string_storage: str = "object",
+    backend: str = "pandas",
+) -> Path:
+    """Applies the (loaded) suggestions sheet to a data file and writes the patch file
+
+    Args:
+        data_in_path (Path): Path of the data file against which we do the comparison
+        human_entry_df (pd.DataFrame): The (stripped) human entry dataframe (see load_suggestions_sheet)
+        new_column_name_columns (List[str]): A list of the new column name columns
+        new_column_value_columns (List[str]): A list of the new column value columns
+        delete_column_value_columns (List[str]): A list of the delete column value columns
+        output_path (Path, optional): Output folder where the patch file needs to go. Defaults to Path("./").
+        chunksize (Optional[int], optional): Read the data file in chunks of this many rows and only keep the rows that change in memory. Defaults to None.
+        engine (Optional[str], optional): The parser to use for csv/tsv files ("c" or "pyarrow"), not used when reading in chunks. Defaults to None.
+        output_format (str, optional): The format of the others diff file ("tsv" or "parquet"). Defaults to "tsv".
+        cache (Optional[DatasetCache], optional): Cache of the parsed data files, not used when reading in chunks. Defaults to None.
+        incremental_state_path (Optional[Path], optional): Reuse the effects of the previous run saved in this file (see get_incremental_state_path), not used when reading in chunks. Defaults to None.
+        workers (int, optional): The number of processes that apply the independent groups of suggestions, not used when reading in chunks. Defaults to 1.
+        diff_path (Path, optional): Path of the others diff file (without the extension). Defaults to Path("others_diff").
+        profiler (Optional[PhaseProfiler], optional): Measures the time, the memory and the rows and cells of each phase (load, strip, replace, filter and patch). Defaults to None.
+        string_storage (str, optional): How the columns that get cleaned are kept in memory ("object" or "category", see options.STRING_STORAGES), the categorical columns are trimmed and replaced a category at a time. Defaults to "object".
+        backend (str, optional): Where the suggestions are applied ("pandas" or "sqlite", see BACKENDS), sqlite copies the data file to a temporary database on disk (read in chunks of chunksize rows) instead of loading it in memory. Defaults to "pandas".
+
+    Returns:
+        Path: Path of the patch file
+    """
     # Step 1: Cycle through each of the rows and see if the replacement value is not null
 
     # Print all the columns values that have a replacement value
     to_fix_columns = human_entry_df["column_name"].unique().tolist()
-    print("Columns that have a replacement value:")
-    print(to_fix_columns)
-
-    # Step 1.2: Check if the replacement value is in the dictionary
-    # check_values_against_dictionary(
-    #     json_dictionary_path=json_dictionary_path,
-    #     data_frame=data_frame,
-    #     human_entry_df_not_null=human_entry_df_not_null,
-    #     new_column_name_columns=new_column_name_columns,
-    #     new_column_value_columns=new_column_value_columns,
-    #     delete_column_value_columns=delete_column_value_columns,
-    # )
+    logger.debug("Columns that have a replacement value: %s", to_fix_columns)
+
+    # The data file is copied to a database on disk, only the rows that change are kept in memory
+    if backend == "sqlite":
+        if incremental_state_path is not None:
+            logger.warning(
+                "The incremental mode can't be used with the sqlite backend, applying all the suggestions"
+            )
+        if workers > 1:
+            logger.warning(
+                "The workers can't be used with the sqlite backend, using a single process"
+            )
+        return process_other_entry_replacements_in_sqlite(
+            data_in_path=data_in_path,
+            human_entry_df=human_entry_df,
+            new_column_name_columns=new_column_name_columns,
+            new_column_value_columns=new_column_value_columns,
+            delete_column_value_columns=delete_column_value_columns,
+            chunksize=chunksize if chunksize is not None else SQLITE_CHUNKSIZE,
+            output_path=output_path,
+            output_format=output_format,
+            diff_path=diff_path,
+            profiler=profiler,
+        )
+
+    # The data file is read in chunks, only the rows that change are kept in memory
+    if chunksize is not None:
+        if incremental_state_path is not None:
+            logger.warning(
+                "The incremental mode can't be used with chunks, applying all the suggestions"
+            )
+        if workers > 1:
+            logger.warning(
+                "The workers can't be used with chunks, using a single process"
+            )
+        return process_other_entry_replacements_in_chunks(
+            data_in_path=data_in_path,
+            human_entry_df=human_entry_df,
+            new_column_name_columns=new_column_name_columns,
+            new_column_value_columns=new_column_value_columns,
+            delete_column_value_columns=delete_column_value_columns,
+            chunksize=chunksize,
+            output_path=output_path,
+            output_format=output_format,
+            diff_path=diff_path,
+            profiler=profiler,
+            string_storage=string_storage,
+        )
+
+    # Read data based on the file extension, only the id columns and the columns that the
+    # suggestions touch are loaded
+    usecols = get_replacement_columns(
+        read_header(data_in_path),
+        human_entry_df,
+        new_column_name_columns,
+        delete_column_value_columns,
+    )
+    # The columns read from the cache come back stripped, with the cells that were trimmed
+    trimmed_cells: Dict[Hashable, Tuple[np.ndarray, np.ndarray]] = {}
+    with profile_phase(profiler, "load") as record:
+        data_frame = load_cached_data_file(
+            data_in_path,
+            usecols=usecols,
+            engine=engine,
+            cache=cache,
+            strip_columns=to_fix_columns,
+            trimmed_cells=trimmed_cells,
+        )
+        apply_string_storage(data_frame, to_fix_columns, string_storage)
+        record.rows += len(data_frame)
+        record.cells += data_frame.size
+
+    # Keeps track of the cells that are changed (with their original values) to build the patch
+    changes = CellChanges(len(data_frame))
+
     # Step 2: Prep all the dataframes
 
     # Step 2.1: Trim all the string columns in the columns that have a replacement value
-    for col in to_fix_columns:
-        # Check if the column is a string column
-        if data_frame[col].dtype == "object":
-            # Trim the column
-            data_frame[col] = data_frame[col].str.strip()
-
-    # Step 2.2: Add the new columns to the old and new data frame if it doesn't exist
-    newly_generated_columns = []
-    to_delete_columns = []
-
-    for new_column_name_column in new_column_name_columns:
-        # Get the newly generated columns
-        triggered_update_columns = (
-            human_entry_df[new_column_name_column].unique().tolist()
+    with profile_phase(profiler, "strip") as record:
+        for col, (positions, old_values) in trimmed_cells.items():
+            changes.record_values(col, positions, old_values)
+        strip_string_columns(
+            data_frame,
+            [col for col in to_fix_columns if col not in trimmed_cells],
+            changes,
         )
+        stripped_rows, stripped_cells = changes.touched_counts()
+        record.rows += stripped_rows
+        record.cells += stripped_cells
+
+    with profile_phase(profiler, "replace") as record:
 
-        # Add the new columns to the data frames
-        for col in triggered_update_columns:
-            # Add to newly generated columns
-            if pd.isna(col):
-                continue
+        # Step 2.2: Add the new columns to the data frame if it doesn't exist
+        newly_generated_columns = get_newly_generated_columns(
+            human_entry_df, new_column_name_columns
+        )
 
-            newly_generated_columns.append(col)
+        for col in newly_generated_columns:
             # Check if the column exists in the data frame
             if col not in data_frame.columns:
-                print(f"Column name {col} not in data frame, creating it")
+                logger.info("Column name %s not in data frame, creating it", col)
 
                 # Add the column to the data frame
                 data_frame[col] = None
-                data_frame_backup[col] = None
-
-    # Step 3: Go through the human entry dataframe and replace the values in the data frame
-    edit_hhids = []
-    for index, row in human_entry_df.iterrows():
-        print(f"Processing row {index}:")
-        # Get the column name
-        column_name = row["column_name"]
-        # Get the unique value
-        unique_value = row["unique_value"]
-        # Get the replacement value
-        replacement_value = row["replacement_value"]
-        # Get the flag to delete the value
-        delete_value = row["delete_value"]
-
-        # Get the locations where the unique value is present
-        locations = data_frame[column_name] == unique_value
-        print(f"Processing row {index}: Locations: {sum(locations.tolist())}")
-
-        # Get the hhids that need to be edited
-        # TODO: Get the location indices instead of the hhids (it'll ensure that the code can work
-        # with generic data frames plus it seems like its currently sort of broken since its capturing)
-        # # Get the indices that need to be edited
-        # edit_indices = data_frame[locations].index.tolist()
-        ## Replacce with this later
-
-        edit_hhids += data_frame[locations]["hhid"].unique().tolist()
-
-        # Added the new value to the new column (this the followup update)
-        for new_column_name, new_column_value in zip(
-            new_column_name_columns, new_column_value_columns
-        ):
-            # Get the new column name
-            update_column_name = row[new_column_name]
-            # Get the new column value
-            insertion_value = row[new_column_value]
-
-            if pd.isna(insertion_value) or pd.isna(update_column_name):
-                continue
-
-            # Replace the value in the data frame
-            data_frame.loc[locations, update_column_name] = cast_value(insertion_value)
-
-            print(
-                f"Processing row {index}: Inserting {insertion_value} in {update_column_name} as an update for {unique_value} in {column_name}"
-            )
-
-        # Delete the value in the data frame (this the followup update)
-        for delete_column_name in delete_column_value_columns:
-            if pd.isna(row[delete_column_name]):
-                continue
 
-            # Add to the to_delete_columns list
-            to_delete_columns.append(row[delete_column_name])
-
-            # Delete the value in the data frame
-            data_frame.loc[locations, row[delete_column_name]] = np.nan
-
-            print(
-                f"Processing row {index}: Deleting {unique_value} in {row[delete_column_name]}"
+        # Step 3: Go through the human entry dataframe and replace the values in the data frame
+        if incremental_state_path is not None or workers > 1:
+            # The saved effects and the workers write to the cells
+            categorical_columns_to_object(data_frame)
+        if incremental_state_path is not None:
+            # Reuse the changes of the suggestions that didn't change since the previous run
+            edit_hhids, to_delete_columns = apply_incremental_replacements(
+                data_frame,
+                human_entry_df,
+                new_column_name_columns,
+                new_column_value_columns,
+                delete_column_value_columns,
+                state_path=incremental_state_path,
+                changes=changes,
+                workers=workers,
             )
-
-        if delete_value is True:
-            # Delete the value in the data frame
-            old_values = data_frame.loc[locations, column_name]
-            data_frame.loc[locations, column_name] = np.nan
-            new_values = data_frame.loc[locations, column_name]
-            print(
-                f"Processing row {index}: Deleting value {unique_value} in {column_name}"
+        elif workers > 1:
+            # The independent groups of suggestions are applied in a pool of processes
+            edit_hhids, to_delete_columns = apply_parallel_replacements(
+                data_frame,
+                human_entry_df,
+                new_column_name_columns,
+                new_column_value_columns,
+                delete_column_value_columns,
+                workers=workers,
+                changes=changes,
             )
-            print(f"Old values: {old_values}")
-            print(f"New values: {new_values}")
-
-        elif pd.isna(replacement_value) is False:
-            # Replace the value in the data frame (this the actual update)
-            data_frame.loc[locations, column_name] = cast_value(replacement_value)
-
-            print(
-                f"Processing row {index}: Replacing {unique_value} with {replacement_value} in {column_name}"
+        else:
+            apply_replacements = select_replacement_function(
+                human_entry_df, new_column_name_columns, delete_column_value_columns
+            )
+            edit_hhids, to_delete_columns = apply_replacements(
+                data_frame,
+                human_entry_df,
+                new_column_name_columns,
+                new_column_value_columns,
+                delete_column_value_columns,
+                changes=changes,
             )
 
-    # Step 4: Generate a patch file by comparing the data frame with the original data frame
+        # The cells the suggestions touched on top of the trimmed cells
+        touched_rows, touched_cells = changes.touched_counts()
+        record.rows += touched_rows - stripped_rows
+        record.cells += touched_cells - stripped_cells
+
+    # Step 4: Generate a patch file from the cells that were changed
     # Step 4.1: Get the subset of the data frame that has the columns that need to be fixed
+    with profile_phase(profiler, "filter") as record:
+        # Remove repeats for hhids
+        edit_hhids = list(set(edit_hhids))
+
+        # Remove repeats for to_delete_columns
+        to_delete_columns = list(set(to_delete_columns))
+        logger.info("HHIDS to edit: %d", len(edit_hhids))
+        logger.debug("%s", edit_hhids)
+
+        data_frame = data_frame[
+            list(
+                set(
+                    ["hhid", "redcap_event_name"]
+                    + to_fix_columns
+                    + newly_generated_columns
+                    + to_delete_columns
+                )
+            )
+        ]
+        record.rows += len(data_frame)
+        record.cells += data_frame.size
 
     # Step 4.2: Generate the patch file
-    # Get the newly generated columns by doing a set difference
-    # triggered_update_columns = list(
-    #     set(data_frame.columns.tolist()) - set(data_frame_backup.columns.tolist())
-    # )
-
-    # Remove repeats for hhids
-    edit_hhids = list(set(edit_hhids))
-
-    # Remove repeats for to_delete_columns
-    to_delete_columns = list(set(to_delete_columns))
-    print(f"HHIDS to edit: {len(edit_hhids)}")
-    print(edit_hhids)
-
-    data_frame = data_frame[
-        list(
-            set(
-                ["hhid", "redcap_event_name"]
-                + to_fix_columns
-                + newly_generated_columns
-                + to_delete_columns
+    with profile_phase(profiler, "patch") as record:
+        patch_deltas = [
+            (target, deltas)
+            for _, target, deltas in changes.patch_deltas(
+                data_frame, ID_COLUMNS, data_frame.columns.tolist()
             )
+        ]
+        record.rows += len(patch_deltas)
+        record.cells += sum(len(deltas) for _, deltas in patch_deltas)
+
+        return write_other_entry_patch(
+            data_frame=data_frame,
+            patch_deltas=patch_deltas,
+            edit_hhids=edit_hhids,
+            output_path=output_path,
+            output_format=output_format,
+            diff_path=diff_path,
         )
-    ]
-
-    print("Columns, to generate patches on:")
-    print(data_frame.columns.tolist())
-
-    # Filter the data_frame for only the edit_hhids:
-    data_frame = data_frame[data_frame["hhid"].isin(edit_hhids)]
-
-    data_frame.to_csv("others_diff.tsv", sep="\t")
-
-    # Filter the backup data frame by the hhids
-    data_frame_backup = data_frame_backup[data_frame_backup["hhid"].isin(edit_hhids)]
-
-    patch_file_path = generate_update_patch_file(
-        old_df=data_frame_backup,
-        new_df=data_frame,
-        id_columns=["hhid", "redcap_event_name"],
-        patch_comment=f"Other Entry Replacement for columns: {data_frame.columns.tolist()}",
-        new_file_name=f"other_entry_replacement_{generate_timestamp()}",
-        trace=True,
-        outpath=output_path,
-    )
-
-    return patch_file_path
 
 
 def extract_not_null_df(
-    human_entry_df: pd.DataFrame, 
-    new_column_name_columns: List[str], 
-    new_column_value_columns: List[str]
+    human_entry_df: pd.DataFrame,
+    new_column_name_columns: List[str],
+    new_column_value_columns: List[str],
 ) -> pd.DataFrame:
     """Extracts the rows that don't have a null value in the replacement_value or delete_value columns
 
@@ -482,67 +880,26 @@ def check_values_against_dictionary(
     new_column_value_columns: List[str],
     delete_column_value_columns: List[str],
 ):
-    json_dictionary = {}
-
-    # Read the json dictionary
-    with open(json_dictionary_path, "r") as file_ptr:
-        json_dictionary = json.load(file_ptr)
-
-    success_flag = True
-
-    for index, row in human_entry_df_not_null.iterrows():
-        # Get the column name
-        column_name = row["column_name"]
-        # Get the replacement value
-        replacement_value = row["replacement_value"]
-
-        # Check if the replacement value is in the dictionary
-        if pd.isna(replacement_value) is False or pd.isna(column_name) is False:
-            check_replacements_success = check_entry_against_value_dictionary(
-                input_dictionary=json_dictionary,
-                column_name=column_name,
-                column_value=replacement_value,
-            )
-
-            success_flag &= check_replacements_success
-
-        # Now repeat the check for all the new columns
-        for new_column_name, new_column_value in zip(
-            new_column_name_columns, new_column_value_columns
-        ):
-            # Get the new column name
-            new_column_name = row[new_column_name]
-            # Get the new column value
-            new_column_value = row[new_column_value]
-
-            # Check if the new column value is in the dictionary
-            check_new_column_flag = check_entry_against_value_dictionary(
-                input_dictionary=json_dictionary,
-                column_name=new_column_name,
-                column_value=new_column_value,
-            )
-
-            success_flag &= check_new_column_flag
-
-        # Now repeat the check for all the delete columns
-        for delete_column_name in delete_column_value_columns:
-            # Get the delete column value
-            todo_column_name = row[delete_column_name]
+    """Checks the human entry dataframe against the json dictionary (see LookupValidator)
 
-            # if null skip
-            if pd.isnull(todo_column_name):
-                continue
-
-            # Check if the delete column value is in the data frame
-            check_delete_success = todo_column_name in data_frame.columns.tolist()
-
-            if check_delete_success is False:
-                print(
-                    f"Column value in column: {todo_column_name}  not in the data frame"
-                )
-
-            success_flag &= check_delete_success
+    Args:
+        json_dictionary_path (Path): The json dictionary that has all the valid values for the different columns
+        data_frame (pd.DataFrame): The data frame (only the columns are used)
+        human_entry_df_not_null (pd.DataFrame): The human entry dataframe
+        new_column_name_columns (List[str]): A list of the new column name columns
+        new_column_value_columns (List[str]): A list of the new column value columns
+        delete_column_value_columns (List[str]): A list of the delete column value columns
 
-    if success_flag is False:
-        print("Exiting, Please check the entries in the human entry file")
-        exit(1)
+    Raises:
+        SuggestionsValidationError: Some of the entries are not valid, with the report of all the failed checks
+    """
+    report = LookupValidator.from_json(json_dictionary_path).validate(
+        human_entry_df_not_null,
+        data_frame.columns.tolist(),
+        new_column_name_columns,
+        new_column_value_columns,
+        delete_column_value_columns,
+    )
+    if not report.ok:
+        raise SuggestionsValidationError(report)
+    logger.info("%s", report)
@@ -0,0 +1,291 @@
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from research_workflow_tools.loaders import ID_COLUMNS, write_table
+from research_workflow_tools.options import APPLY_CHUNKSIZE
+from research_workflow_tools.utils import cast_series, generate_timestamp
+
+logger = logging.getLogger(__name__)
+
+# The version of the patch file format
+PATCH_FILE_VERSION = 1
+
+# The data files a patch can be applied to (they are read and written a chunk at a time) and
+# their separators
+PATCHABLE_SUFFIXES = {".csv": ",", ".tsv": "\t"}
+
+
+def write_patch_file(
+    patch_deltas: List[Tuple[Dict[str, Any], Dict[Hashable, Any]]],
+    patch_comment: str,
+    new_file_name: str,
+    outpath: Path = Path("./"),
+) -> Path:
+    """Writes the patch file (same layout as the panda_patches PatchFile), the deltas of the
+    rows with the same target are merged
+
+    Args:
+        patch_deltas (List[Tuple[Dict[str, Any], Dict[Hashable, Any]]]): (target, deltas) for every changed row
+        patch_comment (str): The notes that go in the patch file
+        new_file_name (str): The name of the patch file (without the extension)
+        outpath (Path, optional): Output folder where the patch file needs to go. Defaults to Path("./").
+
+    Returns:
+        Path: Path of the patch file
+    """
+    patches: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+    for target, deltas in patch_deltas:
+        target_key = tuple(target.values())
+        if target_key not in patches:
+            patches[target_key] = {"target": target, "deltas": {}}
+        patches[target_key]["deltas"].update(deltas)
+
+    outpath.mkdir(parents=True, exist_ok=True)
+    patch_file_path = outpath / f"{new_file_name}.json"
+    with open(patch_file_path, "w") as file_ptr:
+        json.dump(
+            {
+                "patches": list(patches.values()),
+                "version": PATCH_FILE_VERSION,
+                "meta": {"notes": patch_comment},
+            },
+            file_ptr,
+            indent=4,
+        )
+
+    return patch_file_path
+
+
+def write_other_entry_patch(
+    data_frame: pd.DataFrame,
+    patch_deltas: List[Tuple[Dict[str, Any], Dict[Hashable, Any]]],
+    edit_hhids: List[Any],
+    output_path: Path = Path("./"),
+    output_format: str = "tsv",
+    diff_path: Path = Path("others_diff"),
+) -> Path:
+    """Filters the updated data frame and the patch deltas by the hhids that were edited, writes
+    the others diff file and the patch file
+
+    Args:
+        data_frame (pd.DataFrame): The updated data frame (only the columns to generate patches on)
+        patch_deltas (List[Tuple[Dict[str, Any], Dict[Hashable, Any]]]): (target, deltas) for every row that changed (see CellChanges.patch_deltas)
+        edit_hhids (List[Any]): The hhids that need to be edited
+        output_path (Path, optional): Output folder where the patch file needs to go. Defaults to Path("./").
+        output_format (str, optional): The format of the others diff file ("tsv" or "parquet"). Defaults to "tsv".
+        diff_path (Path, optional): Path of the others diff file (without the extension). Defaults to Path("others_diff").
+
+    Returns:
+        Path: Path of the patch file
+    """
+    logger.debug("Columns, to generate patches on: %s", data_frame.columns.tolist())
+
+    # Filter the data_frame for only the edit_hhids:
+    data_frame = data_frame[data_frame["hhid"].isin(edit_hhids)]
+
+    write_table(data_frame, diff_path, output_format, index=True)
+
+    # Filter the deltas by the hhids
+    edit_hhid_set = set(edit_hhids)
+    patch_deltas = [
+        (target, deltas)
+        for target, deltas in patch_deltas
+        if target["hhid"] in edit_hhid_set
+    ]
+
+    patch_file_path = write_patch_file(
+        patch_deltas=patch_deltas,
+        patch_comment=f"Other Entry Replacement for columns: {data_frame.columns.tolist()}",
+        new_file_name=f"other_entry_replacement_{generate_timestamp()}",
+        outpath=output_path,
+    )
+
+    return patch_file_path
+
+
+def _target_key_value(value: Any) -> Any:
+    # The target values are compared the way pandas reads them (1, 1.0 and "1" are the same id)
+    # and the empty cells are missing values
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or value == "" or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _format_cell(value: Any) -> str:
+    # The text pandas writes for the value of a delta (null is an empty cell)
+    if value is None:
+        return ""
+    return str(value)
+
+
+def load_patch_index(
+    patch_file_path: Path,
+) -> Tuple[List[str], Dict[Tuple[Any, ...], Dict[str, Any]]]:
+    """Loads a patch file into a hash index of the deltas by target, the deltas of the patches
+    with the same target are merged (the later ones win)
+
+    Args:
+        patch_file_path (Path): Path of the patch file
+
+    Returns:
+        Tuple[List[str], Dict[Tuple[Any, ...], Dict[str, Any]]]: The target columns and the
+        deltas of every target (the key has the target values in the order of the columns)
+    """
+    with open(patch_file_path, "r") as file_ptr:
+        patches = json.load(file_ptr)["patches"]
+
+    target_columns = list(
+        dict.fromkeys(col for patch in patches for col in patch["target"])
+    )
+    if len(target_columns) == 0:
+        target_columns = list(ID_COLUMNS)
+
+    patch_index: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+    for patch in patches:
+        key = tuple(
+            _target_key_value(patch["target"].get(col)) for col in target_columns
+        )
+        patch_index.setdefault(key, {}).update(patch["deltas"])
+
+    return target_columns, patch_index
+
+
+def apply_patch_file(
+    data_in_path: Path,
+    patch_file_path: Path,
+    data_out_path: Path,
+    chunksize: int = APPLY_CHUNKSIZE,
+) -> Path:
+    """Applies a patch file to a data file and writes the new version of the data file, a chunk
+    of rows at a time. Every row is looked up by its target columns (hhid, redcap_event_name)
+    in the index of the patch file, so only a chunk of the data file and the patch are in memory.
+
+    The cells are read and written as text, so the cells the patch doesn't change are written
+    the way they were (only the quoting can change). The columns the patch adds go at the end.
+
+    Args:
+        data_in_path (Path): Path of the data file (csv or tsv)
+        patch_file_path (Path): Path of the patch file
+        data_out_path (Path): Path of the new version of the data file (csv or tsv)
+        chunksize (int, optional): Number of rows in each chunk. Defaults to APPLY_CHUNKSIZE.
+
+    Raises:
+        ValueError: One of the data files is not a csv or tsv file, or the new version would overwrite the data file
+        KeyError: The data file doesn't have the target columns of the patches
+
+    Returns:
+        Path: Path of the new version of the data file
+    """
+    for path in [data_in_path, data_out_path]:
+        if path.suffix not in PATCHABLE_SUFFIXES:
+            raise ValueError(
+                f"Patches can only be applied to csv and tsv files: {path}"
+            )
+    if data_out_path.resolve() == data_in_path.resolve():
+        raise ValueError(
+            "The new version can't overwrite the data file it is read from"
+        )
+
+    target_columns, patch_index = load_patch_index(patch_file_path)
+    logger.info("Loaded %d patches from %s", len(patch_index), patch_file_path)
+
+    header = pd.read_csv(
+        data_in_path, sep=PATCHABLE_SUFFIXES[data_in_path.suffix], nrows=0
+    ).columns.tolist()
+    missing_columns = [col for col in target_columns if col not in header]
+    if len(missing_columns) > 0:
+        raise KeyError(
+            f"The data file doesn't have the target columns {missing_columns}"
+        )
+
+    new_columns = list(
+        dict.fromkeys(
+            col
+            for deltas in patch_index.values()
+            for col in deltas
+            if col not in header
+        )
+    )
+    if len(new_columns) > 0:
+        logger.info("Adding the columns %s", new_columns)
+
+    applied_keys = set()
+    cell_count = 0
+    header_written = False
+    with pd.read_csv(
+        data_in_path,
+        sep=PATCHABLE_SUFFIXES[data_in_path.suffix],
+        chunksize=chunksize,
+        dtype=str,
+        keep_default_na=False,
+    ) as reader:
+        for chunk in reader:
+            for col in new_columns:
+                chunk[col] = ""
+
+            keys = zip(
+                *[
+                    [
+                        _target_key_value(value)
+                        for value in cast_series(chunk[col]).tolist()
+                    ]
+                    for col in target_columns
+                ]
+            )
+            # The cells are gathered by column so every column is written to once
+            column_writes: Dict[str, Tuple[List[int], List[str]]] = {}
+            for position, key in enumerate(keys):
+                deltas = patch_index.get(key)
+                if deltas is None:
+                    continue
+                applied_keys.add(key)
+                for col, value in deltas.items():
+                    positions, values = column_writes.setdefault(col, ([], []))
+                    positions.append(position)
+                    values.append(_format_cell(value))
+
+            for col, (positions, values) in column_writes.items():
+                column_values = chunk[col].to_numpy(dtype=object, copy=True)
+                column_values[positions] = values
+                chunk[col] = column_values
+                cell_count += len(positions)
+
+            chunk.to_csv(
+                data_out_path,
+                sep=PATCHABLE_SUFFIXES[data_out_path.suffix],
+                index=False,
+                mode="a" if header_written else "w",
+                header=not header_written,
+            )
+            header_written = True
+
+    if not header_written:
+        # The data file only has the header
+        pd.DataFrame(columns=header + new_columns).to_csv(
+            data_out_path, sep=PATCHABLE_SUFFIXES[data_out_path.suffix], index=False
+        )
+
+    logger.info(
+        "Applied %d of %d patches (%d cells) to %s",
+        len(applied_keys),
+        len(patch_index),
+        cell_count,
+        data_out_path,
+    )
+    missing_keys = [key for key in patch_index if key not in applied_keys]
+    if len(missing_keys) > 0:
+        logger.warning(
+            "%d patches didn't match any row of the data file", len(missing_keys)
+        )
+        logger.debug("%s", missing_keys)
+
+    return data_out_path
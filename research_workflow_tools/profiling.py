@@ -0,0 +1,189 @@
+import json
+import logging
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+# The resource module only exists on Unix, the peak RSS is not reported without it
+try:
+    import resource
+except ImportError:
+    resource = None  # type: ignore[assignment]
+
+# The logger of the package, the modules log to its children (logging.getLogger(__name__))
+PACKAGE_LOGGER_NAME = "research_workflow_tools"
+
+logger = logging.getLogger(__name__)
+
+
+def configure_logging(verbosity: int = 0) -> None:
+    """Sends the messages of the package to stdout. By default only the warnings and the errors
+    are shown, a verbosity of 1 adds the summaries of the steps and 2 the messages of every
+    suggestion row.
+
+    Args:
+        verbosity (int, optional): 0 for the warnings and the errors, 1 for the summaries of the steps and 2 (or more) for every message. Defaults to 0.
+    """
+    package_logger = logging.getLogger(PACKAGE_LOGGER_NAME)
+    if verbosity >= 2:
+        package_logger.setLevel(logging.DEBUG)
+    elif verbosity == 1:
+        package_logger.setLevel(logging.INFO)
+    else:
+        package_logger.setLevel(logging.WARNING)
+
+    # Calling it again replaces the handler instead of printing the messages twice
+    for handler in list(package_logger.handlers):
+        package_logger.removeHandler(handler)
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    package_logger.addHandler(handler)
+    package_logger.propagate = False
+
+
+def _reset_peak_rss() -> None:
+    # Linux starts the peak RSS (VmHWM) over from the current RSS when 5 is written to
+    # clear_refs, elsewhere the peak of the process so far is reported
+    try:
+        with open("/proc/self/clear_refs", "w") as file_ptr:
+            file_ptr.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        with open("/proc/self/status", "r") as file_ptr:
+            for line in file_ptr:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 2**10
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak_rss / (2**20 if sys.platform == "darwin" else 2**10)
+
+
+class PhaseRecord:
+    """The measurements of a phase, a phase that runs many times (e.g. once per chunk) adds up
+    the time, the rows and the cells and keeps the highest peak RSS (None when the platform
+    can't measure it)"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.seconds = 0.0
+        # The rows and the cells the phase reads or changes (what they are depends on the phase)
+        self.rows = 0
+        self.cells = 0
+        self.peak_rss_mb: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "seconds": round(self.seconds, 6),
+            "rows": self.rows,
+            "cells": self.cells,
+            "peak_rss_mb": (
+                None if self.peak_rss_mb is None else round(self.peak_rss_mb, 1)
+            ),
+        }
+
+
+class PhaseProfiler:
+    """Measures the wall time and the peak RSS of the phases of a run (load, strip, replace,
+    filter, patch, ...) along with the rows and the cells each of them touches, the report is
+    written as json (see write).
+
+    The peak RSS is the memory of the process the profiler is in, the worker processes are not
+    included.
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, PhaseRecord] = {}
+        self._start_time = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[PhaseRecord]:
+        """Measures a phase, the rows and the cells are set on the record that is yielded
+
+        Args:
+            name (str): The name of the phase
+
+        Yields:
+            Iterator[PhaseRecord]: The record of the phase
+        """
+        record = self.phases.setdefault(name, PhaseRecord(name))
+        _reset_peak_rss()
+        start_time = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record.calls += 1
+            record.seconds += time.perf_counter() - start_time
+            peak_rss_mb = _peak_rss_mb()
+            if peak_rss_mb is not None:
+                record.peak_rss_mb = max(record.peak_rss_mb or 0.0, peak_rss_mb)
+            logger.debug(
+                "Phase %s: %.3fs, %d rows, %d cells",
+                name,
+                record.seconds,
+                record.rows,
+                record.cells,
+            )
+
+    def report(self) -> Dict[str, Any]:
+        """Gets the report of the run
+
+        Returns:
+            Dict[str, Any]: The total time, the peak RSS (None when it can't be measured) and the
+            measurements of every phase (in the order they first ran)
+        """
+        phases = [record.to_dict() for record in self.phases.values()]
+        peak_rss_mbs = [
+            phase["peak_rss_mb"] for phase in phases if phase["peak_rss_mb"] is not None
+        ]
+        return {
+            "seconds": round(time.perf_counter() - self._start_time, 6),
+            "peak_rss_mb": max(peak_rss_mbs, default=None),
+            "phases": phases,
+        }
+
+    def write(self, report_path: Path) -> Path:
+        """Writes the report (see report) as json
+
+        Args:
+            report_path (Path): Path of the json report
+
+        Returns:
+            Path: Path of the json report
+        """
+        with open(report_path, "w") as file_ptr:
+            json.dump(self.report(), file_ptr, indent=4)
+        logger.info("Wrote the profile to %s", report_path)
+        return report_path
+
+
+@contextmanager
+def profile_phase(
+    profiler: Optional[PhaseProfiler], name: str
+) -> Iterator[PhaseRecord]:
+    """Measures a phase when there is a profiler, the record is thrown away otherwise
+
+    Args:
+        profiler (Optional[PhaseProfiler]): The profiler of the run
+        name (str): The name of the phase
+
+    Yields:
+        Iterator[PhaseRecord]: The record of the phase
+    """
+    if profiler is None:
+        yield PhaseRecord(name)
+        return
+    with profiler.phase(name) as record:
+        yield record
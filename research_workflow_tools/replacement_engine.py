@@ -0,0 +1,707 @@
+import logging
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from research_workflow_tools.changes import CellChanges
+from research_workflow_tools.utils import cast_series
+from research_workflow_tools.value_index import ColumnValueIndex, ValueIndex
+
+logger = logging.getLogger(__name__)
+
+
+def _value_key(value: Any) -> Tuple[type, Hashable]:
+    """Generates a key that keeps values of different types apart (so that True and 1 don't collide)
+
+    Args:
+        value (Any): The value to generate the key for
+
+    Returns:
+        Tuple[type, Hashable]: The key
+    """
+    return (type(value), value)
+
+
+def find_conflicting_columns(
+    human_entry_df: pd.DataFrame,
+    new_column_name_columns: List[str],
+    delete_column_value_columns: List[str],
+) -> Set[str]:
+    """Finds the columns that are both cleaned (column_name) and written to as a followup update
+    (new_column_name / delete_column_value). When this happens the order of the suggestions
+    matters across columns and the replacements can't be batched per column.
+
+    Args:
+        human_entry_df (pd.DataFrame): The human entry dataframe
+        new_column_name_columns (List[str]): A list of the new column name columns
+        delete_column_value_columns (List[str]): A list of the delete column value columns
+
+    Returns:
+        Set[str]: The set of conflicting columns
+    """
+    source_columns = set(human_entry_df["column_name"].dropna().tolist())
+
+    target_columns = set()
+    for column_name in new_column_name_columns + delete_column_value_columns:
+        target_columns |= set(human_entry_df[column_name].dropna().tolist())
+
+    return source_columns & target_columns
+
+
+def get_newly_generated_columns(
+    human_entry_df: pd.DataFrame, new_column_name_columns: List[str]
+) -> List[str]:
+    """Gets the columns that the suggestions insert values in (new_column_name)
+
+    Args:
+        human_entry_df (pd.DataFrame): The human entry dataframe
+        new_column_name_columns (List[str]): A list of the new column name columns
+
+    Returns:
+        List[str]: The newly generated columns
+    """
+    newly_generated_columns = []
+    for new_column_name_column in new_column_name_columns:
+        for col in human_entry_df[new_column_name_column].unique().tolist():
+            if pd.isna(col):
+                continue
+            newly_generated_columns.append(col)
+
+    return newly_generated_columns
+
+
+def get_to_delete_columns(
+    human_entry_df: pd.DataFrame, delete_column_value_columns: List[str]
+) -> List[str]:
+    """Gets the columns that the suggestions delete values in (delete_column_value)
+
+    Args:
+        human_entry_df (pd.DataFrame): The human entry dataframe
+        delete_column_value_columns (List[str]): A list of the delete column value columns
+
+    Returns:
+        List[str]: The columns that have values deleted
+    """
+    to_delete_columns = set()
+    for delete_column_name in delete_column_value_columns:
+        to_delete_columns |= set(human_entry_df[delete_column_name].dropna().tolist())
+
+    return list(to_delete_columns)
+
+
+def cast_value_columns(
+    human_entry_df: pd.DataFrame, new_column_value_columns: List[str]
+) -> Dict[str, List[Any]]:
+    """Casts the replacement_value and new_column_value columns once (see cast_series) instead
+    of casting every value when it is applied
+
+    Args:
+        human_entry_df (pd.DataFrame): The human entry dataframe
+        new_column_value_columns (List[str]): A list of the new column value columns
+
+    Returns:
+        Dict[str, List[Any]]: The casted values of each column, in the order of the rows
+    """
+    return {
+        column_name: cast_series(human_entry_df[column_name]).tolist()
+        for column_name in ["replacement_value"] + new_column_value_columns
+    }
+
+
+def strip_string_columns(
+    data_frame: pd.DataFrame,
+    columns: List[str],
+    changes: Optional[CellChanges] = None,
+) -> None:
+    """Trims all the string columns in the given columns
+
+    Args:
+        data_frame (pd.DataFrame): The data frame to update (updated in place)
+        columns (List[str]): The columns to trim
+        changes (Optional[CellChanges], optional): Records the cells that get trimmed. Defaults to None.
+    """
+    for col in columns:
+        if isinstance(data_frame[col].dtype, pd.CategoricalDtype):
+            _strip_categories(data_frame, col, changes)
+        # Check if the column is a string column
+        elif data_frame[col].dtype == "object":
+            # Trim the column
+            stripped_column = data_frame[col].str.strip()
+            if changes is not None:
+                unchanged = (stripped_column == data_frame[col]) | (
+                    stripped_column.isna() & data_frame[col].isna()
+                )
+                changes.record(data_frame, col, ~unchanged.to_numpy())
+            data_frame[col] = stripped_column
+
+
+def _rewrite_categories(
+    data_frame: pd.DataFrame, column_name: str, new_values: np.ndarray
+) -> None:
+    """Replaces every category of a categorical column with its new value, the cells keep
+    their codes so only the categories are written. The categories that end up with the same
+    value are merged and the missing values become missing cells.
+
+    Args:
+        data_frame (pd.DataFrame): The data frame to update (updated in place)
+        column_name (str): The categorical column
+        new_values (np.ndarray): The new value of each of the categories (object array)
+    """
+    codes = data_frame[column_name].cat.codes.to_numpy()
+    # The missing cells (-1) stay missing
+    new_category_codes: Dict[Tuple[type, Hashable], int] = {}
+    category_codes = np.full(len(new_values) + 1, -1, dtype=np.int64)
+    for position, value in enumerate(new_values):
+        if pd.isna(value):
+            continue
+        category_codes[position] = new_category_codes.setdefault(
+            _value_key(value), len(new_category_codes)
+        )
+
+    new_categories = [value for _, value in new_category_codes.keys()]
+    try:
+        column = pd.Categorical.from_codes(
+            category_codes[codes], categories=pd.Index(new_categories, dtype=object)
+        )
+    except ValueError:
+        # Values that pandas sees as the same category (e.g. True and 1) are kept apart in an
+        # object column
+        column = np.append(new_values, np.nan).astype(object)[codes]
+    data_frame[column_name] = pd.Series(column, index=data_frame.index)
+
+
+def _strip_categories(
+    data_frame: pd.DataFrame, column_name: str, changes: Optional[CellChanges] = None
+) -> None:
+    """Trims the categories of a categorical column instead of every cell (same result as
+    column.str.strip() on the object column)
+
+    Args:
+        data_frame (pd.DataFrame): The data frame to update (updated in place)
+        column_name (str): The categorical column
+        changes (Optional[CellChanges], optional): Records the cells that get trimmed. Defaults to None.
+    """
+    categories = data_frame[column_name].cat.categories.to_numpy(dtype=object)
+    stripped_categories = np.array(
+        [value.strip() if isinstance(value, str) else np.nan for value in categories],
+        dtype=object,
+    )
+    changed_categories = np.flatnonzero(
+        [
+            not (isinstance(value, str) and value == stripped)
+            for value, stripped in zip(categories, stripped_categories)
+        ]
+    )
+    if len(changed_categories) == 0:
+        return
+
+    if changes is not None:
+        changes.record(
+            data_frame,
+            column_name,
+            np.isin(data_frame[column_name].cat.codes.to_numpy(), changed_categories),
+        )
+    _rewrite_categories(data_frame, column_name, stripped_categories)
+
+
+def _apply_plan_to_categories(
+    data_frame: pd.DataFrame,
+    column_name: str,
+    plan: "ColumnReplacementPlan",
+    changes: Optional[CellChanges] = None,
+) -> None:
+    """Writes the final value of every unique value of the plan to the categories of the column
+    (a dictionary rewrite), same result as writing the final writes of the plan to the cells
+
+    Args:
+        data_frame (pd.DataFrame): The data frame to update (updated in place)
+        column_name (str): The (stripped) categorical column
+        plan (ColumnReplacementPlan): The replayed suggestions of the column
+        changes (Optional[CellChanges], optional): Records the cells that are written to. Defaults to None.
+    """
+    if len(plan.assignments) == 0:
+        return
+    if changes is not None:
+        # A single record, reading the old values converts the whole column to values
+        changes.record(
+            data_frame,
+            column_name,
+            np.concatenate([positions for positions, _ in plan.final_writes()]),
+        )
+
+    categories = data_frame[column_name].cat.categories
+    new_values = categories.to_numpy(dtype=object).copy()
+    category_positions = categories.get_indexer(
+        pd.Index(plan.column_index.unique_values, dtype=object)
+    )
+    for category_position, value in zip(category_positions, plan.current_values):
+        new_values[category_position] = value
+    _rewrite_categories(data_frame, column_name, new_values)
+
+
+def categorical_columns_to_object(data_frame: pd.DataFrame) -> None:
+    """Converts the categorical columns back to object columns, for the ways of applying the
+    suggestions that write to the cells
+
+    Args:
+        data_frame (pd.DataFrame): The data frame to update (updated in place)
+    """
+    for col in data_frame.columns:
+        if isinstance(data_frame[col].dtype, pd.CategoricalDtype):
+            data_frame[col] = data_frame[col].astype(object)
+
+
+class ColumnReplacementPlan:
+    """Tracks the replacements for a single column at the level of its unique values.
+
+    The rows are grouped by their unique value in the column index and the suggestions are
+    replayed, in order, on the current value of each code instead of on every cell. The
+    rows matched by a suggestion are only materialized when they are needed.
+    """
+
+    def __init__(self, column_index: ColumnValueIndex):
+        self.column_index = column_index
+        self.current_values: List[Any] = list(column_index.unique_values)
+        self.assignments: List[Tuple[List[int], Any]] = []
+        self._matched_codes: Set[int] = set()
+
+        # Maps the current value to the codes that have that value (missing values never match)
+        self._codes_by_value: Dict[Hashable, List[int]] = {}
+        for code, value in enumerate(self.current_values):
+            self._add_code(code, value)
+
+    def _add_code(self, code: int, value: Any) -> None:
+        if pd.isna(value):
+            return
+        self._codes_by_value.setdefault(value, []).append(code)
+
+    def positions(self, codes: List[int]) -> np.ndarray:
+        """Returns the row positions for the given codes
+
+        Args:
+            codes (List[int]): The codes
+
+        Returns:
+            np.ndarray: The row positions
+        """
+        if len(codes) == 0:
+            return np.empty(0, dtype=self.column_index.codes.dtype)
+        return np.concatenate(
+            [self.column_index.positions_for_code(code) for code in codes]
+        )
+
+    def match(self, unique_value: Any) -> List[int]:
+        """Gets the codes that currently have the unique value (equivalent to column == unique_value)
+
+        Args:
+            unique_value (Any): The value to match
+
+        Returns:
+            List[int]: The codes that match
+        """
+        if pd.isna(unique_value):
+            return []
+        codes = list(self._codes_by_value.get(unique_value, []))
+        self._matched_codes.update(codes)
+        return codes
+
+    def assign(self, codes: List[int], value: Any) -> None:
+        """Assigns a new value to all the rows of the given codes
+
+        Args:
+            codes (List[int]): The codes to update
+            value (Any): The new value
+        """
+        self.assignments.append((codes, value))
+        for code in codes:
+            old_value = self.current_values[code]
+            if not pd.isna(old_value):
+                self._codes_by_value[old_value].remove(code)
+                if len(self._codes_by_value[old_value]) == 0:
+                    del self._codes_by_value[old_value]
+
+            self.current_values[code] = value
+            self._add_code(code, value)
+
+    def matched_positions(self) -> np.ndarray:
+        """Returns the row positions of all the rows that were matched by any of the suggestions
+
+        Returns:
+            np.ndarray: The row positions
+        """
+        return self.positions(sorted(self._matched_codes))
+
+    def final_writes(self) -> List[Tuple[np.ndarray, Any]]:
+        """Resolves the assignments so that every code only keeps its last assignment
+
+        Returns:
+            List[Tuple[np.ndarray, Any]]: (row positions, value) pairs in the order of the assignments,
+            the row positions are empty when the assignment was overwritten later
+        """
+        last_assignment = {}
+        for index, (codes, _) in enumerate(self.assignments):
+            for code in codes:
+                last_assignment[code] = index
+
+        surviving_codes: List[List[int]] = [[] for _ in self.assignments]
+        for code, index in last_assignment.items():
+            surviving_codes[index].append(code)
+
+        return [
+            (self.positions(codes), value)
+            for codes, (_, value) in zip(surviving_codes, self.assignments)
+        ]
+
+
+def _resolve_last_writes(
+    writes: List[Tuple[np.ndarray, Any]]
+) -> List[Tuple[np.ndarray, Any]]:
+    """Resolves a list of ordered writes to a single column so that the last write to a row wins
+
+    Args:
+        writes (List[Tuple[np.ndarray, Any]]): (row positions, value) pairs in the order they are applied
+
+    Returns:
+        List[Tuple[np.ndarray, Any]]: (row positions, value) pairs in the same order, the row positions
+        only keep the rows that are not overwritten later
+    """
+    all_positions = np.concatenate([positions for positions, _ in writes])
+    all_write_ids = np.concatenate(
+        [np.full(len(positions), index) for index, (positions, _) in enumerate(writes)]
+    )
+
+    # Keep the last write for every row position
+    unique_positions, first_in_reverse = np.unique(
+        all_positions[::-1], return_index=True
+    )
+    winning_write_ids = all_write_ids[::-1][first_in_reverse]
+
+    # Split the surviving positions by the write they came from
+    order = np.argsort(winning_write_ids, kind="stable")
+    boundaries = np.searchsorted(winning_write_ids[order], np.arange(len(writes) + 1))
+
+    return [
+        (unique_positions[order[boundaries[index] : boundaries[index + 1]]], value)
+        for index, (_, value) in enumerate(writes)
+    ]
+
+
+def _apply_writes(
+    data_frame: pd.DataFrame,
+    column_name: str,
+    writes: List[Tuple[np.ndarray, Any]],
+    changes: Optional[CellChanges] = None,
+) -> None:
+    """Writes the values in the data frame with the same casting rules as doing
+    data_frame.loc[locations, column_name] = value for every write in order.
+
+    The writes must not overlap (see _resolve_last_writes). Writes that don't hit any rows still
+    count since pandas upcasts the column when the value doesn't fit its dtype.
+
+    Args:
+        data_frame (pd.DataFrame): The data frame to update
+        column_name (str): The column to update
+        writes (List[Tuple[np.ndarray, Any]]): (row positions, value) pairs in order
+        changes (Optional[CellChanges], optional): Records the cells that are written to. Defaults to None.
+    """
+    if len(writes) == 0:
+        return
+
+    if changes is not None:
+        for positions, _ in writes:
+            changes.record(data_frame, column_name, positions)
+
+    if column_name not in data_frame.columns:
+        # The first .loc write creates the column (and decides its dtype)
+        first_positions, first_value = writes[0]
+        first_locations = np.zeros(len(data_frame), dtype=bool)
+        first_locations[first_positions] = True
+        data_frame.loc[first_locations, column_name] = first_value
+
+    # Work out the dtype of the column after each of the writes on a single row copy
+    dtypes = []
+    probe = data_frame[[column_name]].iloc[:1].copy()
+    for _, value in writes:
+        if probe[column_name].dtype != object:
+            probe.loc[np.zeros(len(probe), dtype=bool), column_name] = value
+        dtypes.append(probe[column_name].dtype)
+
+    column_index = data_frame.columns.get_loc(column_name)
+
+    # Within a stretch of writes with the same dtype the order doesn't matter, so
+    # all the rows that get the same value are written together
+    grouped: Dict[Tuple[type, Hashable], Tuple[List[np.ndarray], Any]] = {}
+    for index, (positions, value) in enumerate(writes):
+        if data_frame[column_name].dtype != dtypes[index]:
+            _write_grouped(data_frame, column_index, grouped)
+            grouped = {}
+            data_frame[column_name] = data_frame[column_name].astype(dtypes[index])
+
+        if len(positions) == 0:
+            continue
+        # NaN is not equal to itself, so all the missing values go in a single bucket
+        key = (float, "nan") if pd.isna(value) else _value_key(value)
+        grouped.setdefault(key, ([], value))[0].append(positions)
+
+    _write_grouped(data_frame, column_index, grouped)
+
+
+def _write_grouped(
+    data_frame: pd.DataFrame,
+    column_index: int,
+    grouped: Dict[Tuple[type, Hashable], Tuple[List[np.ndarray], Any]],
+) -> None:
+    for positions, value in grouped.values():
+        data_frame.iloc[np.sort(np.concatenate(positions)), column_index] = value
+
+
+def apply_batched_replacements(
+    data_frame: pd.DataFrame,
+    human_entry_df: pd.DataFrame,
+    new_column_name_columns: List[str],
+    new_column_value_columns: List[str],
+    delete_column_value_columns: List[str],
+    value_index: Optional[ValueIndex] = None,
+    changes: Optional[CellChanges] = None,
+) -> Tuple[List[Any], List[str]]:
+    """Applies all the suggestions in the human entry dataframe to the data frame, one column at a time.
+
+    The suggestions are grouped by column_name and replayed on the unique values of the column, the
+    replacements, deletes, new_column_* inserts and delete_column_value clears are then written once
+    per (column, value). The result is the same as applying the suggestions row by row.
+
+    Args:
+        data_frame (pd.DataFrame): The data frame to update (updated in place)
+        human_entry_df (pd.DataFrame): The (stripped) human entry dataframe
+        new_column_name_columns (List[str]): A list of the new column name columns
+        new_column_value_columns (List[str]): A list of the new column value columns
+        delete_column_value_columns (List[str]): A list of the delete column value columns
+        value_index (Optional[ValueIndex], optional): The index of the (stripped) data frame, built if not given. Defaults to None.
+        changes (Optional[CellChanges], optional): Records the cells that are written to. Defaults to None.
+
+    Returns:
+        Tuple[List[Any], List[str]]: The hhids that need to be edited and the columns that had values deleted
+    """
+    if value_index is None:
+        value_index = ValueIndex(data_frame)
+
+    plans: Dict[str, ColumnReplacementPlan] = {}
+    followup_writes: Dict[str, List[Tuple[np.ndarray, Any]]] = {}
+    to_delete_columns = []
+    casted_values = cast_value_columns(human_entry_df, new_column_value_columns)
+
+    for position, row in enumerate(human_entry_df.to_dict("records")):
+        column_name = row["column_name"]
+        if column_name not in plans:
+            plans[column_name] = ColumnReplacementPlan(value_index.column(column_name))
+        plan = plans[column_name]
+
+        matched_codes = plan.match(row["unique_value"])
+
+        # Added the new value to the new column (this the followup update)
+        for new_column_name, new_column_value in zip(
+            new_column_name_columns, new_column_value_columns
+        ):
+            update_column_name = row[new_column_name]
+            insertion_value = row[new_column_value]
+
+            if pd.isna(insertion_value) or pd.isna(update_column_name):
+                continue
+
+            followup_writes.setdefault(update_column_name, []).append(
+                (
+                    plan.positions(matched_codes),
+                    casted_values[new_column_value][position],
+                )
+            )
+
+        # Delete the value in the data frame (this the followup update)
+        for delete_column_name in delete_column_value_columns:
+            if pd.isna(row[delete_column_name]):
+                continue
+
+            to_delete_columns.append(row[delete_column_name])
+            followup_writes.setdefault(row[delete_column_name], []).append(
+                (plan.positions(matched_codes), np.nan)
+            )
+
+        if row["delete_value"] is True:
+            plan.assign(matched_codes, np.nan)
+        elif pd.isna(row["replacement_value"]) is False:
+            plan.assign(matched_codes, casted_values["replacement_value"][position])
+
+    edit_hhids = []
+    for column_name, plan in plans.items():
+        logger.debug(
+            "Column %s: Applying %d updates", column_name, len(plan.assignments)
+        )
+        edit_hhids += list(value_index.ids_at(plan.matched_positions()))
+        if isinstance(data_frame[column_name].dtype, pd.CategoricalDtype):
+            _apply_plan_to_categories(data_frame, column_name, plan, changes)
+        else:
+            _apply_writes(data_frame, column_name, plan.final_writes(), changes)
+
+    for column_name, writes in followup_writes.items():
+        logger.debug(
+            "Column %s: Applying %d followup updates", column_name, len(writes)
+        )
+        _apply_writes(data_frame, column_name, _resolve_last_writes(writes), changes)
+
+    return edit_hhids, to_delete_columns
+
+
+def apply_sequential_replacements(
+    data_frame: pd.DataFrame,
+    human_entry_df: pd.DataFrame,
+    new_column_name_columns: List[str],
+    new_column_value_columns: List[str],
+    delete_column_value_columns: List[str],
+    changes: Optional[CellChanges] = None,
+) -> Tuple[List[Any], List[str]]:
+    """Applies the suggestions in the human entry dataframe to the data frame row by row. This is
+    only used when the suggestions write to the columns that are being cleaned (see find_conflicting_columns).
+
+    Args:
+        data_frame (pd.DataFrame): The data frame to update (updated in place)
+        human_entry_df (pd.DataFrame): The (stripped) human entry dataframe
+        new_column_name_columns (List[str]): A list of the new column name columns
+        new_column_value_columns (List[str]): A list of the new column value columns
+        delete_column_value_columns (List[str]): A list of the delete column value columns
+        changes (Optional[CellChanges], optional): Records the cells that are written to. Defaults to None.
+
+    Returns:
+        Tuple[List[Any], List[str]]: The hhids that need to be edited and the columns that had values deleted
+    """
+    # The suggestions are written to the cells one at a time
+    categorical_columns_to_object(data_frame)
+    edit_hhids = []
+    to_delete_columns = []
+    casted_values = cast_value_columns(human_entry_df, new_column_value_columns)
+    for position, (index, row) in enumerate(human_entry_df.iterrows()):
+        logger.debug("Processing row %s:", index)
+        # Get the column name
+        column_name = row["column_name"]
+        # Get the unique value
+        unique_value = row["unique_value"]
+        # Get the replacement value
+        replacement_value = row["replacement_value"]
+        # Get the flag to delete the value
+        delete_value = row["delete_value"]
+
+        # Get the locations where the unique value is present
+        locations = data_frame[column_name] == unique_value
+        logger.debug("Processing row %s: Locations: %d", index, locations.sum())
+
+        edit_hhids += data_frame[locations]["hhid"].unique().tolist()
+
+        # Added the new value to the new column (this the followup update)
+        for new_column_name, new_column_value in zip(
+            new_column_name_columns, new_column_value_columns
+        ):
+            # Get the new column name
+            update_column_name = row[new_column_name]
+            # Get the new column value
+            insertion_value = row[new_column_value]
+
+            if pd.isna(insertion_value) or pd.isna(update_column_name):
+                continue
+
+            # Replace the value in the data frame
+            if changes is not None:
+                changes.record(data_frame, update_column_name, locations.to_numpy())
+            data_frame.loc[locations, update_column_name] = casted_values[
+                new_column_value
+            ][position]
+
+            logger.debug(
+                "Processing row %s: Inserting %s in %s as an update for %s in %s",
+                index,
+                insertion_value,
+                update_column_name,
+                unique_value,
+                column_name,
+            )
+
+        # Delete the value in the data frame (this the followup update)
+        for delete_column_name in delete_column_value_columns:
+            if pd.isna(row[delete_column_name]):
+                continue
+
+            # Add to the to_delete_columns list
+            to_delete_columns.append(row[delete_column_name])
+
+            # Delete the value in the data frame
+            if changes is not None:
+                changes.record(
+                    data_frame, row[delete_column_name], locations.to_numpy()
+                )
+            data_frame.loc[locations, row[delete_column_name]] = np.nan
+
+            logger.debug(
+                "Processing row %s: Deleting %s in %s",
+                index,
+                unique_value,
+                row[delete_column_name],
+            )
+
+        if changes is not None and (
+            delete_value is True or pd.isna(replacement_value) is False
+        ):
+            changes.record(data_frame, column_name, locations.to_numpy())
+
+        if delete_value is True:
+            # Delete the value in the data frame
+            data_frame.loc[locations, column_name] = np.nan
+            logger.debug(
+                "Processing row %s: Deleting value %s in %s",
+                index,
+                unique_value,
+                column_name,
+            )
+
+        elif pd.isna(replacement_value) is False:
+            # Replace the value in the data frame (this the actual update)
+            data_frame.loc[locations, column_name] = casted_values["replacement_value"][
+                position
+            ]
+
+            logger.debug(
+                "Processing row %s: Replacing %s with %s in %s",
+                index,
+                unique_value,
+                replacement_value,
+                column_name,
+            )
+
+    return edit_hhids, to_delete_columns
+
+
+def select_replacement_function(
+    human_entry_df: pd.DataFrame,
+    new_column_name_columns: List[str],
+    delete_column_value_columns: List[str],
+) -> Callable[..., Tuple[List[Any], List[str]]]:
+    """Picks how the suggestions get applied. The suggestions are batched per column unless they
+    write to the columns that are being cleaned, in which case the order of the rows matters and
+    we apply them one by one.
+
+    Args:
+        human_entry_df (pd.DataFrame): The human entry dataframe
+        new_column_name_columns (List[str]): A list of the new column name columns
+        delete_column_value_columns (List[str]): A list of the delete column value columns
+
+    Returns:
+        Callable[..., Tuple[List[Any], List[str]]]: apply_batched_replacements or apply_sequential_replacements
+    """
+    conflicting_columns = find_conflicting_columns(
+        human_entry_df, new_column_name_columns, delete_column_value_columns
+    )
+    if len(conflicting_columns) > 0:
+        logger.info(
+            "Columns %s are both cleaned and updated, applying the suggestions row by row",
+            sorted(conflicting_columns),
+        )
+        return apply_sequential_replacements
+
+    return apply_batched_replacements
@@ -0,0 +1,549 @@
+import logging
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from research_workflow_tools.loaders import (
+    ID_COLUMNS,
+    get_replacement_columns,
+    read_data_chunks,
+    read_header,
+)
+from research_workflow_tools.patching import write_other_entry_patch
+from research_workflow_tools.profiling import PhaseProfiler, profile_phase
+from research_workflow_tools.replacement_engine import (
+    cast_value_columns,
+    get_newly_generated_columns,
+    get_to_delete_columns,
+)
+
+logger = logging.getLogger(__name__)
+
+# The number of rows that are read (and inserted in the database) at a time
+SQLITE_CHUNKSIZE = 50_000
+
+# The page cache of the database (in MB), the memory used by SQLite stays under this
+SQLITE_CACHE_MB = 64
+
+# The characters str.strip() removes, trim() only removes spaces by default
+_WHITESPACE = "".join(
+    chr(code) for code in range(sys.maxunicode + 1) if chr(code).isspace()
+)
+
+# The row position of the data file (the primary key of the data table)
+_ROW_COLUMN = "_row"
+
+
+def _quote(column_name: str) -> str:
+    # SQLite identifier, the column names are taken as they are in the data file
+    return '"' + str(column_name).replace('"', '""') + '"'
+
+
+def _python_value(value: Any) -> Any:
+    # The value that gets bound in a query or written in the patch file (missing values are
+    # NULL and the numpy scalars become python values)
+    if value is None:
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def _is_unchanged(new_value: Any, old_value: Any) -> bool:
+    # Same comparison as CellChanges.changed_cells
+    new_missing = new_value is None or pd.isna(new_value)
+    old_missing = old_value is None or pd.isna(old_value)
+    if new_missing or old_missing:
+        return new_missing and old_missing
+    return bool(new_value == old_value)
+
+
+def _common_dtype(dtypes: Set[str]) -> str:
+    # The dtype pandas gives a column when it reads the whole file, from the dtypes of the
+    # chunks (the integers with missing values in another chunk end up as floats)
+    if len(dtypes) == 1:
+        return next(iter(dtypes))
+    if dtypes <= {"int64", "float64"}:
+        return "float64"
+    return "object"
+
+
+class SqliteDatasetStore:
+    """A copy of the columns of a data file in a SQLite database on disk, the suggestions are
+    applied with set based UPDATEs on the rows a suggestion matches.
+
+    The value every cell had before its first write is kept in the change log table along with
+    the last write to the cell, so the changed cells are read back from the database at the end
+    instead of comparing the data with a copy. The writes are numbered per column and their
+    values are kept in python (a value per suggestion), so the cells get the values (and the
+    types) they would get in a data frame.
+    """
+
+    def __init__(self, database_path: Path, columns: List[str]):
+        self.database_path = database_path
+        self.columns = columns
+        # The dtype of every column of the data file when it is loaded in pandas
+        self.dtypes: Dict[str, str] = {}
+        self._column_ids = {col: column_id for column_id, col in enumerate(columns)}
+        self._writes: Dict[str, List[Any]] = {}
+        self._matched_count = 0
+
+        self.connection = sqlite3.connect(database_path)
+        # The database is a scratch copy, it is thrown away if the run fails
+        self.connection.execute("PRAGMA journal_mode = OFF")
+        self.connection.execute("PRAGMA synchronous = OFF")
+        self.connection.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_MB * 2**10}")
+
+        # The columns don't have a type so the values keep the type they are inserted with
+        self.connection.execute(
+            f"CREATE TABLE data ({_quote(_ROW_COLUMN)} INTEGER PRIMARY KEY, "
+            + ", ".join(_quote(col) for col in columns)
+            + ")"
+        )
+        self.connection.execute(
+            "CREATE TABLE change_log (row_id INTEGER, column_id INTEGER, old_value, "
+            "write_id INTEGER, PRIMARY KEY (column_id, row_id)) WITHOUT ROWID"
+        )
+        self.connection.execute(
+            "CREATE TEMP TABLE matched (row_id INTEGER PRIMARY KEY)"
+        )
+        self.connection.execute("CREATE TEMP TABLE edited (row_id INTEGER PRIMARY KEY)")
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def ingest(self, chunks: Iterable[pd.DataFrame]) -> Iterable[int]:
+        """Inserts the chunks of the data file, the columns that are not in a chunk are left
+        empty (NULL)
+
+        Args:
+            chunks (Iterable[pd.DataFrame]): The chunks of the data file (see read_data_chunks)
+
+        Yields:
+            Iterable[int]: The number of rows of every chunk, after it is inserted
+        """
+        chunk_dtypes: Dict[str, Set[str]] = {}
+        with self.connection:
+            for chunk in chunks:
+                chunk_columns = [col for col in self.columns if col in chunk.columns]
+                for col in chunk_columns:
+                    chunk_dtypes.setdefault(col, set()).add(str(chunk[col].dtype))
+
+                values = [
+                    chunk[col].astype(object).where(chunk[col].notna(), None).tolist()
+                    for col in chunk_columns
+                ]
+                self.connection.executemany(
+                    f"INSERT INTO data ({_quote(_ROW_COLUMN)}, "
+                    + ", ".join(_quote(col) for col in chunk_columns)
+                    + ") VALUES ("
+                    + ", ".join(["?"] * (len(chunk_columns) + 1))
+                    + ")",
+                    zip(chunk.index.tolist(), *values),
+                )
+                yield len(chunk)
+
+        self.dtypes = {
+            col: _common_dtype(dtypes) for col, dtypes in chunk_dtypes.items()
+        }
+
+    def create_indexes(self, columns: List[str]) -> None:
+        """Indexes the id columns (together) and each of the given columns
+
+        Args:
+            columns (List[str]): The columns the suggestions look up values in
+        """
+        with self.connection:
+            id_columns = [col for col in ID_COLUMNS if col in self.columns]
+            if len(id_columns) > 0:
+                self.connection.execute(
+                    "CREATE INDEX index_ids ON data ("
+                    + ", ".join(_quote(col) for col in id_columns)
+                    + ")"
+                )
+            for col in columns:
+                self.connection.execute(
+                    f"CREATE INDEX {_quote('index_' + col)} ON data ({_quote(col)})"
+                )
+
+    def strip(self, columns: List[str]) -> int:
+        """Trims the text columns, same as column.str.strip() (the values that are not strings
+        become missing)
+
+        Args:
+            columns (List[str]): The columns to trim
+
+        Returns:
+            int: The number of cells that changed
+        """
+        cell_count = 0
+        with self.connection:
+            for col in columns:
+                if self.dtypes.get(col, "object") != "object":
+                    continue
+                changed = (
+                    f"{_quote(col)} IS NOT NULL AND (typeof({_quote(col)}) <> 'text' "
+                    f"OR {_quote(col)} <> trim({_quote(col)}, :whitespace))"
+                )
+                cell_count += self.connection.execute(
+                    f"INSERT INTO change_log SELECT {_quote(_ROW_COLUMN)}, :column_id, "
+                    f"{_quote(col)}, -1 FROM data WHERE {changed}",
+                    {"column_id": self._column_ids[col], "whitespace": _WHITESPACE},
+                ).rowcount
+                self.connection.execute(
+                    f"UPDATE data SET {_quote(col)} = CASE WHEN typeof({_quote(col)}) = "
+                    f"'text' THEN trim({_quote(col)}, :whitespace) END WHERE {changed}",
+                    {"whitespace": _WHITESPACE},
+                )
+        return cell_count
+
+    def match(self, column_name: str, value: Any) -> int:
+        """Finds the rows where the column has the value (same as column == value), the next
+        writes go to these rows
+
+        Args:
+            column_name (str): The column to look in
+            value (Any): The value to look for (missing values never match)
+
+        Returns:
+            int: The number of rows that match
+        """
+        self.connection.execute("DELETE FROM temp.matched")
+        self._matched_count = self.connection.execute(
+            f"INSERT INTO temp.matched SELECT {_quote(_ROW_COLUMN)} FROM data "
+            f"WHERE {_quote(column_name)} = ?",
+            (_python_value(value),),
+        ).rowcount
+        if self._matched_count > 0:
+            self.connection.execute(
+                "INSERT OR IGNORE INTO temp.edited SELECT row_id FROM temp.matched"
+            )
+        return self._matched_count
+
+    def write_matched(self, column_name: str, value: Any) -> None:
+        """Writes the value in the column of the matched rows (see match)
+
+        Args:
+            column_name (str): The column to write to
+            value (Any): The new value
+        """
+        # A write that doesn't match any rows can still change the dtype of the column
+        writes = self._writes.setdefault(column_name, [])
+        writes.append(value)
+        if self._matched_count == 0:
+            return
+
+        # CROSS JOIN keeps the matched rows as the outer loop, SQLite would otherwise scan the
+        # index of the column
+        self.connection.execute(
+            f"INSERT INTO change_log SELECT row_id, ?, {_quote(column_name)}, ? "
+            f"FROM temp.matched CROSS JOIN data ON {_quote(_ROW_COLUMN)} = row_id "
+            "WHERE true "
+            "ON CONFLICT (column_id, row_id) DO UPDATE SET write_id = excluded.write_id",
+            (self._column_ids[column_name], len(writes) - 1),
+        )
+        self.connection.execute(
+            f"UPDATE data SET {_quote(column_name)} = ? WHERE {_quote(_ROW_COLUMN)} "
+            "IN (SELECT row_id FROM temp.matched)",
+            (_python_value(value),),
+        )
+
+    def edited_ids(self, id_column: str = "hhid") -> List[Any]:
+        """Gets the ids of the rows that were matched by any of the suggestions
+
+        Args:
+            id_column (str, optional): The id column. Defaults to "hhid".
+
+        Returns:
+            List[Any]: The distinct ids
+        """
+        return [
+            row[0]
+            for row in self.connection.execute(
+                f"SELECT DISTINCT {_quote(id_column)} FROM temp.edited "
+                f"CROSS JOIN data ON {_quote(_ROW_COLUMN)} = row_id"
+            )
+        ]
+
+    def _written_values(self, column_name: str) -> List[Any]:
+        # The values the writes leave in the column of a data frame, a column with numbers
+        # changes its dtype when a value doesn't fit (e.g. 3 becomes 3.0 in a float column)
+        writes = self._writes.get(column_name, [])
+        dtype = self.dtypes.get(column_name, "object")
+        if len(writes) == 0 or not pd.api.types.is_numeric_dtype(dtype):
+            return writes
+
+        probe = pd.DataFrame({column_name: np.zeros(len(writes))}).astype(
+            {column_name: dtype}
+        )
+        for position, value in enumerate(writes):
+            locations = np.zeros(len(writes), dtype=bool)
+            locations[position] = True
+            probe.loc[locations, column_name] = value
+        return probe[column_name].tolist()
+
+    def changed_cells(
+        self, columns: List[str], fetch_size: int = SQLITE_CHUNKSIZE
+    ) -> Dict[int, Dict[Hashable, Any]]:
+        """Compares the cells in the change log with their old values, the cells that were
+        written to with the value they already had are left out
+
+        Args:
+            columns (List[str]): The columns to compare (in this order)
+            fetch_size (int, optional): The number of cells read from the database at a time. Defaults to SQLITE_CHUNKSIZE.
+
+        Returns:
+            Dict[int, Dict[Hashable, Any]]: The new values (python values, see _python_value) of the
+            changed cells of every row (by row position, in the order of the rows)
+        """
+        changed_cells: Dict[int, Dict[Hashable, Any]] = {}
+        for col in columns:
+            written_values = self._written_values(col)
+            cursor = self.connection.execute(
+                f"SELECT row_id, old_value, write_id, {_quote(col)} FROM change_log "
+                f"CROSS JOIN data ON {_quote(_ROW_COLUMN)} = row_id WHERE column_id = ? "
+                "ORDER BY row_id",
+                (self._column_ids[col],),
+            )
+            for rows in iter(lambda: cursor.fetchmany(fetch_size), []):
+                for row_id, old_value, write_id, value in rows:
+                    # The trimmed cells (-1) keep the value in the database
+                    new_value = value if write_id < 0 else written_values[write_id]
+                    if not _is_unchanged(new_value, old_value):
+                        changed_cells.setdefault(row_id, {})[col] = _python_value(
+                            new_value
+                        )
+        return {row_id: changed_cells[row_id] for row_id in sorted(changed_cells)}
+
+    def read_rows(self, row_ids: List[int], columns: List[str]) -> pd.DataFrame:
+        """Reads rows of the data table
+
+        Args:
+            row_ids (List[int]): The row positions
+            columns (List[str]): The columns to read
+
+        Returns:
+            pd.DataFrame: The rows (the index is the row position)
+        """
+        with self.connection:
+            self.connection.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS selected (row_id INTEGER PRIMARY KEY)"
+            )
+            self.connection.execute("DELETE FROM temp.selected")
+            self.connection.executemany(
+                "INSERT INTO temp.selected VALUES (?)",
+                ((row_id,) for row_id in row_ids),
+            )
+        data_frame = pd.DataFrame(
+            self.connection.execute(
+                f"SELECT {_quote(_ROW_COLUMN)}, "
+                + ", ".join(_quote(col) for col in columns)
+                + f" FROM data WHERE {_quote(_ROW_COLUMN)} IN "
+                f"(SELECT row_id FROM temp.selected) ORDER BY {_quote(_ROW_COLUMN)}"
+            ).fetchall(),
+            columns=[_ROW_COLUMN] + columns,
+        )
+        data_frame = data_frame.set_index(_ROW_COLUMN).rename_axis(None)
+
+        # SQLite stores the booleans as 0 and 1
+        for col in columns:
+            if self.dtypes.get(col) == "bool":
+                data_frame[col] = data_frame[col].astype(bool)
+        return data_frame
+
+
+def apply_suggestions_to_store(
+    store: SqliteDatasetStore,
+    human_entry_df: pd.DataFrame,
+    new_column_name_columns: List[str],
+    new_column_value_columns: List[str],
+    delete_column_value_columns: List[str],
+) -> List[Any]:
+    """Applies the suggestions row by row in a single transaction, every suggestion is a lookup
+    of the rows that have the unique value followed by an UPDATE of these rows per column it
+    writes to. This gives the same result as apply_sequential_replacements (and so as the
+    batched replacements).
+
+    Args:
+        store (SqliteDatasetStore): The (stripped) data
+        human_entry_df (pd.DataFrame): The (stripped) human entry dataframe
+        new_column_name_columns (List[str]): A list of the new column name columns
+        new_column_value_columns (List[str]): A list of the new column value columns
+        delete_column_value_columns (List[str]): A list of the delete column value columns
+
+    Returns:
+        List[Any]: The hhids that need to be edited
+    """
+    casted_values = cast_value_columns(human_entry_df, new_column_value_columns)
+    with store.connection:
+        for position, row in enumerate(human_entry_df.to_dict("records")):
+            column_name = row["column_name"]
+            matched_count = store.match(column_name, row["unique_value"])
+            logger.debug("Processing row %s: Locations: %d", position, matched_count)
+
+            # Added the new value to the new column (this the followup update)
+            for new_column_name, new_column_value in zip(
+                new_column_name_columns, new_column_value_columns
+            ):
+                if pd.isna(row[new_column_value]) or pd.isna(row[new_column_name]):
+                    continue
+                store.write_matched(
+                    row[new_column_name], casted_values[new_column_value][position]
+                )
+
+            # Delete the value in the data frame (this the followup update)
+            for delete_column_name in delete_column_value_columns:
+                if pd.isna(row[delete_column_name]):
+                    continue
+                store.write_matched(row[delete_column_name], np.nan)
+
+            if row["delete_value"] is True:
+                store.write_matched(column_name, np.nan)
+            elif pd.isna(row["replacement_value"]) is False:
+                store.write_matched(
+                    column_name, casted_values["replacement_value"][position]
+                )
+
+    return store.edited_ids()
+
+
+def process_other_entry_replacements_in_sqlite(
+    data_in_path: Path,
+    human_entry_df: pd.DataFrame,
+    new_column_name_columns: List[str],
+    new_column_value_columns: List[str],
+    delete_column_value_columns: List[str],
+    chunksize: int = SQLITE_CHUNKSIZE,
+    output_path: Path = Path("./"),
+    output_format: str = "tsv",
+    diff_path: Path = Path("others_diff"),
+    profiler: Optional[PhaseProfiler] = None,
+    database_dir: Optional[Path] = None,
+) -> Path:
+    """Applies the (stripped) human entry suggestions to the data file in a temporary SQLite
+    database. The data file is read in chunks and inserted once (the id columns and the columns
+    that get cleaned are indexed), the suggestions are applied as UPDATEs in a transaction and
+    the changed cells are read back from the change log.
+
+    Only a chunk of the data file and the page cache of the database are in memory while the
+    suggestions are applied, the memory is bounded by the chunk size plus the size of the
+    diff. Like when reading in chunks, the others diff file only has the changed rows.
+
+    Args:
+        data_in_path (Path): Path of the data file against which we do the comparison
+        human_entry_df (pd.DataFrame): The (stripped) human entry dataframe
+        new_column_name_columns (List[str]): A list of the new column name columns
+        new_column_value_columns (List[str]): A list of the new column value columns
+        delete_column_value_columns (List[str]): A list of the delete column value columns
+        chunksize (int, optional): Number of rows read (and inserted) at a time. Defaults to SQLITE_CHUNKSIZE.
+        output_path (Path, optional): Output folder where the patch file needs to go. Defaults to Path("./").
+        output_format (str, optional): The format of the others diff file ("tsv" or "parquet"). Defaults to "tsv".
+        diff_path (Path, optional): Path of the others diff file (without the extension). Defaults to Path("others_diff").
+        profiler (Optional[PhaseProfiler], optional): Measures the time, the memory and the rows and cells of each phase. Defaults to None.
+        database_dir (Optional[Path], optional): Folder of the temporary database (it needs room for a copy of the loaded columns). Defaults to the temporary folder of the system.
+
+    Returns:
+        Path: Path of the patch file
+    """
+    to_fix_columns = human_entry_df["column_name"].unique().tolist()
+    newly_generated_columns = get_newly_generated_columns(
+        human_entry_df, new_column_name_columns
+    )
+    to_delete_columns = get_to_delete_columns(
+        human_entry_df, delete_column_value_columns
+    )
+    patch_columns = list(
+        set(ID_COLUMNS + to_fix_columns + newly_generated_columns + to_delete_columns)
+    )
+
+    usecols = get_replacement_columns(
+        read_header(data_in_path),
+        human_entry_df,
+        new_column_name_columns,
+        delete_column_value_columns,
+    )
+    columns = usecols + [
+        col
+        for col in dict.fromkeys(newly_generated_columns + to_delete_columns)
+        if col not in usecols
+    ]
+
+    with tempfile.TemporaryDirectory(dir=database_dir) as temp_dir:
+        store = SqliteDatasetStore(Path(temp_dir) / "dataset.sqlite", columns)
+        try:
+            with profile_phase(profiler, "load") as record:
+                chunks = read_data_chunks(data_in_path, chunksize, usecols=usecols)
+                for row_count in store.ingest(chunks):
+                    record.rows += row_count
+                    record.cells += row_count * len(usecols)
+                store.create_indexes(to_fix_columns)
+
+            with profile_phase(profiler, "strip") as record:
+                record.cells += store.strip(to_fix_columns)
+
+            with profile_phase(profiler, "replace") as record:
+                edit_hhids = apply_suggestions_to_store(
+                    store,
+                    human_entry_df,
+                    new_column_name_columns,
+                    new_column_value_columns,
+                    delete_column_value_columns,
+                )
+                record.rows += len(edit_hhids)
+
+            # Only keep the rows that changed (trimming a value counts as a change)
+            with profile_phase(profiler, "filter") as record:
+                row_deltas = store.changed_cells(
+                    [col for col in patch_columns if col not in ID_COLUMNS]
+                )
+                data_frame = store.read_rows(list(row_deltas), patch_columns)
+                for col in patch_columns:
+                    row_ids = [
+                        row_id for row_id, deltas in row_deltas.items() if col in deltas
+                    ]
+                    if len(row_ids) == 0:
+                        continue
+                    data_frame[col] = data_frame[col].astype(object)
+                    data_frame.loc[row_ids, col] = pd.Series(
+                        [row_deltas[row_id][col] for row_id in row_ids],
+                        index=row_ids,
+                        dtype=object,
+                    )
+                record.rows += len(data_frame)
+                record.cells += sum(len(deltas) for deltas in row_deltas.values())
+        finally:
+            store.close()
+
+    logger.info("HHIDS to edit: %d", len(edit_hhids))
+    logger.debug("%s", edit_hhids)
+
+    with profile_phase(profiler, "patch") as record:
+        # The rows of the data frame are in the order of the deltas
+        targets = zip(
+            *[
+                [_python_value(value) for value in data_frame[id_column].tolist()]
+                for id_column in ID_COLUMNS
+            ]
+        )
+        patch_deltas: List[Tuple[Dict[str, Any], Dict[Hashable, Any]]] = [
+            (dict(zip(ID_COLUMNS, target)), deltas)
+            for target, deltas in zip(targets, row_deltas.values())
+        ]
+        record.rows += len(patch_deltas)
+        record.cells += sum(len(deltas) for _, deltas in patch_deltas)
+
+        return write_other_entry_patch(
+            data_frame=data_frame,
+            patch_deltas=patch_deltas,
+            edit_hhids=edit_hhids,
+            output_path=output_path,
+            output_format=output_format,
+            diff_path=diff_path,
+        )
@@ -0,0 +1,297 @@
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from research_workflow_tools.changes import CellChanges
+from research_workflow_tools.loaders import (
+    ID_COLUMNS,
+    apply_string_storage,
+    get_replacement_columns,
+    get_workbook_columns,
+    is_arrow_file,
+    read_data_chunks,
+    read_header,
+)
+from research_workflow_tools.patching import write_other_entry_patch
+from research_workflow_tools.profiling import PhaseProfiler, profile_phase
+from research_workflow_tools.replacement_engine import (
+    get_newly_generated_columns,
+    get_to_delete_columns,
+    select_replacement_function,
+    strip_string_columns,
+)
+
+logger = logging.getLogger(__name__)
+
+# Values that pandas parses as booleans when it reads a csv file
+BOOLEAN_LITERALS = ["True", "TRUE", "true", "False", "FALSE", "false"]
+
+# The number of chunks of (value, hhid) pairs of a column that are kept before removing the
+# duplicates
+_HOUSEHOLD_FRAMES_LIMIT = 16
+
+
+def is_text_column(values: List[str]) -> bool:
+    """Checks if pandas would load a column with these (raw) values as a string column when
+    reading the whole file, i.e. they are not all numbers or all booleans
+
+    Args:
+        values (List[str]): The raw unique values of the column
+
+    Returns:
+        bool: True if the column has strings in it
+    """
+    if len(values) == 0:
+        return False
+
+    series = pd.Series(values, dtype=object)
+    if series.isin(BOOLEAN_LITERALS).all():
+        return False
+
+    return bool(pd.to_numeric(series, errors="coerce").isna().any())
+
+
+def _compact_households(value_households: List[pd.DataFrame]) -> List[pd.DataFrame]:
+    # Keeps a single frame with the distinct (value, hhid) pairs
+    return [pd.concat(value_households, ignore_index=True).drop_duplicates()]
+
+
+def count_human_entry_values_in_chunks(
+    data_in_path: Path, ignore_list: List[str], chunksize: int
+) -> Tuple[Dict[str, Dict[str, int]], Dict[str, pd.DataFrame]]:
+    """Counts the rows of the (stripped) unique values of all the string columns that are not in
+    the ignore list and the households (hhids) they show up in, reading the data file in chunks.
+    Only the unique values, their counts and the distinct (value, hhid) pairs are kept in memory.
+
+    The chunks are read as text so that a number in a string column stays the way it was written
+    (pandas would only convert it when the whole chunk is numeric), the columns that only have
+    numbers or booleans are dropped at the end. Parquet and Feather files keep the types they
+    were stored with, so their string columns are picked by the dtype like in a full load.
+
+    Args:
+        data_in_path (Path): Path of the data file
+        ignore_list (List[str]): The columns to ignore
+        chunksize (int): Number of rows in each chunk
+
+    Returns:
+        Tuple[Dict[str, Dict[str, int]], Dict[str, pd.DataFrame]]: The number of rows of each
+        unique value (in the order they show up) for each of the columns and the distinct
+        (value, hhid) pairs of each of the columns (empty when the file has no hhid column)
+    """
+    usecols = get_workbook_columns(read_header(data_in_path), ignore_list)
+    typed_file = is_arrow_file(data_in_path)
+
+    raw_column_counts: Dict[str, Dict[str, int]] = {}
+    raw_column_households: Dict[str, List[pd.DataFrame]] = {}
+    for chunk in read_data_chunks(data_in_path, chunksize, usecols=usecols, dtype=str):
+        for col in chunk.columns:
+            if col in ignore_list:
+                continue
+            if typed_file and chunk[col].dtype != "object":
+                continue
+            codes, uniques = pd.factorize(chunk[col], use_na_sentinel=True)
+            counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+            raw_counts = raw_column_counts.setdefault(col, {})
+            for value, count in zip(uniques.tolist(), counts.tolist()):
+                raw_counts[value] = raw_counts.get(value, 0) + count
+
+            if "hhid" not in chunk.columns:
+                continue
+            value_households = raw_column_households.setdefault(col, [])
+            value_households.append(
+                pd.DataFrame({"value": chunk[col], "hhid": chunk["hhid"]})
+                .dropna(subset=["value"])
+                .drop_duplicates()
+            )
+            if len(value_households) >= _HOUSEHOLD_FRAMES_LIMIT:
+                raw_column_households[col] = _compact_households(value_households)
+
+    human_entry_column_counts = {}
+    human_entry_column_households = {}
+    for col, raw_counts in raw_column_counts.items():
+        if typed_file:
+            raw_counts = {
+                value: count
+                for value, count in raw_counts.items()
+                if isinstance(value, str)
+            }
+        elif not is_text_column(list(raw_counts)):
+            continue
+
+        stripped_counts: Dict[str, int] = {}
+        for value, count in raw_counts.items():
+            value = value.strip()
+            stripped_counts[value] = stripped_counts.get(value, 0) + count
+        human_entry_column_counts[col] = stripped_counts
+
+        if col in raw_column_households:
+            value_households = _compact_households(raw_column_households[col])[0]
+            value_households = value_households[
+                value_households["value"].map(lambda value: isinstance(value, str))
+            ]
+            human_entry_column_households[col] = value_households.assign(
+                value=value_households["value"].str.strip()
+            ).drop_duplicates(ignore_index=True)
+
+    return human_entry_column_counts, human_entry_column_households
+
+
+def collect_human_entry_values_in_chunks(
+    data_in_path: Path, ignore_list: List[str], chunksize: int
+) -> Dict[str, List[str]]:
+    """Collects the (stripped) unique values of all the string columns that are not in the ignore
+    list, reading the data file in chunks (see count_human_entry_values_in_chunks)
+
+    Args:
+        data_in_path (Path): Path of the data file
+        ignore_list (List[str]): The columns to ignore
+        chunksize (int): Number of rows in each chunk
+
+    Returns:
+        Dict[str, List[str]]: The unique values for each of the columns
+    """
+    return {
+        col: list(value_counts)
+        for col, value_counts in count_human_entry_values_in_chunks(
+            data_in_path, ignore_list, chunksize
+        )[0].items()
+    }
+
+
+def process_other_entry_replacements_in_chunks(
+    data_in_path: Path,
+    human_entry_df: pd.DataFrame,
+    new_column_name_columns: List[str],
+    new_column_value_columns: List[str],
+    delete_column_value_columns: List[str],
+    chunksize: int,
+    output_path: Path = Path("./"),
+    output_format: str = "tsv",
+    diff_path: Path = Path("others_diff"),
+    profiler: Optional[PhaseProfiler] = None,
+    string_storage: str = "object",
+) -> Path:
+    """Applies the (stripped) human entry suggestions to the data file one chunk of rows at a time.
+
+    Every suggestion only looks at the values of a single row, so the chunks can be processed
+    independently. Only the rows (and the columns) that change are kept between the chunks, so
+    the memory is bounded by the chunk size plus the size of the diff. The others diff file
+    only has the changed rows.
+
+    The dtypes of the columns that are not cleaned are worked out per chunk, so a number that is
+    inserted in a column that is empty in a chunk can end up as a float (3.0 instead of 3).
+
+    Args:
+        data_in_path (Path): Path of the data file against which we do the comparison
+        human_entry_df (pd.DataFrame): The (stripped) human entry dataframe
+        new_column_name_columns (List[str]): A list of the new column name columns
+        new_column_value_columns (List[str]): A list of the new column value columns
+        delete_column_value_columns (List[str]): A list of the delete column value columns
+        chunksize (int): Number of rows in each chunk
+        output_path (Path, optional): Output folder where the patch file needs to go. Defaults to Path("./").
+        output_format (str, optional): The format of the others diff file ("tsv" or "parquet"). Defaults to "tsv".
+        diff_path (Path, optional): Path of the others diff file (without the extension). Defaults to Path("others_diff").
+        profiler (Optional[PhaseProfiler], optional): Measures the time, the memory and the rows and cells of each phase, the phases add up over the chunks. Defaults to None.
+        string_storage (str, optional): How the columns that get cleaned are kept in memory ("object" or "category", see options.STRING_STORAGES), every chunk has its own categories. Defaults to "object".
+
+    Returns:
+        Path: Path of the patch file
+    """
+    to_fix_columns = human_entry_df["column_name"].unique().tolist()
+    newly_generated_columns = get_newly_generated_columns(
+        human_entry_df, new_column_name_columns
+    )
+    to_delete_columns = get_to_delete_columns(
+        human_entry_df, delete_column_value_columns
+    )
+    patch_columns = list(
+        set(ID_COLUMNS + to_fix_columns + newly_generated_columns + to_delete_columns)
+    )
+
+    apply_replacements = select_replacement_function(
+        human_entry_df, new_column_name_columns, delete_column_value_columns
+    )
+
+    edit_hhids = set()
+    changed_rows = []
+    patch_deltas = []
+    usecols = get_replacement_columns(
+        read_header(data_in_path),
+        human_entry_df,
+        new_column_name_columns,
+        delete_column_value_columns,
+    )
+
+    chunks = read_data_chunks(data_in_path, chunksize, usecols=usecols)
+    while True:
+        with profile_phase(profiler, "load") as record:
+            chunk = next(chunks, None)
+            if chunk is not None:
+                record.rows += len(chunk)
+                record.cells += chunk.size
+        if chunk is None:
+            break
+
+        for col in newly_generated_columns:
+            if col not in chunk.columns:
+                chunk[col] = None
+
+        apply_string_storage(chunk, to_fix_columns, string_storage)
+
+        changes = CellChanges(len(chunk))
+        with profile_phase(profiler, "strip") as record:
+            strip_string_columns(chunk, to_fix_columns, changes)
+            stripped_rows, stripped_cells = changes.touched_counts()
+            record.rows += stripped_rows
+            record.cells += stripped_cells
+
+        with profile_phase(profiler, "replace") as record:
+            chunk_hhids, _ = apply_replacements(
+                chunk,
+                human_entry_df,
+                new_column_name_columns,
+                new_column_value_columns,
+                delete_column_value_columns,
+                changes=changes,
+            )
+            edit_hhids.update(chunk_hhids)
+            touched_rows, touched_cells = changes.touched_counts()
+            record.rows += touched_rows - stripped_rows
+            record.cells += touched_cells - stripped_cells
+
+        # Only keep the rows that changed (trimming a value counts as a change)
+        with profile_phase(profiler, "patch") as record:
+            chunk = chunk.reindex(columns=patch_columns)
+            chunk_deltas = changes.patch_deltas(chunk, ID_COLUMNS, patch_columns)
+            patch_deltas += [(target, deltas) for _, target, deltas in chunk_deltas]
+            record.rows += len(chunk_deltas)
+            record.cells += sum(len(deltas) for _, _, deltas in chunk_deltas)
+
+        with profile_phase(profiler, "filter") as record:
+            changed_rows.append(
+                chunk.iloc[[position for position, _, _ in chunk_deltas]].copy()
+            )
+            record.rows += len(changed_rows[-1])
+            record.cells += changed_rows[-1].size
+
+    with profile_phase(profiler, "filter"):
+        if len(changed_rows) == 0:
+            data_frame = pd.DataFrame(columns=patch_columns)
+        else:
+            data_frame = pd.concat(changed_rows)
+
+        logger.info("HHIDS to edit: %d", len(edit_hhids))
+        logger.debug("%s", list(edit_hhids))
+
+    with profile_phase(profiler, "patch"):
+        return write_other_entry_patch(
+            data_frame=data_frame,
+            patch_deltas=patch_deltas,
+            edit_hhids=list(edit_hhids),
+            output_path=output_path,
+            output_format=output_format,
+            diff_path=diff_path,
+        )
@@ -0,0 +1,282 @@
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from research_workflow_tools.changes import CellChanges
+from research_workflow_tools.replacement_engine import select_replacement_function
+from research_workflow_tools.utils import make_process_pool
+
+logger = logging.getLogger(__name__)
+
+# The data frame the worker processes read from (inherited when the processes are forked)
+_worker_data_frame: Optional[pd.DataFrame] = None
+
+
+def find_suggestion_groups(
+    human_entry_df: pd.DataFrame,
+    new_column_name_columns: List[str],
+    delete_column_value_columns: List[str],
+) -> List[List[int]]:
+    """Splits the suggestions into groups that touch disjoint sets of columns. A suggestion reads
+    its column_name and writes to its column_name, new_column_name* and delete_column_value*
+    columns, so the groups can be applied independently of each other (the rows in a group keep
+    their order).
+
+    Args:
+        human_entry_df (pd.DataFrame): The human entry dataframe
+        new_column_name_columns (List[str]): A list of the new column name columns
+        delete_column_value_columns (List[str]): A list of the delete column value columns
+
+    Returns:
+        List[List[int]]: The row positions of each group
+    """
+    parents: Dict[Any, Any] = {}
+
+    def find(column_name):
+        parents.setdefault(column_name, column_name)
+        while parents[column_name] != column_name:
+            parents[column_name] = parents[parents[column_name]]
+            column_name = parents[column_name]
+        return column_name
+
+    rows = human_entry_df.to_dict("records")
+    for row in rows:
+        root = find(row["column_name"])
+        for target_column in new_column_name_columns + delete_column_value_columns:
+            if pd.isna(row[target_column]):
+                continue
+            parents[find(row[target_column])] = root
+
+    groups: Dict[Any, List[int]] = {}
+    for position, row in enumerate(rows):
+        groups.setdefault(find(row["column_name"]), []).append(position)
+
+    return list(groups.values())
+
+
+class GroupEffects:
+    """The changes a group of suggestions made to the data frame, i.e. the cells that changed
+    in each of the columns of the group, the hhids that need to be edited and the columns that
+    had values deleted
+    """
+
+    def __init__(
+        self,
+        columns: Dict[str, Tuple[Any, Optional[np.ndarray], np.ndarray]],
+        edit_hhids: List[Any],
+        to_delete_columns: List[str],
+    ):
+        # column name -> (dtype, changed positions or None for the whole column, values)
+        self.columns = columns
+        self.edit_hhids = edit_hhids
+        self.to_delete_columns = to_delete_columns
+
+    @classmethod
+    def compute(
+        cls,
+        data_frame: pd.DataFrame,
+        human_entry_df: pd.DataFrame,
+        new_column_name_columns: List[str],
+        new_column_value_columns: List[str],
+        delete_column_value_columns: List[str],
+    ) -> "GroupEffects":
+        """Applies a group of suggestions to a copy of the columns it touches and records the
+        changes
+
+        Args:
+            data_frame (pd.DataFrame): The (stripped) data frame, it is not modified
+            human_entry_df (pd.DataFrame): The suggestions of the group
+            new_column_name_columns (List[str]): A list of the new column name columns
+            new_column_value_columns (List[str]): A list of the new column value columns
+            delete_column_value_columns (List[str]): A list of the delete column value columns
+
+        Returns:
+            GroupEffects: The changes made by the group
+        """
+        group_columns = set(human_entry_df["column_name"].dropna().tolist())
+        for column_name in new_column_name_columns + delete_column_value_columns:
+            group_columns |= set(human_entry_df[column_name].dropna().tolist())
+
+        sub_columns = ["hhid"] + [
+            col for col in data_frame.columns if col in group_columns and col != "hhid"
+        ]
+        sub_frame = data_frame[sub_columns].copy()
+
+        apply_replacements = select_replacement_function(
+            human_entry_df, new_column_name_columns, delete_column_value_columns
+        )
+        edit_hhids, to_delete_columns = apply_replacements(
+            sub_frame,
+            human_entry_df,
+            new_column_name_columns,
+            new_column_value_columns,
+            delete_column_value_columns,
+        )
+
+        columns: Dict[str, Tuple[Any, Optional[np.ndarray], np.ndarray]] = {}
+        for col in sub_frame.columns:
+            if col not in group_columns:
+                continue
+            new_values = sub_frame[col]
+            if (
+                col not in data_frame.columns
+                or new_values.dtype != data_frame[col].dtype
+            ):
+                columns[col] = (new_values.dtype, None, new_values.to_numpy())
+                continue
+
+            old_values = data_frame[col]
+            unchanged = (new_values == old_values) | (
+                new_values.isna() & old_values.isna()
+            )
+            positions = np.flatnonzero(~unchanged.to_numpy())
+            if len(positions) > 0:
+                columns[col] = (
+                    new_values.dtype,
+                    positions,
+                    new_values.to_numpy()[positions],
+                )
+
+        return cls(columns, list(set(edit_hhids)), list(set(to_delete_columns)))
+
+    def apply(
+        self, data_frame: pd.DataFrame, changes: Optional[CellChanges] = None
+    ) -> None:
+        """Writes the changes to the data frame
+
+        Args:
+            data_frame (pd.DataFrame): The (stripped) data frame (updated in place)
+            changes (Optional[CellChanges], optional): Records the cells that are written to. Defaults to None.
+        """
+        for col, (dtype, positions, values) in self.columns.items():
+            if changes is not None:
+                changes.record(
+                    data_frame,
+                    col,
+                    np.arange(len(data_frame)) if positions is None else positions,
+                )
+            if positions is None:
+                data_frame[col] = pd.Series(values, index=data_frame.index, dtype=dtype)
+            else:
+                data_frame.iloc[positions, data_frame.columns.get_loc(col)] = values
+
+
+def _init_worker(data_frame: pd.DataFrame) -> None:
+    global _worker_data_frame
+    _worker_data_frame = data_frame
+
+
+def _compute_in_worker(
+    human_entry_df: pd.DataFrame,
+    new_column_name_columns: List[str],
+    new_column_value_columns: List[str],
+    delete_column_value_columns: List[str],
+) -> GroupEffects:
+    return GroupEffects.compute(
+        _worker_data_frame,
+        human_entry_df,
+        new_column_name_columns,
+        new_column_value_columns,
+        delete_column_value_columns,
+    )
+
+
+def compute_group_effects(
+    data_frame: pd.DataFrame,
+    group_dfs: List[pd.DataFrame],
+    new_column_name_columns: List[str],
+    new_column_value_columns: List[str],
+    delete_column_value_columns: List[str],
+    workers: int = 1,
+) -> List[GroupEffects]:
+    """Computes the changes of each group of suggestions against the data frame, in a pool of
+    processes when there is more than one worker. The processes are forked (where the platform
+    allows it) so they read the columns of the data frame without copying them.
+
+    Args:
+        data_frame (pd.DataFrame): The (stripped) data frame, it is not modified
+        group_dfs (List[pd.DataFrame]): The suggestions of each group
+        new_column_name_columns (List[str]): A list of the new column name columns
+        new_column_value_columns (List[str]): A list of the new column value columns
+        delete_column_value_columns (List[str]): A list of the delete column value columns
+        workers (int, optional): The number of processes. Defaults to 1.
+
+    Returns:
+        List[GroupEffects]: The changes of each group (in the order of the groups)
+    """
+    args = (
+        new_column_name_columns,
+        new_column_value_columns,
+        delete_column_value_columns,
+    )
+    if workers <= 1 or len(group_dfs) <= 1:
+        return [
+            GroupEffects.compute(data_frame, group_df, *args) for group_df in group_dfs
+        ]
+
+    with make_process_pool(
+        min(workers, len(group_dfs)), _init_worker, (data_frame,)
+    ) as executor:
+        futures = [
+            executor.submit(_compute_in_worker, group_df, *args)
+            for group_df in group_dfs
+        ]
+        # The results are collected in the order of the groups so the output doesn't depend
+        # on which process finishes first
+        return [future.result() for future in futures]
+
+
+def apply_parallel_replacements(
+    data_frame: pd.DataFrame,
+    human_entry_df: pd.DataFrame,
+    new_column_name_columns: List[str],
+    new_column_value_columns: List[str],
+    delete_column_value_columns: List[str],
+    workers: int,
+    changes: Optional[CellChanges] = None,
+) -> Tuple[List[Any], List[str]]:
+    """Applies the suggestions to the data frame with a pool of processes. The suggestions are
+    split into groups that touch disjoint columns (see find_suggestion_groups), each group is
+    applied in a worker and the changes are then written to the data frame in the order of the
+    groups, so the result is the same as applying the suggestions in a single process.
+
+    Args:
+        data_frame (pd.DataFrame): The (stripped) data frame to update (updated in place)
+        human_entry_df (pd.DataFrame): The (stripped) human entry dataframe
+        new_column_name_columns (List[str]): A list of the new column name columns
+        new_column_value_columns (List[str]): A list of the new column value columns
+        delete_column_value_columns (List[str]): A list of the delete column value columns
+        workers (int): The number of processes
+        changes (Optional[CellChanges], optional): Records the cells that are written to. Defaults to None.
+
+    Returns:
+        Tuple[List[Any], List[str]]: The hhids that need to be edited and the columns that had values deleted
+    """
+    groups = find_suggestion_groups(
+        human_entry_df, new_column_name_columns, delete_column_value_columns
+    )
+    logger.info(
+        "Applying %d independent suggestion groups with %d workers",
+        len(groups),
+        workers,
+    )
+
+    group_effects = compute_group_effects(
+        data_frame,
+        [human_entry_df.iloc[group] for group in groups],
+        new_column_name_columns,
+        new_column_value_columns,
+        delete_column_value_columns,
+        workers=workers,
+    )
+
+    edit_hhids = []
+    to_delete_columns = []
+    for effects in group_effects:
+        effects.apply(data_frame, changes)
+        edit_hhids += effects.edit_hhids
+        to_delete_columns += effects.to_delete_columns
+
+    return edit_hhids, to_delete_columns
@@ -0,0 +1,328 @@
+import math
+import re
+import unicodedata
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+# The minimum trigram similarity (Jaccard) for a value to be suggested
+DEFAULT_MIN_SIMILARITY = 0.4
+
+_NON_ALPHANUMERIC = re.compile(r"[^0-9a-z]+")
+_NUMBER = re.compile(r"[0-9]+")
+
+
+def normalize_text(text: str) -> str:
+    """Normalizes a free text entry for matching: lower case, no accents, only letters and
+    digits separated by single spaces
+
+    Args:
+        text (str): The text to normalize
+
+    Returns:
+        str: The normalized text
+    """
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return _NON_ALPHANUMERIC.sub(" ", text.lower()).strip()
+
+
+def trigrams(normalized_text: str) -> FrozenSet[str]:
+    """Gets the trigrams of a normalized text, every word is padded with two spaces in front
+    and one at the end so short words and word starts still match
+
+    Args:
+        normalized_text (str): The normalized text
+
+    Returns:
+        FrozenSet[str]: The trigrams
+    """
+    grams: Set[str] = set()
+    for word in normalized_text.split():
+        padded_word = f"  {word} "
+        grams.update(
+            padded_word[index : index + 3] for index in range(len(padded_word) - 2)
+        )
+    return frozenset(grams)
+
+
+def text_numbers(normalized_text: str) -> Tuple[str, ...]:
+    """Gets the numbers in a normalized text, texts with different numbers are never matched
+    ("plot 12" and "plot 13" are similar texts but not the same entry)
+
+    Args:
+        normalized_text (str): The normalized text
+
+    Returns:
+        Tuple[str, ...]: The numbers in the order they show up
+    """
+    return tuple(_NUMBER.findall(normalized_text))
+
+
+def count_trigrams(normalized_texts: List[str]) -> Dict[str, int]:
+    """Counts the number of texts each trigram shows up in
+
+    Args:
+        normalized_texts (List[str]): The normalized texts
+
+    Returns:
+        Dict[str, int]: The number of texts for each trigram
+    """
+    gram_frequencies: Dict[str, int] = {}
+    for normalized_text in normalized_texts:
+        for gram in trigrams(normalized_text):
+            gram_frequencies[gram] = gram_frequencies.get(gram, 0) + 1
+    return gram_frequencies
+
+
+class TrigramIndex:
+    """Inverted index from trigrams to the texts that have them, for the texts that are at least
+    min_similarity (Jaccard) similar to a query text.
+
+    The trigrams of every text are ordered from the rarest to the most common and only the first
+    ones are indexed and looked up (prefix filtering): two texts above the threshold always
+    share one of them. The candidates are then checked with the exact similarity, so the texts
+    are never compared all against all and the common trigrams are hardly ever looked up.
+    """
+
+    def __init__(
+        self,
+        min_similarity: float = DEFAULT_MIN_SIMILARITY,
+        gram_frequencies: Optional[Dict[str, int]] = None,
+    ):
+        self.min_similarity = min_similarity
+        # Any order works as long as it is the same for all the texts, the rarest trigrams
+        # first keeps the posting lists short
+        self.gram_frequencies = {} if gram_frequencies is None else gram_frequencies
+        self.texts: List[str] = []
+        self.grams: List[FrozenSet[str]] = []
+        self.numbers: List[Tuple[str, ...]] = []
+        self.postings: Dict[str, List[int]] = {}
+
+    def _prefix(self, text_grams: FrozenSet[str]) -> List[str]:
+        required_shared = max(
+            1, math.ceil(self.min_similarity * len(text_grams) - 1e-9)
+        )
+        ordered_grams = sorted(
+            text_grams, key=lambda gram: (self.gram_frequencies.get(gram, 0), gram)
+        )
+        return ordered_grams[: len(text_grams) - required_shared + 1]
+
+    def add(self, normalized_text: str) -> int:
+        """Adds a normalized text to the index
+
+        Args:
+            normalized_text (str): The normalized text
+
+        Returns:
+            int: The id of the text in the index
+        """
+        text_id = len(self.texts)
+        text_grams = trigrams(normalized_text)
+        self.texts.append(normalized_text)
+        self.grams.append(text_grams)
+        self.numbers.append(text_numbers(normalized_text))
+        for gram in self._prefix(text_grams):
+            self.postings.setdefault(gram, []).append(text_id)
+        return text_id
+
+    def query(self, normalized_text: str) -> List[Tuple[int, float]]:
+        """Finds the texts that are at least min_similarity similar to the query text
+
+        Args:
+            normalized_text (str): The normalized query text
+
+        Returns:
+            List[Tuple[int, float]]: (text id, similarity) of the matches
+        """
+        query_grams = trigrams(normalized_text)
+        query_numbers = text_numbers(normalized_text)
+        if len(query_grams) == 0:
+            return []
+
+        # The similarity can't reach min_similarity when the sizes are too far apart
+        min_size = self.min_similarity * len(query_grams)
+        max_size = len(query_grams) / self.min_similarity
+
+        candidates: Set[int] = set()
+        for gram in self._prefix(query_grams):
+            candidates.update(self.postings.get(gram, ()))
+
+        matches = []
+        for text_id in candidates:
+            text_grams = self.grams[text_id]
+            if not min_size <= len(text_grams) <= max_size:
+                continue
+            # "plot 12" and "plot 13" are similar texts but not the same entry
+            if self.numbers[text_id] != query_numbers:
+                continue
+            shared = len(query_grams & text_grams)
+            similarity = shared / (len(query_grams) + len(text_grams) - shared)
+            if similarity >= self.min_similarity:
+                matches.append((text_id, similarity))
+
+        return matches
+
+
+def _lookup_labels(value_dictionary: Dict[Any, Any]) -> List[Tuple[str, Any]]:
+    # Both the labels (keys) and the values can be written in the free text entry
+    labels = []
+    for label, value in value_dictionary.items():
+        labels.append((str(label), value))
+        labels.append((str(value), value))
+    return labels
+
+
+def suggest_column_values(
+    unique_values: List[str],
+    value_counts: Optional[Dict[str, int]] = None,
+    value_dictionary: Optional[Dict[Any, Any]] = None,
+    min_similarity: float = DEFAULT_MIN_SIMILARITY,
+) -> List[Optional[Any]]:
+    """Suggests a value for each of the unique values of a column.
+
+    The values of the column are clustered (see _suggest_from_column) and the most common value
+    of the cluster is suggested (the most common values get no suggestion). When the column is
+    in the lookup dictionary, the closest label or value of the dictionary is suggested instead
+    if there is one. Texts with different numbers in them are never matched.
+
+    Args:
+        unique_values (List[str]): The unique values of the column
+        value_counts (Optional[Dict[str, int]], optional): The number of rows for each unique value. Defaults to None (every value counts once).
+        value_dictionary (Optional[Dict[Any, Any]], optional): The valid values of the column from the lookup dictionary. Defaults to None.
+        min_similarity (float, optional): The minimum trigram similarity of a suggestion. Defaults to DEFAULT_MIN_SIMILARITY.
+
+    Returns:
+        List[Optional[Any]]: The suggested value for each of the unique values (None if there is no suggestion)
+    """
+    normalized_values = [normalize_text(value) for value in unique_values]
+
+    suggested_values = _suggest_from_column(
+        unique_values, normalized_values, value_counts, min_similarity
+    )
+
+    if value_dictionary is not None and len(value_dictionary) > 0:
+        lookup_values = _suggest_from_dictionary(
+            normalized_values, value_dictionary, min_similarity
+        )
+        suggested_values = [
+            column_value if lookup_value is None else lookup_value
+            for column_value, lookup_value in zip(suggested_values, lookup_values)
+        ]
+
+    return suggested_values
+
+
+def _suggest_from_dictionary(
+    normalized_values: List[str],
+    value_dictionary: Dict[Any, Any],
+    min_similarity: float,
+) -> List[Optional[Any]]:
+    labels = _lookup_labels(value_dictionary)
+    normalized_labels = [normalize_text(label) for label, _ in labels]
+    label_index = TrigramIndex(min_similarity, count_trigrams(normalized_labels))
+    exact_labels: Dict[str, Any] = {}
+    for normalized_label, (_, value) in zip(normalized_labels, labels):
+        label_index.add(normalized_label)
+        exact_labels.setdefault(normalized_label, value)
+
+    suggested_values = []
+    for normalized_value in normalized_values:
+        if normalized_value in exact_labels:
+            suggested_values.append(exact_labels[normalized_value])
+            continue
+        matches = label_index.query(normalized_value)
+        if len(matches) == 0:
+            suggested_values.append(None)
+            continue
+        # The most similar label wins, the first one in the dictionary on ties
+        label_id, _ = max(matches, key=lambda match: (match[1], -match[0]))
+        suggested_values.append(labels[label_id][1])
+
+    return suggested_values
+
+
+def _suggest_from_column(
+    unique_values: List[str],
+    normalized_values: List[str],
+    value_counts: Optional[Dict[str, int]],
+    min_similarity: float,
+) -> List[Optional[Any]]:
+    counts = [
+        1 if value_counts is None else value_counts.get(value, 1)
+        for value in unique_values
+    ]
+
+    # The values with the same normalized text are merged, the most common spelling (the first
+    # one on ties) represents them
+    representatives: Dict[str, int] = {}
+    text_counts: Dict[str, int] = {}
+    for position, normalized_value in enumerate(normalized_values):
+        text_counts[normalized_value] = (
+            text_counts.get(normalized_value, 0) + counts[position]
+        )
+        best_position = representatives.get(normalized_value)
+        if best_position is None or counts[position] > counts[best_position]:
+            representatives[normalized_value] = position
+
+    # The texts are clustered around the most common ones: going from the most common to the
+    # least common text, a text joins the first (i.e. most common) cluster it is similar to or
+    # starts a new one. Only the cluster seeds are indexed, so every text is compared with a
+    # few candidate seeds instead of with all the other texts.
+    distinct_texts = sorted(
+        representatives.keys(),
+        key=lambda text: (-text_counts[text], representatives[text]),
+    )
+    seed_index = TrigramIndex(min_similarity, count_trigrams(distinct_texts))
+    seed_texts: List[str] = []
+    canonical_texts: Dict[str, str] = {}
+    for normalized_value in distinct_texts:
+        matches = seed_index.query(normalized_value)
+        if len(matches) > 0:
+            seed_id = min(text_id for text_id, _ in matches)
+            canonical_texts[normalized_value] = seed_texts[seed_id]
+            continue
+        seed_index.add(normalized_value)
+        seed_texts.append(normalized_value)
+        canonical_texts[normalized_value] = normalized_value
+
+    suggested_values = []
+    for position, normalized_value in enumerate(normalized_values):
+        suggested_value = unique_values[
+            representatives[canonical_texts[normalized_value]]
+        ]
+        suggested_values.append(
+            None if suggested_value == unique_values[position] else suggested_value
+        )
+
+    return suggested_values
+
+
+def generate_suggestions(
+    human_entry_column_values: Dict[str, List[str]],
+    column_value_counts: Optional[Dict[str, Dict[str, int]]] = None,
+    lookup_dictionary: Optional[Dict[str, Dict[Any, Any]]] = None,
+    min_similarity: float = DEFAULT_MIN_SIMILARITY,
+) -> Dict[str, List[Optional[Any]]]:
+    """Suggests a value for each of the unique values of each column (see suggest_column_values)
+
+    Args:
+        human_entry_column_values (Dict[str, List[str]]): The unique values for each of the columns
+        column_value_counts (Optional[Dict[str, Dict[str, int]]], optional): The number of rows for each unique value of each column. Defaults to None.
+        lookup_dictionary (Optional[Dict[str, Dict[Any, Any]]], optional): The valid values for the different columns. Defaults to None.
+        min_similarity (float, optional): The minimum trigram similarity of a suggestion. Defaults to DEFAULT_MIN_SIMILARITY.
+
+    Returns:
+        Dict[str, List[Optional[Any]]]: The suggested values for each of the columns (in the order of the unique values)
+    """
+    suggestions = {}
+    for col, values in human_entry_column_values.items():
+        suggestions[col] = suggest_column_values(
+            values,
+            value_counts=(
+                None if column_value_counts is None else column_value_counts.get(col)
+            ),
+            value_dictionary=(
+                None if lookup_dictionary is None else lookup_dictionary.get(col)
+            ),
+            min_similarity=min_similarity,
+        )
+    return suggestions
@@ -1,4 +1,25 @@
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from typing import Any, Callable, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# Sorts the strings by how cast_value casts them. The bools are matched exactly (no
+# whitespace), int() takes up to 18 digits (so they fit in an int64) and float() the plain
+# decimals with a dot or an exponent. The other strings that int() or float() might parse
+# (longer numbers, digits in other scripts, underscores between digits, nan, inf, ...) are cast
+# one by one and the rest stay strings.
+_CAST_PATTERN = re.compile(
+    r"(?P<bool>[Tt][Rr][Uu][Ee]|[Ff][Aa][Ll][Ss][Ee])"
+    r"|(?P<int>\s*[+-]?[0-9]{1,18}\s*)"
+    r"|(?P<float>\s*[+-]?(?:(?:[0-9]+\.[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?"
+    r"|[0-9]+[eE][+-]?[0-9]+)\s*)"
+    r"|(?P<other>.*(?:_|[Nn][Aa][Nn]|[Ii][Nn][Ff]|[0-9]{19}|[^\x00-\x7f]).*)",
+    re.DOTALL,
+)
 
 
 def generate_timestamp() -> str:
@@ -8,3 +29,120 @@ def generate_timestamp() -> str:
         str: Timestamp string
     """
     return datetime.now().strftime("%d-%m-%Y-%H:%M:%S")
+
+
+def make_process_pool(
+    workers: int, initializer: Callable[..., None], initargs: Tuple[Any, ...]
+) -> ProcessPoolExecutor:
+    """Creates the process pool of the parallel steps, the processes are forked where the
+    platform can (so the initargs are inherited instead of pickled) and spawned elsewhere
+
+    Args:
+        workers (int): The number of processes
+        initializer (Callable[..., None]): Sets up the state of each process
+        initargs (Tuple[Any, ...]): The arguments of the initializer
+
+    Returns:
+        ProcessPoolExecutor: The process pool
+    """
+    start_method = (
+        "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+    )
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context(start_method),
+        initializer=initializer,
+        initargs=initargs,
+    )
+
+
+def cast_value(value: Any) -> Union[str, int, float, bool]:
+    """Casts the value to the appropriate type
+
+    Args:
+        value (Any): The value to be cast
+
+    Returns:
+        Union[str, int, float, bool]: The casted value
+    """
+    # Try to convert to boolean
+    if str(value).lower() in ["true", "false"]:
+        return str(value).lower() == "true"
+    # Try to convert to number
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            # Return as string
+            return str(value)
+
+
+def _cast_strings(strings: np.ndarray) -> np.ndarray:
+    """Casts an array of distinct strings the same way as cast_value
+
+    Args:
+        strings (np.ndarray): The strings (object array)
+
+    Returns:
+        np.ndarray: The casted values (object array)
+    """
+    kinds = np.array(
+        [
+            "" if match is None else match.lastgroup
+            for match in map(_CAST_PATTERN.fullmatch, strings)
+        ],
+        dtype=object,
+    )
+    result = strings.copy()
+
+    is_bool = kinds == "bool"
+    result[is_bool] = [string.lower() == "true" for string in strings[is_bool]]
+
+    # astype calls int() and float() on the strings without going through the exceptions
+    is_int = kinds == "int"
+    result[is_int] = strings[is_int].astype(np.int64).astype(object)
+    is_float = kinds == "float"
+    result[is_float] = strings[is_float].astype(np.float64).astype(object)
+
+    is_other = kinds == "other"
+    result[is_other] = [cast_value(string) for string in strings[is_other]]
+
+    return result
+
+
+def cast_series(values: pd.Series) -> pd.Series:
+    """Casts all the values of a series to bool/int/float/str the same way as cast_value, in one
+    pass over the distinct strings instead of one call per cell. The missing values (None, NaN)
+    are kept as they are.
+
+    Args:
+        values (pd.Series): The values to be cast
+
+    Returns:
+        pd.Series: The casted values (object series with the same index)
+    """
+    array = values.to_numpy(dtype=object)
+    result = np.empty(len(array), dtype=object)
+
+    if values.dtype == bool or pd.api.types.is_integer_dtype(values.dtype):
+        # The numbers are already cast (int() of a bool is not used, "True" is checked first)
+        result[:] = list(array)
+        return pd.Series(result, index=values.index, dtype=object)
+
+    is_missing = pd.isna(values).to_numpy()
+    is_string = np.fromiter(
+        (type(value) is str for value in array), dtype=bool, count=len(array)
+    )
+    result[is_missing] = array[is_missing]
+
+    # The numbers and the other objects (a few cells at most) are cast one by one
+    is_other = ~is_missing & ~is_string
+    result[is_other] = [cast_value(value) for value in array[is_other]]
+
+    if is_string.any():
+        codes, uniques = pd.factorize(array[is_string])
+        result[is_string] = _cast_strings(np.asarray(uniques, dtype=object))[codes]
+
+    return pd.Series(result, index=values.index, dtype=object)
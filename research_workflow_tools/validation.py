@@ -0,0 +1,216 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set
+
+import pandas as pd
+
+from research_workflow_tools.utils import cast_series, cast_value
+
+# The columns of the validation report, one row per failed check
+REPORT_COLUMNS = ["row", "sheet_column", "column_name", "value", "reason"]
+
+
+class ValidationReport:
+    """The result of validating a human entry suggestions sheet, with all the failed checks at
+    once instead of stopping at the first one
+    """
+
+    def __init__(self, failures: pd.DataFrame, unchecked_columns: List[Hashable]):
+        # One row per failed check (see REPORT_COLUMNS), row is the row of the sheet
+        self.failures = failures
+        # The columns that have values to check but are not in the lookup dictionary
+        self.unchecked_columns = unchecked_columns
+
+    @property
+    def ok(self) -> bool:
+        return len(self.failures) == 0
+
+    def __str__(self) -> str:
+        lines = [
+            f"Column name {column_name} not in the dictionary, unable to check entry"
+            for column_name in self.unchecked_columns
+        ]
+        for failure in self.failures.to_dict("records"):
+            lines.append(
+                f"Row {failure['row']} ({failure['sheet_column']}): {failure['reason']}"
+            )
+        if self.ok:
+            lines.append("All the entries in the human entry file are valid")
+        else:
+            lines.append(f"{len(self.failures)} entries failed the validation")
+        return "\n".join(lines)
+
+
+class SuggestionsValidationError(Exception):
+    """Raised when some of the entries of a human entry suggestions sheet are not valid, the
+    report has all the failed checks
+    """
+
+    def __init__(self, report: ValidationReport):
+        super().__init__(f"{len(report.failures)} entries failed the validation")
+        self.report = report
+
+
+class LookupValidator:
+    """Checks the values of a human entry suggestions sheet against the lookup dictionary.
+
+    The dictionary ({column name: {label: code}}) is compiled once into a set of the casted
+    codes of every column and the sheet is checked a column of the sheet at a time, casting
+    every value at once (see cast_series).
+    """
+
+    def __init__(self, lookup_dictionary: Dict[str, Dict[Any, Any]]):
+        self.codes: Dict[str, Set[Any]] = {}
+        # The labels are only used to point at the code the user probably meant
+        self.label_codes: Dict[str, Dict[str, Any]] = {}
+        for column_name, value_dictionary in lookup_dictionary.items():
+            self.codes[column_name] = {
+                cast_value(code) for code in value_dictionary.values()
+            }
+            self.label_codes[column_name] = {
+                str(label).strip().lower(): code
+                for label, code in value_dictionary.items()
+            }
+
+    @classmethod
+    def from_json(cls, json_dictionary_path: Path) -> "LookupValidator":
+        """Loads the lookup dictionary (lookup_fields.json)
+
+        Args:
+            json_dictionary_path (Path): Path of the json dictionary
+
+        Returns:
+            LookupValidator: The validator
+        """
+        with open(json_dictionary_path, "r") as file_ptr:
+            return cls(json.load(file_ptr))
+
+    def check_values(
+        self, column_names: pd.Series, values: pd.Series
+    ) -> List[Optional[str]]:
+        """Checks the values against the codes of their columns, the values are cast in one pass
+        (see cast_series)
+
+        Args:
+            column_names (pd.Series): The column of each value
+            values (pd.Series): The values (not missing)
+
+        Returns:
+            List[Optional[str]]: Why each value is not valid (None for the valid values and
+            the columns that are not in the dictionary)
+        """
+        casted_values = cast_series(values).to_numpy()
+        raw_values = values.to_numpy(dtype=object)
+        reasons: List[Optional[str]] = [None] * len(values)
+
+        groups = pd.Series(column_names.to_numpy(dtype=object)).groupby(
+            column_names.to_numpy(dtype=object), sort=False
+        )
+        for column_name, positions in groups.indices.items():
+            codes = self.codes.get(column_name)
+            if codes is None:
+                continue
+            for position in positions:
+                if casted_values[position] not in codes:
+                    reasons[position] = self._failure_reason(
+                        column_name, raw_values[position], casted_values[position]
+                    )
+
+        return reasons
+
+    def _failure_reason(self, column_name: Any, value: Any, casted_value: Any) -> str:
+        reason = f"Column value {casted_value} not in the dictionary for column {column_name}"
+        label_code = self.label_codes[column_name].get(str(value).strip().lower())
+        if label_code is not None:
+            reason += f" ({value} is the label of {label_code})"
+        return reason
+
+    def validate(
+        self,
+        human_entry_df: pd.DataFrame,
+        data_columns: Iterable[Hashable],
+        new_column_name_columns: List[str],
+        new_column_value_columns: List[str],
+        delete_column_value_columns: List[str],
+    ) -> ValidationReport:
+        """Validates the suggestions sheet: the replacement values and the new column values need
+        to be codes of their column in the lookup dictionary and the delete_column_value columns
+        need to be columns of the data file
+
+        Args:
+            human_entry_df (pd.DataFrame): The (stripped) human entry dataframe
+            data_columns (Iterable[Hashable]): The columns of the data file (and the ones the suggestions create)
+            new_column_name_columns (List[str]): A list of the new column name columns
+            new_column_value_columns (List[str]): A list of the new column value columns
+            delete_column_value_columns (List[str]): A list of the delete column value columns
+
+        Returns:
+            ValidationReport: The failed checks
+        """
+        failures = []
+        checked_columns: Set[Hashable] = set()
+
+        value_checks = [("column_name", "replacement_value")] + list(
+            zip(new_column_name_columns, new_column_value_columns)
+        )
+        for name_column, value_column in value_checks:
+            to_check = human_entry_df[
+                human_entry_df[name_column].notna()
+                & human_entry_df[value_column].notna()
+            ]
+            if len(to_check) == 0:
+                continue
+            checked_columns |= set(to_check[name_column].unique().tolist())
+
+            reasons = pd.Series(
+                self.check_values(to_check[name_column], to_check[value_column]),
+                index=to_check.index,
+                dtype=object,
+            )
+            failed = to_check[reasons.notna()]
+            failures.append(
+                pd.DataFrame(
+                    {
+                        "row": failed.index,
+                        "sheet_column": value_column,
+                        "column_name": failed[name_column].to_numpy(),
+                        "value": failed[value_column].to_numpy(),
+                        "reason": reasons[reasons.notna()].to_numpy(),
+                    }
+                )
+            )
+
+        data_column_set = set(data_columns)
+        for delete_column in delete_column_value_columns:
+            to_check = human_entry_df[human_entry_df[delete_column].notna()]
+            failed = to_check[~to_check[delete_column].isin(data_column_set)]
+            failures.append(
+                pd.DataFrame(
+                    {
+                        "row": failed.index,
+                        "sheet_column": delete_column,
+                        "column_name": failed[delete_column].to_numpy(),
+                        "value": failed[delete_column].to_numpy(),
+                        "reason": [
+                            f"Column value in column: {column_name} not in the data frame"
+                            for column_name in failed[delete_column].tolist()
+                        ],
+                    }
+                )
+            )
+
+        failures = [failure for failure in failures if len(failure) > 0]
+        report = (
+            pd.concat(failures, ignore_index=True)
+            if len(failures) > 0
+            else pd.DataFrame(columns=REPORT_COLUMNS)
+        )
+        unchecked_columns = sorted(
+            (
+                column_name
+                for column_name in checked_columns
+                if column_name not in self.codes
+            ),
+            key=str,
+        )
+        return ValidationReport(report[REPORT_COLUMNS], unchecked_columns)
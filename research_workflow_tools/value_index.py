@@ -0,0 +1,163 @@
+from typing import Any, Dict, Hashable, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+
+class ColumnValueIndex:
+    """Inverted index for a single column, maps every (stripped) unique value to the row
+    positions where it shows up.
+    """
+
+    def __init__(self, column: pd.Series):
+        codes, uniques = pd.factorize(column, use_na_sentinel=True)
+
+        if column.dtype == "object":
+            # Strip at the level of the unique values, same as column.str.strip()
+            # (values that are not strings become NaN)
+            stripped_uniques = pd.Series(
+                [
+                    value.strip() if isinstance(value, str) else np.nan
+                    for value in uniques
+                ],
+                dtype=object,
+            )
+            merged_codes, uniques = pd.factorize(stripped_uniques, use_na_sentinel=True)
+            # The missing values (-1) stay missing
+            codes = np.append(merged_codes, -1)[codes]
+
+        position_dtype = np.int32 if len(column) < np.iinfo(np.int32).max else np.int64
+        self.codes: np.ndarray = codes.astype(position_dtype)
+        self.unique_values: List[Any] = list(uniques)
+
+        order = np.argsort(self.codes, kind="stable").astype(position_dtype)
+        boundaries = np.searchsorted(
+            self.codes[order], np.arange(len(self.unique_values) + 1)
+        )
+        self.counts: np.ndarray = np.diff(boundaries)
+        self._order = order
+        self._boundaries = boundaries
+
+        self._code_lookup: Dict[Hashable, int] = {
+            value: code for code, value in enumerate(self.unique_values)
+        }
+
+    def code(self, value: Any) -> Optional[int]:
+        """Gets the code of a value (equivalent to column == value, so missing values never match)
+
+        Args:
+            value (Any): The value to look up
+
+        Returns:
+            Optional[int]: The code of the value or None if it's not in the column
+        """
+        if pd.isna(value):
+            return None
+        return self._code_lookup.get(value)
+
+    def positions_for_code(self, code: int) -> np.ndarray:
+        """Gets the row positions for a code
+
+        Args:
+            code (int): The code of the value
+
+        Returns:
+            np.ndarray: The row positions (sorted)
+        """
+        return self._order[self._boundaries[code] : self._boundaries[code + 1]]
+
+
+class ValueIndex:
+    """Maps (column, stripped value) to the row positions and the hhids where the value shows up.
+
+    The index is built once per load and the columns are only indexed when they are first used.
+    It reflects the data frame at the time the columns were indexed, it is not updated when the
+    data frame changes.
+    """
+
+    def __init__(self, data_frame: pd.DataFrame, id_column: str = "hhid"):
+        self.data_frame = data_frame
+        self.id_column = id_column
+        self._columns: Dict[str, ColumnValueIndex] = {}
+        self._ids: Optional[np.ndarray] = None
+
+    def column(self, column_name: str) -> ColumnValueIndex:
+        """Gets (and builds if needed) the index for a column
+
+        Args:
+            column_name (str): The column name
+
+        Returns:
+            ColumnValueIndex: The index of the column
+        """
+        if column_name not in self._columns:
+            self._columns[column_name] = ColumnValueIndex(self.data_frame[column_name])
+        return self._columns[column_name]
+
+    def positions(self, column_name: str, value: Any) -> np.ndarray:
+        """Gets the row positions where the column has the value
+
+        Args:
+            column_name (str): The column name
+            value (Any): The (stripped) value
+
+        Returns:
+            np.ndarray: The row positions
+        """
+        column_index = self.column(column_name)
+        code = column_index.code(value)
+        if code is None:
+            return np.empty(0, dtype=column_index.codes.dtype)
+        return column_index.positions_for_code(code)
+
+    def ids_at(self, positions: np.ndarray) -> Set[Any]:
+        """Gets the hhids of the rows at the given positions
+
+        Args:
+            positions (np.ndarray): The row positions
+
+        Returns:
+            Set[Any]: The hhids
+        """
+        if self._ids is None:
+            self._ids = self.data_frame[self.id_column].to_numpy()
+        return set(pd.unique(self._ids[positions]).tolist())
+
+    def hhids(self, column_name: str, value: Any) -> Set[Any]:
+        """Gets the hhids of the rows where the column has the value
+
+        Args:
+            column_name (str): The column name
+            value (Any): The (stripped) value
+
+        Returns:
+            Set[Any]: The hhids
+        """
+        return self.ids_at(self.positions(column_name, value))
+
+    def unique_values(self, column_name: str) -> List[Any]:
+        """Gets the (stripped) unique values of the column in the order they show up
+
+        Args:
+            column_name (str): The column name
+
+        Returns:
+            List[Any]: The unique values (without the missing values)
+        """
+        return self.column(column_name).unique_values
+
+    def value_counts(self, column_name: str) -> pd.Series:
+        """Gets the number of rows for each of the (stripped) unique values of the column
+
+        Args:
+            column_name (str): The column name
+
+        Returns:
+            pd.Series: The number of rows indexed by the unique value
+        """
+        column_index = self.column(column_name)
+        return pd.Series(
+            column_index.counts,
+            index=pd.Index(column_index.unique_values, dtype=object),
+            name="count",
+        )
@@ -0,0 +1,186 @@
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# The sheet with the codes of the lookup dictionary that the dropdowns point to
+LOOKUP_SHEET_NAME = "lookup_fields"
+
+# The rows converted to python values at a time while streaming the workbook
+_WRITE_BLOCK_SIZE = 10_000
+
+
+def _column_letter(position: int) -> str:
+    # 0 -> A, 25 -> Z, 26 -> AA
+    letters = ""
+    position += 1
+    while position > 0:
+        position, remainder = divmod(position - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+
+def _row_runs(rows: List[int]) -> Iterator[Tuple[int, int]]:
+    # Groups the (sorted) row numbers into (first, last) runs of consecutive rows
+    first = previous = rows[0]
+    for row in rows[1:]:
+        if row != previous + 1:
+            yield first, previous
+            first = row
+        previous = row
+    yield first, previous
+
+
+class _SheetWriter:
+    """Streams the rows of the human entry dataframe to a write-only sheet and keeps track of the
+    rows of each column, for the dropdowns"""
+
+    def __init__(self, worksheet, header: List[str]):
+        from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE, WriteOnlyCell
+
+        self._illegal_characters = ILLEGAL_CHARACTERS_RE
+        self._cell_type = WriteOnlyCell
+        self.worksheet = worksheet
+        self.worksheet.freeze_panes = "A2"
+        self.worksheet.append(header)
+        self.row_count = 1
+        # {column name: the rows (1-based) of the values of the column}
+        self.column_rows: Dict[Any, List[int]] = {}
+        self.replaced_values = 0
+
+    def _cell(self, value: Any) -> Any:
+        if not isinstance(value, str):
+            return value
+        if self._illegal_characters.search(value):
+            # Excel can't store the control characters
+            self.replaced_values += 1
+            value = self._illegal_characters.sub("", value)
+        if value.startswith("="):
+            # Text that looks like a formula is written as text
+            cell = self._cell_type(self.worksheet, value=value)
+            cell.data_type = "s"
+            return cell
+        return value
+
+    def append(self, column_name: Any, row: Tuple[Any, ...]):
+        self.worksheet.append([self._cell(value) for value in row])
+        self.row_count += 1
+        self.column_rows.setdefault(column_name, []).append(self.row_count)
+
+
+def _write_lookup_sheet(
+    workbook, lookup_dictionary: Dict[str, Dict[Any, Any]]
+) -> Dict[str, str]:
+    # One column per column of the lookup dictionary with its codes, returns the range of the
+    # codes of each column
+    worksheet = workbook.create_sheet(LOOKUP_SHEET_NAME)
+    worksheet.sheet_state = "hidden"
+
+    column_names = list(lookup_dictionary.keys())
+    codes = [
+        list(dict.fromkeys(lookup_dictionary[col].values())) for col in column_names
+    ]
+    worksheet.append(column_names)
+    for position in range(
+        max((len(column_codes) for column_codes in codes), default=0)
+    ):
+        worksheet.append(
+            [
+                column_codes[position] if position < len(column_codes) else None
+                for column_codes in codes
+            ]
+        )
+
+    code_ranges = {}
+    for position, column_codes in enumerate(codes):
+        if len(column_codes) == 0:
+            continue
+        letter = _column_letter(position)
+        code_ranges[column_names[position]] = (
+            f"{LOOKUP_SHEET_NAME}!${letter}$2:${letter}${len(column_codes) + 1}"
+        )
+    return code_ranges
+
+
+def _add_dropdowns(
+    sheet_writer: _SheetWriter, value_column: str, code_ranges: Dict[str, str]
+):
+    from openpyxl.worksheet.datavalidation import DataValidation
+
+    for column_name, rows in sheet_writer.column_rows.items():
+        if column_name not in code_ranges:
+            continue
+        # A warning instead of an error, the value can still be typed in
+        data_validation = DataValidation(
+            type="list",
+            formula1=code_ranges[column_name],
+            allow_blank=True,
+            errorStyle="warning",
+            error=f"The value is not a code of {column_name} in the lookup dictionary",
+        )
+        data_validation.sqref = " ".join(
+            (
+                f"{value_column}{first}"
+                if first == last
+                else f"{value_column}{first}:{value_column}{last}"
+            )
+            for first, last in _row_runs(rows)
+        )
+        sheet_writer.worksheet.data_validations.append(data_validation)
+
+
+def write_suggestions_workbook(
+    human_entry_df: pd.DataFrame,
+    file_path: Path,
+    lookup_dictionary: Optional[Dict[str, Dict[Any, Any]]] = None,
+) -> Path:
+    """Writes the human entry dataframe to an Excel workbook. The rows are streamed to the file
+    (write-only workbook) a block at a time so the workbook can have hundreds of thousands of
+    rows.
+
+    With the lookup dictionary the replacement_value cells get a dropdown with the codes of their
+    column, the codes are in a hidden sheet (lookup_fields) after the suggestions sheet.
+
+    Args:
+        human_entry_df (pd.DataFrame): The human entry dataframe
+        file_path (Path): Path of the workbook (.xlsx)
+        lookup_dictionary (Optional[Dict[str, Dict[Any, Any]]], optional): The json dictionary with the valid values of the columns, used for the dropdowns. Defaults to None.
+
+    Returns:
+        Path: Path of the written workbook
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    header = [str(column) for column in human_entry_df.columns]
+    column_name_position = header.index("column_name")
+
+    sheet_writer = _SheetWriter(
+        workbook.create_sheet("human_entry_suggestions"), header
+    )
+    for start in range(0, len(human_entry_df), _WRITE_BLOCK_SIZE):
+        block = human_entry_df.iloc[start : start + _WRITE_BLOCK_SIZE].astype(object)
+        block = block.where(block.notna(), None)
+        for row in block.itertuples(index=False, name=None):
+            sheet_writer.append(row[column_name_position], row)
+
+    if lookup_dictionary is not None and "replacement_value" in header:
+        code_ranges = _write_lookup_sheet(workbook, lookup_dictionary)
+        _add_dropdowns(
+            sheet_writer,
+            _column_letter(header.index("replacement_value")),
+            code_ranges,
+        )
+
+    if sheet_writer.replaced_values > 0:
+        logger.warning(
+            "Removed the control characters from %d values that Excel can't store, use a tsv "
+            "workbook to keep them",
+            sheet_writer.replaced_values,
+        )
+
+    workbook.save(file_path)
+    return file_path
@@ -0,0 +1,51 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from research_workflow_tools.aggregation import aggregate_human_entry_values
+
+
+@pytest.mark.parametrize("workers,chunksize", [(1, None), (2, None), (2, 2)])
+def test_aggregate_human_entry_values(tmp_path: Path, workers, chunksize):
+    site_values = {
+        "site_a": ["VALUE_1", " VALUE_2", "VALUE_1", None],
+        "site_b": ["VALUE_3", "VALUE_2 ", "VALUE_2", "VALUE_1"],
+    }
+    data_in_paths = []
+    for site, values in site_values.items():
+        data_in_path = tmp_path / f"{site}.csv"
+        pd.DataFrame(
+            {
+                "hhid": [1, 2, 3, 4],
+                "redcap_event_name": ["visit_1_arm_1"] * 4,
+                "other_entry": values,
+            }
+        ).to_csv(data_in_path, index=False)
+        data_in_paths.append(data_in_path)
+
+    aggregate = aggregate_human_entry_values(
+        data_in_paths,
+        ["hhid", "redcap_event_name"],
+        workers=workers,
+        chunksize=chunksize,
+    )
+
+    assert aggregate.unique_values() == {
+        "other_entry": ["VALUE_1", "VALUE_2", "VALUE_3"]
+    }
+    # hhid 2 has VALUE_2 in both data files, it is counted once
+    assert aggregate.household_counts() == {
+        "other_entry": {"VALUE_1": 3, "VALUE_2": 2, "VALUE_3": 1}
+    }
+    assert aggregate.counts == {
+        "other_entry": {"VALUE_1": 3, "VALUE_2": 3, "VALUE_3": 1}
+    }
+    assert aggregate.source_files() == {
+        "other_entry": [
+            [str(data_in_paths[0]), str(data_in_paths[1])],
+            [str(data_in_paths[0]), str(data_in_paths[1])],
+            [str(data_in_paths[1])],
+        ]
+    }
@@ -0,0 +1,44 @@
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+from panda_patches.patchfile import PatchFile
+
+from research_workflow_tools.batch import find_datasets, process_other_entry_batch
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_process_other_entry_batch(tmp_path, workers):
+    data_path = tmp_path / "data"
+    for site in ["site_a", "site_b"]:
+        (data_path / site).mkdir(parents=True)
+        shutil.copy(
+            "tests/test_data/other_entry_dataset_case_delete.csv",
+            data_path / site / "other_entry_dataset.csv",
+        )
+    (data_path / "notes.txt").write_text("not a data file")
+
+    data_in_paths = find_datasets([str(data_path / "**")])
+    assert len(data_in_paths) == 2
+
+    manifest_path = process_other_entry_batch(
+        data_in_paths,
+        Path("tests/test_data/human_entry_suggestions_delete_case1.tsv"),
+        json_dictionary_path=tmp_path / "lookup_fields.json",
+        output_path=tmp_path / "output",
+        workers=workers,
+        use_cache=False,
+    )
+    with open(manifest_path, "r") as file_ptr:
+        manifest = json.load(file_ptr)
+
+    ref_patch_file = PatchFile.parse_patch_file_from_path(
+        Path("tests/test_data/other_entry_dataset_case_delete_case1.json")
+    )
+    assert [entry["status"] for entry in manifest["datasets"]] == ["ok", "ok"]
+    # Each data file gets its own output folder
+    assert len({entry["output"] for entry in manifest["datasets"]}) == 2
+    for entry in manifest["datasets"]:
+        patch_file = PatchFile.parse_patch_file_from_path(Path(entry["patch"]))
+        assert patch_file == ref_patch_file
@@ -0,0 +1,136 @@
+import os
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from research_workflow_tools.cache import DatasetCache, load_cached_data_file
+
+pytest.importorskip("pyarrow")
+
+
+def test_load_cached_data_file(tmp_path: Path):
+    data_in_path = tmp_path / "data.csv"
+    pd.read_csv("tests/test_data/other_entry_dataset_case_delete.csv").to_csv(
+        data_in_path, index=False
+    )
+    cache = DatasetCache(tmp_path / "cache")
+
+    parsed_df = load_cached_data_file(
+        data_in_path, dtype={"other_entry": str}, cache=cache
+    )
+    cached_df = load_cached_data_file(
+        data_in_path, dtype={"other_entry": str}, cache=cache
+    )
+
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+    pd.testing.assert_frame_equal(parsed_df, cached_df)
+
+    # Editing the data file invalidates the entry
+    with open(data_in_path, "a") as file_ptr:
+        file_ptr.write("11,visit_1_arm_1,CASE_DELETE_OLD_VALUE_4,,,,\n")
+    assert len(load_cached_data_file(data_in_path, cache=cache)) == len(parsed_df) + 1
+
+
+def test_cached_data_file_is_stripped_once(tmp_path: Path):
+    data_in_path = tmp_path / "data.csv"
+    pd.DataFrame(
+        {
+            "hhid": [1, 2, 3],
+            "redcap_event_name": ["visit_1_arm_1 ", "visit_1_arm_1", "visit_1_arm_1"],
+            "other_entry": [" VALUE_1", "VALUE_2", None],
+            "field_A": ["VALUE_3  ", "VALUE_4", "VALUE_5"],
+        }
+    ).to_csv(data_in_path, index=False)
+    cache = DatasetCache(tmp_path / "cache")
+
+    # The columns that are loaded don't change the entry of the data file
+    for usecols in [None, ["hhid", "redcap_event_name", "other_entry"]]:
+        load_cached_data_file(data_in_path, usecols=usecols, cache=cache)
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+
+    trimmed_cells = {}
+    data_frame = load_cached_data_file(
+        data_in_path,
+        usecols=["hhid", "redcap_event_name", "other_entry"],
+        dtype={"other_entry": str},
+        cache=cache,
+        strip_columns=["other_entry"],
+        trimmed_cells=trimmed_cells,
+    )
+
+    assert data_frame.columns.tolist() == ["hhid", "redcap_event_name", "other_entry"]
+    # Only the columns to strip come back stripped, with their trimmed cells
+    assert data_frame["redcap_event_name"].tolist()[0] == "visit_1_arm_1 "
+    assert data_frame["other_entry"].tolist()[:2] == ["VALUE_1", "VALUE_2"]
+    positions, old_values = trimmed_cells["other_entry"]
+    assert positions.tolist() == [0]
+    assert old_values.tolist() == [" VALUE_1"]
+
+    # Without the trimmed cells all the columns keep their original text
+    data_frame = load_cached_data_file(data_in_path, cache=cache)
+    assert data_frame["other_entry"].tolist()[0] == " VALUE_1"
+    assert data_frame["field_A"].tolist()[0] == "VALUE_3  "
+
+
+def test_cache_evicts_least_recently_used(tmp_path: Path):
+    data_frame = pd.DataFrame({"hhid": range(1000), "other_entry": ["VALUE"] * 1000})
+    cache = DatasetCache(tmp_path / "cache")
+
+    cache.put("first", data_frame)
+    cache.put("second", data_frame)
+    entry_size = (tmp_path / "cache" / "first.feather").stat().st_size
+
+    # Reading the first entry makes the second one the least recently used
+    first_entry = tmp_path / "cache" / "first.feather"
+    os.utime(first_entry, ns=(0, 0))
+    os.utime(tmp_path / "cache" / "second.feather", ns=(1, 1))
+    assert cache.get("first") is not None
+
+    cache.size_limit = 2 * entry_size
+    cache.put("third", data_frame)
+
+    assert cache.get("second") is None
+    assert cache.get("first") is not None
+    assert cache.get("third") is not None
+
+
+def test_cache_evict_skips_removed_entries(tmp_path: Path, monkeypatch):
+    data_frame = pd.DataFrame({"hhid": range(1000), "other_entry": ["VALUE"] * 1000})
+    cache = DatasetCache(tmp_path / "cache")
+    cache.put("first", data_frame)
+
+    # Another worker removes an entry after the cache directory is listed
+    listed_entries = list(cache.cache_dir.glob("*.feather")) + [
+        cache.cache_dir / "removed.feather"
+    ]
+    monkeypatch.setattr(Path, "glob", lambda self, pattern: iter(listed_entries))
+    cache.size_limit = 0
+    cache.evict()
+
+    assert not (tmp_path / "cache" / "first.feather").exists()
+
+
+def test_cached_data_file_keeps_inferred_dtypes(tmp_path: Path):
+    data_in_path = tmp_path / "data.csv"
+    pd.DataFrame(
+        {
+            "hhid": [1, 2, 3],
+            "redcap_event_name": ["v1"] * 3,
+            "score": [1, 2, 1],
+            "ratio": [3.5, 1.5, 3.5],
+        }
+    ).to_csv(data_in_path, index=False)
+    cache = DatasetCache(tmp_path / "cache")
+
+    # The numbers in the columns to strip are not turned into text, same as without the cache
+    for _ in range(2):
+        trimmed_cells = {}
+        data_frame = load_cached_data_file(
+            data_in_path,
+            cache=cache,
+            strip_columns=["score", "ratio"],
+            trimmed_cells=trimmed_cells,
+        )
+        pd.testing.assert_frame_equal(data_frame, pd.read_csv(data_in_path))
+        assert trimmed_cells == {}
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from research_workflow_tools.changes import CellChanges
+
+
+def test_patch_deltas():
+    data_frame = pd.DataFrame(
+        {
+            "hhid": [1, 2, 3],
+            "redcap_event_name": ["visit_1_arm_1"] * 3,
+            "other_entry": ["A", "B", "C"],
+        }
+    )
+    changes = CellChanges(len(data_frame))
+
+    changes.record(data_frame, "other_entry", np.array([0, 1]))
+    data_frame.loc[[0, 1], "other_entry"] = ["D", np.nan]
+    changes.record(data_frame, "other_entry", np.array([0, 2]))
+    data_frame.loc[[0, 2], "other_entry"] = ["A", "C"]
+    changes.record(data_frame, "field_A", np.array([2]))
+    data_frame.loc[2, "field_A"] = 3
+
+    # Row 0 is back to its old value and row 2 only changed in field_A
+    assert changes.patch_deltas(
+        data_frame, ["hhid", "redcap_event_name"], ["other_entry", "field_A"]
+    ) == [
+        (1, {"hhid": 2, "redcap_event_name": "visit_1_arm_1"}, {"other_entry": None}),
+        (2, {"hhid": 3, "redcap_event_name": "visit_1_arm_1"}, {"field_A": 3.0}),
+    ]
+
+
+def test_record_values():
+    # The cells were trimmed before the data frame was loaded
+    data_frame = pd.DataFrame(
+        {
+            "hhid": [1, 2, 3],
+            "redcap_event_name": ["visit_1_arm_1"] * 3,
+            "other_entry": ["A", "B", "C"],
+        }
+    )
+    changes = CellChanges(len(data_frame))
+
+    changes.record_values("other_entry", np.array([2, 0]), np.array([" C", "A "]))
+    # Only the value before the first write is kept
+    changes.record(data_frame, "other_entry", np.array([0]))
+    data_frame.loc[0, "other_entry"] = "D"
+
+    assert changes.patch_deltas(
+        data_frame, ["hhid", "redcap_event_name"], ["other_entry"]
+    ) == [
+        (0, {"hhid": 1, "redcap_event_name": "visit_1_arm_1"}, {"other_entry": "D"}),
+        (2, {"hhid": 3, "redcap_event_name": "visit_1_arm_1"}, {"other_entry": "C"}),
+    ]
@@ -0,0 +1,100 @@
+import json
+import logging
+
+import pandas as pd
+
+from research_workflow_tools.clustering import (
+    cluster_column_values,
+    collapse_cluster_rows,
+    expand_cluster_decisions,
+)
+from research_workflow_tools.other_entry_handler import build_human_entry_df
+
+
+def test_cluster_column_values():
+    unique_values = ["Vemula FPC", "plot 12", "vemula fpc.", "Vemla FPC", "plot 13"]
+
+    assert cluster_column_values(unique_values) == [0, 1, 0, 0, 2]
+
+
+def test_expand_cluster_decisions():
+    human_entry_df = build_human_entry_df(
+        {"other_entry": ["Vemula FPC", "vemula fpc.", "Vemla FPC", "Trader"]},
+        cluster_ids={"other_entry": [0, 0, 0, 1]},
+    )
+    human_entry_df.loc[1, "replacement_value"] = "Vemula"
+    human_entry_df.loc[2, "replacement_value"] = "Vemula"
+
+    expanded_df = expand_cluster_decisions(
+        human_entry_df,
+        ["new_column_name"],
+        ["new_column_value"],
+        ["delete_column_value"],
+    )
+
+    # The rows without a decision get the decision of their cluster
+    assert expanded_df["replacement_value"].tolist()[:3] == [
+        "Vemula",
+        "Vemula",
+        "Vemula",
+    ]
+    assert pd.isna(expanded_df["replacement_value"].iloc[3])
+
+    expanded_df = expand_cluster_decisions(
+        human_entry_df,
+        ["new_column_name"],
+        ["new_column_value"],
+        ["delete_column_value"],
+        fill_undecided=False,
+    )
+    assert pd.isna(expanded_df["replacement_value"].iloc[0])
+
+
+def test_expand_cluster_decisions_conflict(caplog, monkeypatch):
+    # The commands stop the messages of the package at its logger (see configure_logging)
+    monkeypatch.setattr(logging.getLogger("research_workflow_tools"), "propagate", True)
+    human_entry_df = build_human_entry_df(
+        {"other_entry": ["Vemula FPC", "vemula fpc.", "Vemla FPC"]},
+        cluster_ids={"other_entry": [0, 0, 0]},
+    )
+    human_entry_df.loc[1, "replacement_value"] = "Vemula"
+    human_entry_df.loc[2, "replacement_value"] = "Vemla"
+
+    expanded_df = expand_cluster_decisions(
+        human_entry_df,
+        ["new_column_name"],
+        ["new_column_value"],
+        ["delete_column_value"],
+    )
+
+    # The decided rows don't agree, the row without a decision is left alone
+    assert pd.isna(expanded_df["replacement_value"].iloc[0])
+    assert expanded_df["replacement_value"].tolist()[1:] == ["Vemula", "Vemla"]
+    assert "different decisions" in caplog.text
+
+
+def test_collapse_cluster_rows():
+    human_entry_df = build_human_entry_df(
+        {"other_entry": ["vemula fpc.", "Vemula FPC", "Trader"]},
+        cluster_ids={"other_entry": [0, 0, 1]},
+    )
+
+    collapsed_df = collapse_cluster_rows(
+        human_entry_df, {"other_entry": {"vemula fpc.": 1, "Vemula FPC": 5}}
+    )
+    assert collapsed_df["unique_value"].tolist() == ["Vemula FPC", "Trader"]
+    assert json.loads(collapsed_df["cluster_values"].iloc[0]) == [
+        "vemula fpc.",
+        "Vemula FPC",
+    ]
+
+    collapsed_df.loc[0, "delete_value"] = True
+    expanded_df = expand_cluster_decisions(
+        collapsed_df, ["new_column_name"], ["new_column_value"], ["delete_column_value"]
+    )
+    assert expanded_df["unique_value"].tolist() == [
+        "vemula fpc.",
+        "Vemula FPC",
+        "Trader",
+    ]
+    assert expanded_df["delete_value"].tolist() == [True, True, False]
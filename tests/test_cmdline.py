@@ -0,0 +1,115 @@
+import json
+import subprocess
+import sys
+from typing import Dict
+
+import pandas as pd
+import pytest
+from click.testing import CliRunner
+
+from research_workflow_tools.cmdline import rwt
+
+# The modules that should only be loaded once a command runs
+HEAVY_MODULES = [
+    "pandas",
+    "numpy",
+    "panda_patches",
+    "research_workflow_tools.other_entry_handler",
+]
+
+
+def import_times(module_name: str) -> Dict[str, int]:
+    """Imports a module in a new interpreter with -X importtime, returns the cumulative import
+    time (in microseconds) of every module that was loaded"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_cmdline_import_is_lazy():
+    times = import_times("research_workflow_tools.cmdline")
+
+    assert "research_workflow_tools.cmdline" in times
+    assert [module for module in HEAVY_MODULES if module in times] == []
+
+
+@pytest.mark.parametrize(
+    "command",
+    [
+        "generate-others-suggestions",
+        "generate-others-suggestions-batch",
+        "process-others-suggestions",
+        "process-others-suggestions-batch",
+        "apply-others-patch",
+    ],
+)
+def test_rwt_help(command):
+    result = CliRunner().invoke(rwt, [command, "--help"])
+
+    assert result.exit_code == 0
+    assert "Usage:" in result.output
+
+
+def test_rwt_apply_others_patch(tmp_path):
+    result = CliRunner().invoke(
+        rwt,
+        [
+            "apply-others-patch",
+            "tests/test_data/other_entry_dataset_case_delete.csv",
+            "tests/test_data/other_entry_dataset_case_delete_case1.json",
+            str(tmp_path / "patched.csv"),
+            "--chunksize",
+            "4",
+        ],
+    )
+
+    assert result.exit_code == 0
+    pd.testing.assert_frame_equal(
+        pd.read_csv(tmp_path / "patched.csv"),
+        pd.read_csv("tests/test_data/other_entry_dataset_case_delete_case1.csv"),
+    )
+
+
+def test_rwt_process_others_suggestions_invalid_values(tmp_path):
+    json_dictionary_path = tmp_path / "lookup_fields.json"
+    with open(json_dictionary_path, "w") as file_ptr:
+        json.dump({"other_entry": {"1": "VALUE_1"}}, file_ptr)
+
+    result = CliRunner().invoke(
+        rwt,
+        [
+            "process-others-suggestions",
+            "tests/test_data/other_entry_dataset_case_delete.csv",
+            "tests/test_data/human_entry_suggestions_delete_case1.tsv",
+            str(json_dictionary_path),
+            "--no-cache",
+        ],
+    )
+
+    assert result.exit_code == 1
+    assert "1 entries failed the validation" in result.output
+
+
+def test_rwt_apply_others_patch_overwrite():
+    result = CliRunner().invoke(
+        rwt,
+        [
+            "apply-others-patch",
+            "tests/test_data/other_entry_dataset_case_delete.csv",
+            "tests/test_data/other_entry_dataset_case_delete_case1.json",
+            "tests/test_data/other_entry_dataset_case_delete.csv",
+        ],
+    )
+
+    assert result.exit_code == 1
+    assert "can't overwrite the data file" in result.output
@@ -0,0 +1,33 @@
+from pathlib import Path
+
+import pandas as pd
+
+from research_workflow_tools.incremental import apply_incremental_replacements
+from research_workflow_tools.replacement_engine import apply_batched_replacements
+
+
+def test_apply_incremental_replacements(tmp_path: Path):
+    data_frame = pd.read_csv(
+        "tests/test_data/other_entry_dataset_case_delete_with_delete.csv"
+    )
+    human_entry_df = pd.read_csv(
+        "tests/test_data/human_entry_suggestions_delete_case4.tsv", sep="\t"
+    )
+    state_path = tmp_path / "state.pkl"
+    args = (["new_column_name"], ["new_column_value"], ["delete_column_value"])
+
+    apply_incremental_replacements(
+        data_frame.copy(), human_entry_df, *args, state_path=state_path
+    )
+
+    # Edit a suggestion, the result matches applying the edited sheet from scratch
+    human_entry_df.loc[0, "replacement_value"] = "CASE_DELETE_NEW_VALUE"
+    incremental_df = data_frame.copy()
+    incremental_hhids, _ = apply_incremental_replacements(
+        incremental_df, human_entry_df, *args, state_path=state_path
+    )
+    expected_df = data_frame.copy()
+    expected_hhids, _ = apply_batched_replacements(expected_df, human_entry_df, *args)
+
+    pd.testing.assert_frame_equal(incremental_df, expected_df)
+    assert set(incremental_hhids) == set(expected_hhids)
@@ -0,0 +1,90 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from research_workflow_tools.loaders import (
+    get_replacement_columns,
+    get_workbook_columns,
+    load_data_file,
+    read_data_chunks,
+    read_header,
+    write_table,
+)
+
+
+def test_get_workbook_columns():
+    header = ["hhid", "redcap_event_name", "other_entry", "field_A"]
+
+    assert get_workbook_columns(header, ["hhid", "redcap_event_name", "field_A"]) == [
+        "hhid",
+        "redcap_event_name",
+        "other_entry",
+    ]
+
+
+def test_get_replacement_columns():
+    header = ["hhid", "redcap_event_name", "other_entry", "field_A", "field_B"]
+    human_entry_df = pd.DataFrame(
+        {
+            "column_name": ["other_entry"],
+            "new_column_name": ["field_C"],
+            "delete_column_value": ["field_A"],
+        }
+    )
+
+    assert get_replacement_columns(
+        header, human_entry_df, ["new_column_name"], ["delete_column_value"]
+    ) == ["hhid", "redcap_event_name", "other_entry", "field_A"]
+
+
+def test_load_data_file_with_usecols():
+    data_in_path = Path("tests/test_data/other_entry_dataset_case_delete.csv")
+    header = read_header(data_in_path)
+
+    data_frame = load_data_file(
+        data_in_path,
+        usecols=["hhid", "redcap_event_name", "other_entry"],
+        dtype={"other_entry": str},
+    )
+
+    assert header[:3] == data_frame.columns.tolist()
+    assert data_frame["other_entry"].dtype == object
+    pd.testing.assert_series_equal(
+        data_frame["other_entry"], pd.read_csv(data_in_path)["other_entry"]
+    )
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".feather"])
+def test_load_arrow_data_file(tmp_path: Path, suffix: str):
+    pytest.importorskip("pyarrow")
+    data_frame = pd.read_csv("tests/test_data/other_entry_dataset_case_delete.csv")
+    data_in_path = tmp_path / f"data{suffix}"
+    if suffix == ".parquet":
+        data_frame.to_parquet(data_in_path)
+    else:
+        data_frame.to_feather(data_in_path)
+
+    usecols = ["hhid", "redcap_event_name", "other_entry"]
+    assert read_header(data_in_path) == data_frame.columns.tolist()
+    pd.testing.assert_frame_equal(
+        load_data_file(data_in_path, usecols=usecols), data_frame[usecols]
+    )
+    pd.testing.assert_frame_equal(
+        pd.concat(read_data_chunks(data_in_path, 3, usecols=usecols)),
+        data_frame[usecols],
+    )
+
+
+def test_write_table_parquet(tmp_path: Path):
+    pytest.importorskip("pyarrow")
+    data_frame = pd.DataFrame(
+        {"hhid": [1, 2, 3], "field_A": ["VALUE_1", 5, None]}, index=[4, 5, 6]
+    )
+
+    file_path = write_table(data_frame, tmp_path / "others_diff", "parquet", index=True)
+
+    assert file_path == tmp_path / "others_diff.parquet"
+    written_df = pd.read_parquet(file_path)
+    assert written_df.index.tolist() == [4, 5, 6]
+    assert written_df["field_A"].tolist() == ["VALUE_1", "5", None]
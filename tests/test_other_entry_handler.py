@@ -1,19 +1,33 @@
+import json
 from pathlib import Path
 
 import pandas as pd
+import pytest
+from panda_patches.patchfile import PatchFile
+
 from research_workflow_tools.other_entry_handler import (
+    build_human_entry_df,
     extract_not_null_df,
     process_other_entry_replacements,
+    rank_human_entry_rows,
 )
-from panda_patches.patchfile import PatchFile
+from research_workflow_tools.validation import SuggestionsValidationError
 
 
-def do_standard_comparision(data_in_path, human_suggestions_path, ref_patch_file_path):
+def do_standard_comparision(
+    data_in_path,
+    human_suggestions_path,
+    ref_patch_file_path,
+    chunksize=None,
+    string_storage="object",
+):
     # Data set is called case_delete.tsv
     patch_file_path = process_other_entry_replacements(
         data_in_path=data_in_path,
         human_suggestions_path=human_suggestions_path,
         output_path=Path("tests/output"),
+        chunksize=chunksize,
+        string_storage=string_storage,
     )
 
     # Load the patch file and check that the correct entries are in there
@@ -101,6 +115,115 @@ def test_process_other_entry_replacements_case_delete_plus_update_plus_create_pl
     )
 
 
+def test_process_other_entry_replacements_in_chunks():
+    # Same cases as above, reading the data set 4 rows at a time
+    for data_in_path, case in [
+        ("tests/test_data/other_entry_dataset_case_delete.csv", 1),
+        ("tests/test_data/other_entry_dataset_case_delete.csv", 2),
+        ("tests/test_data/other_entry_dataset_case_delete_with_delete.csv", 3),
+        ("tests/test_data/other_entry_dataset_case_delete_with_delete.csv", 4),
+        ("tests/test_data/other_entry_dataset_case_delete_with_delete.csv", 5),
+    ]:
+        do_standard_comparision(
+            data_in_path=Path(data_in_path),
+            human_suggestions_path=Path(
+                f"tests/test_data/human_entry_suggestions_delete_case{case}.tsv"
+            ),
+            ref_patch_file_path=Path(
+                f"tests/test_data/other_entry_dataset_case_delete_case{case}.json"
+            ),
+            chunksize=4,
+        )
+
+
+def test_process_other_entry_replacements_categorical():
+    # Same cases as above, the cleaned columns are kept as categories (whole file and chunks)
+    for data_in_path, case in [
+        ("tests/test_data/other_entry_dataset_case_delete.csv", 1),
+        ("tests/test_data/other_entry_dataset_case_delete.csv", 2),
+        ("tests/test_data/other_entry_dataset_case_delete_with_delete.csv", 3),
+        ("tests/test_data/other_entry_dataset_case_delete_with_delete.csv", 4),
+        ("tests/test_data/other_entry_dataset_case_delete_with_delete.csv", 5),
+    ]:
+        for chunksize in [None, 4]:
+            do_standard_comparision(
+                data_in_path=Path(data_in_path),
+                human_suggestions_path=Path(
+                    f"tests/test_data/human_entry_suggestions_delete_case{case}.tsv"
+                ),
+                ref_patch_file_path=Path(
+                    f"tests/test_data/other_entry_dataset_case_delete_case{case}.json"
+                ),
+                chunksize=chunksize,
+                string_storage="category",
+            )
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {},
+        {"chunksize": 2},
+        {"backend": "sqlite", "chunksize": 2},
+        {"string_storage": "category"},
+    ],
+)
+def test_process_other_entry_replacements_numeric_column(tmp_path, options):
+    # The cleaned columns keep the dtypes they are inferred with, so a number in the
+    # suggestions matches the numbers of the column
+    data_in_path = tmp_path / "data.csv"
+    pd.DataFrame(
+        {"hhid": [1, 2, 3], "redcap_event_name": ["v1"] * 3, "score": [1, 2, 1]}
+    ).to_csv(data_in_path, index=False)
+    human_suggestions_path = tmp_path / "suggestions.tsv"
+    pd.DataFrame(
+        {
+            "column_name": ["score"],
+            "unique_value": [1],
+            "replacement_value": [9],
+            "suggested_value": [None],
+            "delete_value": [False],
+            "new_column_name": [None],
+            "new_column_value": [None],
+            "delete_column_value": [None],
+        }
+    ).to_csv(human_suggestions_path, sep="\t", index=False)
+
+    patch_file_path = process_other_entry_replacements(
+        data_in_path=data_in_path,
+        human_suggestions_path=human_suggestions_path,
+        output_path=tmp_path,
+        **options,
+    )
+
+    with open(patch_file_path) as file_ptr:
+        patches = json.load(file_ptr)["patches"]
+    assert [(patch["target"]["hhid"], patch["deltas"]) for patch in patches] == [
+        (1, {"score": 9}),
+        (3, {"score": 9}),
+    ]
+
+
+def test_process_other_entry_replacements_invalid_values(tmp_path):
+    # The replacement value is not a code of other_entry in the lookup dictionary
+    json_dictionary_path = tmp_path / "lookup_fields.json"
+    with open(json_dictionary_path, "w") as file_ptr:
+        json.dump({"other_entry": {"1": "VALUE_1"}}, file_ptr)
+
+    with pytest.raises(SuggestionsValidationError) as error:
+        process_other_entry_replacements(
+            data_in_path=Path("tests/test_data/other_entry_dataset_case_delete.csv"),
+            human_suggestions_path=Path(
+                "tests/test_data/human_entry_suggestions_delete_case1.tsv"
+            ),
+            json_dictionary_path=json_dictionary_path,
+            output_path=tmp_path,
+        )
+
+    assert not error.value.report.ok
+    assert error.value.report.failures["value"].tolist() == ["CASE_DELETE_NEW_VALUE_1"]
+
+
 def test_extract_not_null_df():
     # TODO: Maybe get rid of this since the impact isn't that high
     # Case 1
@@ -127,3 +250,53 @@ def test_extract_not_null_df():
     # Case 4
 
     # Case 5
+
+
+def test_build_human_entry_df():
+    human_entry_df = build_human_entry_df(
+        {"other_entry": ["VALUE_1", float("nan"), "VALUE_2"], "field_A": ["VALUE_3"]}
+    )
+
+    assert human_entry_df.columns.tolist() == [
+        "column_name",
+        "unique_value",
+        "replacement_value",
+        "suggested_value",
+        "delete_value",
+        "new_column_name",
+        "new_column_value",
+        "delete_column_value",
+    ]
+    assert human_entry_df["column_name"].tolist() == [
+        "other_entry",
+        "other_entry",
+        "field_A",
+    ]
+    assert human_entry_df["unique_value"].tolist() == ["VALUE_1", "VALUE_2", "VALUE_3"]
+    assert human_entry_df["delete_value"].tolist() == [False, False, False]
+    assert human_entry_df["replacement_value"].isna().all()
+
+
+def test_rank_human_entry_rows():
+    human_entry_df = build_human_entry_df(
+        {"other_entry": ["VALUE_1", "VALUE_2", "VALUE_3"], "field_A": ["VALUE_4"]},
+        occurrence_counts={
+            "other_entry": {"VALUE_1": 1, "VALUE_2": 5, "VALUE_3": 2},
+            "field_A": {"VALUE_4": 5},
+        },
+        household_counts={
+            "other_entry": {"VALUE_1": 1, "VALUE_2": 2, "VALUE_3": 2},
+            "field_A": {"VALUE_4": 4},
+        },
+    )
+
+    ranked_df = rank_human_entry_rows(human_entry_df)
+    assert ranked_df["unique_value"].tolist() == [
+        "VALUE_4",
+        "VALUE_2",
+        "VALUE_3",
+        "VALUE_1",
+    ]
+
+    ranked_df = rank_human_entry_rows(human_entry_df, min_count=2, top_k=2)
+    assert ranked_df["unique_value"].tolist() == ["VALUE_4", "VALUE_2"]
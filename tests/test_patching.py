@@ -0,0 +1,103 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from research_workflow_tools.patching import apply_patch_file, write_patch_file
+
+
+def test_write_patch_file_layout(tmp_path, sample_patch_json):
+    # The layout of the panda_patches PatchFile, the deltas of the same target are merged
+    target = {"hhid": "hhid-0001", "redcap_event_name": "default_event"}
+    patch_file_path = write_patch_file(
+        [(target, {"col_A": "new_value_A"}), (dict(target), {"col_B": "new_value_B"})],
+        sample_patch_json["meta"]["notes"],
+        "patch",
+        outpath=tmp_path,
+    )
+
+    assert patch_file_path == tmp_path / "patch.json"
+    with open(patch_file_path, "r") as file_ptr:
+        patch_json = json.load(file_ptr)
+    assert patch_json == sample_patch_json
+    assert list(patch_json) == ["patches", "version", "meta"]
+    assert list(patch_json["patches"][0]) == ["target", "deltas"]
+
+
+@pytest.mark.parametrize("case", [1, 2])
+@pytest.mark.parametrize("chunksize", [3, 50_000])
+def test_apply_patch_file(tmp_path, case, chunksize):
+    data_out_path = apply_patch_file(
+        Path("tests/test_data/other_entry_dataset_case_delete.csv"),
+        Path(f"tests/test_data/other_entry_dataset_case_delete_case{case}.json"),
+        tmp_path / "patched.csv",
+        chunksize=chunksize,
+    )
+
+    pd.testing.assert_frame_equal(
+        pd.read_csv(data_out_path),
+        pd.read_csv(f"tests/test_data/other_entry_dataset_case_delete_case{case}.csv"),
+    )
+
+
+def test_apply_patch_file_new_column_and_missing_target(tmp_path):
+    patch_file_path = tmp_path / "patch.json"
+    patch_file_path.write_text(
+        json.dumps(
+            {
+                "patches": [
+                    {
+                        "target": {"hhid": 4, "redcap_event_name": "visit_1_arm_1"},
+                        "deltas": {"field_D": None, "field_E": 7},
+                    },
+                    {
+                        "target": {"hhid": 11, "redcap_event_name": "visit_1_arm_1"},
+                        "deltas": {"other_entry": "NOT_IN_THE_DATA_FILE"},
+                    },
+                ],
+                "version": 1,
+            }
+        )
+    )
+
+    data_out_path = apply_patch_file(
+        Path("tests/test_data/other_entry_dataset_case_delete_with_delete.csv"),
+        patch_file_path,
+        tmp_path / "patched.tsv",
+        chunksize=2,
+    )
+
+    data_out = pd.read_csv(data_out_path, sep="\t", dtype=str, keep_default_na=False)
+    assert data_out.columns[-1] == "field_E"
+    assert len(data_out) == 10
+    assert (
+        data_out["field_D"].tolist() == [""] * 4 + ["DELETE_THIS_VALUE"] * 2 + [""] * 4
+    )
+    assert data_out["field_E"].tolist() == [""] * 3 + ["7"] + [""] * 6
+    assert "NOT_IN_THE_DATA_FILE" not in data_out["other_entry"].tolist()
+
+
+def test_apply_patch_file_errors(tmp_path):
+    data_in_path = Path("tests/test_data/other_entry_dataset_case_delete.csv")
+    patch_file_path = Path("tests/test_data/other_entry_dataset_case_delete_case1.json")
+
+    with pytest.raises(ValueError, match="csv and tsv"):
+        apply_patch_file(data_in_path, patch_file_path, tmp_path / "patched.json")
+
+    with pytest.raises(ValueError, match="overwrite"):
+        apply_patch_file(data_in_path, patch_file_path, data_in_path)
+
+    missing_target_path = tmp_path / "patch.json"
+    missing_target_path.write_text(
+        json.dumps(
+            {
+                "patches": [
+                    {"target": {"record_id": 1}, "deltas": {"other_entry": "VALUE"}}
+                ],
+                "version": 1,
+            }
+        )
+    )
+    with pytest.raises(KeyError, match="record_id"):
+        apply_patch_file(data_in_path, missing_target_path, tmp_path / "patched.csv")
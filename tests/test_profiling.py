@@ -0,0 +1,73 @@
+import json
+import logging
+from pathlib import Path
+
+import pytest
+
+from research_workflow_tools import profiling
+from research_workflow_tools.other_entry_handler import process_other_entry_replacements
+from research_workflow_tools.profiling import (
+    PACKAGE_LOGGER_NAME,
+    PhaseProfiler,
+    configure_logging,
+)
+
+
+@pytest.mark.parametrize("chunksize", [None, 2])
+def test_profile_process_other_entry_replacements(tmp_path, chunksize):
+    profiler = PhaseProfiler()
+    patch_file_path = process_other_entry_replacements(
+        data_in_path=Path("tests/test_data/other_entry_dataset_case_delete.csv"),
+        human_suggestions_path=Path(
+            "tests/test_data/human_entry_suggestions_delete_case1.tsv"
+        ),
+        output_path=tmp_path,
+        chunksize=chunksize,
+        profiler=profiler,
+    )
+    with open(patch_file_path, "r") as file_ptr:
+        patch_count = len(json.load(file_ptr)["patches"])
+
+    report = json.loads(profiler.write(tmp_path / "profile.json").read_text())
+    phases = {phase["name"]: phase for phase in report["phases"]}
+
+    assert list(phases)[0] == "load_suggestions"
+    assert {"load", "strip", "replace", "filter", "patch"} <= set(phases)
+    assert phases["load_suggestions"]["rows"] == 3
+    # Every row of the data file is loaded once
+    assert phases["load"]["rows"] == 10
+    # CASE_DELETE_OLD_VALUE_1 is replaced in the 3 rows
+    assert phases["replace"]["rows"] == 3
+    assert phases["patch"]["rows"] == patch_count == 3
+    assert phases["patch"]["cells"] == 3
+    assert all(phase["peak_rss_mb"] > 0 for phase in report["phases"])
+
+
+def test_profile_without_peak_rss(monkeypatch):
+    # Neither /proc nor the resource module (Windows), the peak RSS is not reported
+    def open_without_proc(*args, **kwargs):
+        raise OSError("No /proc")
+
+    monkeypatch.setattr(profiling, "resource", None)
+    monkeypatch.setattr(profiling, "open", open_without_proc, raising=False)
+
+    profiler = PhaseProfiler()
+    with profiler.phase("load") as record:
+        record.rows += 1
+    report = profiler.report()
+
+    assert report["peak_rss_mb"] is None
+    assert report["phases"][0]["peak_rss_mb"] is None
+    assert report["phases"][0]["rows"] == 1
+
+
+@pytest.mark.parametrize(
+    "verbosity, level",
+    [(0, logging.WARNING), (1, logging.INFO), (2, logging.DEBUG), (3, logging.DEBUG)],
+)
+def test_configure_logging(verbosity, level):
+    configure_logging(verbosity)
+
+    package_logger = logging.getLogger(PACKAGE_LOGGER_NAME)
+    assert package_logger.level == level
+    assert len(package_logger.handlers) == 1
@@ -0,0 +1,149 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from research_workflow_tools.changes import CellChanges
+from research_workflow_tools.replacement_engine import (
+    apply_batched_replacements,
+    apply_sequential_replacements,
+    find_conflicting_columns,
+    strip_string_columns,
+)
+
+
+@pytest.mark.parametrize(
+    "data_in_path, human_suggestions_path",
+    [
+        (
+            "tests/test_data/other_entry_dataset_case_delete.csv",
+            "tests/test_data/human_entry_suggestions_delete_case1.tsv",
+        ),
+        (
+            "tests/test_data/other_entry_dataset_case_delete.csv",
+            "tests/test_data/human_entry_suggestions_delete_case2.tsv",
+        ),
+        (
+            "tests/test_data/other_entry_dataset_case_delete_with_delete.csv",
+            "tests/test_data/human_entry_suggestions_delete_case3.tsv",
+        ),
+        (
+            "tests/test_data/other_entry_dataset_case_delete_with_delete.csv",
+            "tests/test_data/human_entry_suggestions_delete_case4.tsv",
+        ),
+        (
+            "tests/test_data/other_entry_dataset_case_delete_with_delete.csv",
+            "tests/test_data/human_entry_suggestions_delete_case5.tsv",
+        ),
+    ],
+)
+def test_batched_replacements_match_sequential(data_in_path, human_suggestions_path):
+    data_frame = pd.read_csv(Path(data_in_path))
+    human_entry_df = pd.read_csv(Path(human_suggestions_path), sep="\t")
+
+    batched_df = data_frame.copy()
+    batched_hhids, batched_delete_columns = apply_batched_replacements(
+        batched_df,
+        human_entry_df,
+        ["new_column_name"],
+        ["new_column_value"],
+        ["delete_column_value"],
+    )
+
+    sequential_df = data_frame.copy()
+    sequential_hhids, sequential_delete_columns = apply_sequential_replacements(
+        sequential_df,
+        human_entry_df,
+        ["new_column_name"],
+        ["new_column_value"],
+        ["delete_column_value"],
+    )
+
+    pd.testing.assert_frame_equal(batched_df, sequential_df)
+    assert set(batched_hhids) == set(sequential_hhids)
+    assert set(batched_delete_columns) == set(sequential_delete_columns)
+
+
+def test_batched_replacements_chained_values():
+    # A value that was replaced can be picked up by a later suggestion
+    data_frame = pd.DataFrame(
+        {
+            "hhid": [1, 2, 3],
+            "redcap_event_name": ["visit_1_arm_1"] * 3,
+            "other_entry": ["A", "B", "C"],
+        }
+    )
+    human_entry_df = pd.DataFrame(
+        {
+            "column_name": ["other_entry", "other_entry"],
+            "unique_value": ["A", "B"],
+            "replacement_value": ["B", "D"],
+            "delete_value": [False, False],
+        }
+    )
+
+    edit_hhids, _ = apply_batched_replacements(data_frame, human_entry_df, [], [], [])
+
+    assert data_frame["other_entry"].tolist() == ["D", "D", "C"]
+    assert set(edit_hhids) == {1, 2}
+
+
+def test_categorical_replacements_match_object():
+    data_frame = pd.DataFrame(
+        {
+            "hhid": [1, 2, 3, 4, 5],
+            "redcap_event_name": ["visit_1_arm_1"] * 5,
+            "other_entry": [" A", "A", "B ", None, "true"],
+        }
+    )
+    human_entry_df = pd.DataFrame(
+        {
+            "column_name": ["other_entry", "other_entry", "other_entry"],
+            "unique_value": ["A", "B", "true"],
+            "replacement_value": ["1", None, "True"],
+            "delete_value": [False, True, False],
+        }
+    )
+
+    results = []
+    for dtype in [object, "category"]:
+        frame = data_frame.astype({"other_entry": dtype})
+        changes = CellChanges(len(frame))
+        strip_string_columns(frame, ["other_entry"], changes)
+        edit_hhids, _ = apply_batched_replacements(
+            frame, human_entry_df, [], [], [], changes=changes
+        )
+        results.append((frame, set(edit_hhids), changes.changed_cells(frame)))
+
+    (object_df, object_hhids, object_cells), (
+        category_df,
+        category_hhids,
+        category_cells,
+    ) = results
+    # 1 and True can't both be categories, the column falls back to object
+    pd.testing.assert_series_equal(category_df["other_entry"], object_df["other_entry"])
+    assert [type(value) for value in category_df["other_entry"].dropna()] == [
+        int,
+        int,
+        bool,
+    ]
+    assert category_hhids == object_hhids
+    assert category_cells.keys() == object_cells.keys()
+    assert (
+        category_cells["other_entry"][0].tolist()
+        == object_cells["other_entry"][0].tolist()
+    )
+
+
+def test_find_conflicting_columns():
+    human_entry_df = pd.DataFrame(
+        {
+            "column_name": ["other_entry", "field_A"],
+            "new_column_name": ["field_A", None],
+            "delete_column_value": [None, "field_D"],
+        }
+    )
+
+    assert find_conflicting_columns(
+        human_entry_df, ["new_column_name"], ["delete_column_value"]
+    ) == {"field_A"}
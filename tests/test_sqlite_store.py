@@ -0,0 +1,93 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from panda_patches.patchfile import PatchFile
+
+from research_workflow_tools.other_entry_handler import (
+    apply_suggestions_sheet,
+    process_other_entry_replacements,
+)
+
+
+@pytest.mark.parametrize(
+    "data_in_path, case",
+    [
+        ("tests/test_data/other_entry_dataset_case_delete.csv", 1),
+        ("tests/test_data/other_entry_dataset_case_delete.csv", 2),
+        ("tests/test_data/other_entry_dataset_case_delete_with_delete.csv", 3),
+        ("tests/test_data/other_entry_dataset_case_delete_with_delete.csv", 4),
+        ("tests/test_data/other_entry_dataset_case_delete_with_delete.csv", 5),
+    ],
+)
+def test_process_other_entry_replacements_sqlite(tmp_path, data_in_path, case):
+    # Inserting 3 rows at a time
+    patch_file_path = process_other_entry_replacements(
+        data_in_path=Path(data_in_path),
+        human_suggestions_path=Path(
+            f"tests/test_data/human_entry_suggestions_delete_case{case}.tsv"
+        ),
+        output_path=tmp_path,
+        chunksize=3,
+        backend="sqlite",
+    )
+
+    assert PatchFile.parse_patch_file_from_path(
+        patch_file_path
+    ) == PatchFile.parse_patch_file_from_path(
+        Path(f"tests/test_data/other_entry_dataset_case_delete_case{case}.json")
+    )
+
+
+def test_sqlite_matches_pandas(tmp_path):
+    # Chained replacements, booleans, numbers in a column of numbers with missing values and a
+    # followup update of a column that is also cleaned
+    data_in_path = tmp_path / "data.csv"
+    pd.DataFrame(
+        {
+            "hhid": [1, 1, 2, 3, 4, 5],
+            "redcap_event_name": ["a", "b", "a", "a", "a", "a"],
+            "other": [" A", "A", "B", "yes ", None, "C"],
+            "other_2": ["X", "Y", "X", None, "X", "Y"],
+            "code": [1, 2, None, 4, 5, 6],
+        }
+    ).to_csv(data_in_path, index=False)
+    human_entry_df = pd.DataFrame(
+        {
+            "column_name": ["other", "other", "other", "other_2", "other"],
+            "unique_value": ["A", "B", "yes", "X", "C"],
+            "replacement_value": ["B", "3", "True", None, None],
+            "delete_value": [False, False, False, False, True],
+            "new_column_name": ["code", None, "other_2", "new_code", None],
+            "new_column_value": ["7", None, "Z", "8", None],
+            "delete_column_value": [None, None, None, None, "code"],
+        }
+    )
+
+    patches = []
+    for backend in ["pandas", "sqlite"]:
+        output_path = tmp_path / backend
+        output_path.mkdir()
+        patch_file_path = apply_suggestions_sheet(
+            data_in_path,
+            human_entry_df,
+            ["new_column_name"],
+            ["new_column_value"],
+            ["delete_column_value"],
+            output_path=output_path,
+            chunksize=2 if backend == "sqlite" else None,
+            diff_path=output_path / "others_diff",
+            backend=backend,
+        )
+        with open(patch_file_path, "r") as file_ptr:
+            patches.append(json.load(file_ptr)["patches"])
+
+    pandas_patches, sqlite_patches = patches
+    assert sqlite_patches == pandas_patches
+    deltas = {
+        (patch["target"]["hhid"], patch["target"]["redcap_event_name"]): patch["deltas"]
+        for patch in sqlite_patches
+    }
+    assert deltas[(3, "a")]["other"] is True
+    assert deltas[(1, "a")]["code"] == 7.0
@@ -0,0 +1,34 @@
+from pathlib import Path
+
+import pandas as pd
+
+from research_workflow_tools.streaming import (
+    collect_human_entry_values_in_chunks,
+    is_text_column,
+)
+
+
+def test_is_text_column():
+    assert is_text_column(["CASE_DELETE_OLD_VALUE_1", "5"])
+    assert not is_text_column(["5", "7.5"])
+    assert not is_text_column(["True", "false"])
+    assert not is_text_column([])
+
+
+def test_collect_human_entry_values_in_chunks(tmp_path: Path):
+    data_in_path = tmp_path / "data.csv"
+    pd.DataFrame(
+        {
+            "hhid": [1, 2, 3, 4, 5],
+            "redcap_event_name": ["visit_1_arm_1"] * 5,
+            "other_entry": ["5", " VALUE_1", "VALUE_1 ", None, "VALUE_2"],
+            "field_A": ["1", "2", None, "3", "4"],
+        }
+    ).to_csv(data_in_path, index=False)
+
+    human_entry_column_values = collect_human_entry_values_in_chunks(
+        data_in_path, ["hhid", "redcap_event_name"], chunksize=2
+    )
+
+    # The first chunk only has numbers, they are kept as they were written
+    assert human_entry_column_values == {"other_entry": ["5", "VALUE_1", "VALUE_2"]}
@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+
+from research_workflow_tools.replacement_engine import apply_batched_replacements
+from research_workflow_tools.suggestion_groups import (
+    apply_parallel_replacements,
+    find_suggestion_groups,
+)
+
+
+def test_find_suggestion_groups():
+    human_entry_df = pd.DataFrame(
+        {
+            "column_name": ["other_entry", "field_B", "other_entry", "field_C"],
+            "new_column_name": ["field_A", None, None, None],
+            "delete_column_value": [None, "field_A", None, None],
+        }
+    )
+
+    assert find_suggestion_groups(
+        human_entry_df, ["new_column_name"], ["delete_column_value"]
+    ) == [[0, 1, 2], [3]]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_apply_parallel_replacements(workers):
+    data_frame = pd.read_csv(
+        "tests/test_data/other_entry_dataset_case_delete_with_delete.csv"
+    )
+    human_entry_df = pd.DataFrame(
+        {
+            "column_name": ["other_entry", "field_B", "other_entry"],
+            "unique_value": [
+                "CASE_DELETE_OLD_VALUE_1",
+                "CASE_DELETE_OLD_VALUE_2",
+                "CASE_DELETE_OLD_VALUE_3",
+            ],
+            "replacement_value": ["CASE_DELETE_NEW_VALUE_1", None, None],
+            "delete_value": [False, True, False],
+            "new_column_name": [None, None, "field_A"],
+            "new_column_value": [None, None, "NEWLY_CREATED_VALUE_1"],
+            "delete_column_value": [None, None, "field_D"],
+        }
+    )
+    args = (["new_column_name"], ["new_column_value"], ["delete_column_value"])
+
+    parallel_df = data_frame.copy()
+    parallel_hhids, parallel_delete_columns = apply_parallel_replacements(
+        parallel_df, human_entry_df, *args, workers=workers
+    )
+    expected_df = data_frame.copy()
+    expected_hhids, expected_delete_columns = apply_batched_replacements(
+        expected_df, human_entry_df, *args
+    )
+
+    pd.testing.assert_frame_equal(parallel_df, expected_df)
+    assert set(parallel_hhids) == set(expected_hhids)
+    assert set(parallel_delete_columns) == set(expected_delete_columns)
@@ -0,0 +1,41 @@
+from research_workflow_tools.suggestions import (
+    TrigramIndex,
+    normalize_text,
+    suggest_column_values,
+)
+
+
+def test_normalize_text():
+    assert normalize_text("  Café-owner!! ") == "cafe owner"
+
+
+def test_trigram_index_query():
+    index = TrigramIndex()
+    for text in ["farmer", "trader", "plot 12", "plot 13"]:
+        index.add(text)
+
+    assert [text_id for text_id, _ in index.query("famer")] == [0]
+    # Texts with different numbers don't match
+    assert [text_id for text_id, _ in index.query("plot 13")] == [3]
+
+
+def test_suggest_column_values():
+    unique_values = ["Farmer", "farmer ", "Famer", "Trader", "Techer", "Teacher"]
+    value_counts = {"Farmer": 10, "Teacher": 3}
+
+    assert suggest_column_values(unique_values, value_counts) == [
+        None,
+        "Farmer",
+        "Farmer",
+        None,
+        "Teacher",
+        None,
+    ]
+
+
+def test_suggest_column_values_from_dictionary():
+    unique_values = ["farmer", "Trader ", "Techer"]
+
+    assert suggest_column_values(
+        unique_values, value_dictionary={"Farmer": 1, "Trader": 2}
+    ) == [1, 2, None]
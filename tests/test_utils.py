@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from research_workflow_tools.utils import cast_series, cast_value
+
+
+def test_cast_series():
+    values = [
+        "1",
+        " 12 ",
+        "-3",
+        "1.5",
+        "1e3",
+        "1" * 19,
+        "1_000",
+        "nan",
+        "True",
+        "true ",
+        "farmer",
+        "١٢",
+        "",
+        7,
+        2.5,
+    ]
+
+    casted_values = cast_series(pd.Series(values + [None], dtype=object)).tolist()
+
+    expected_values = [cast_value(value) for value in values]
+    assert [type(value) for value in casted_values[:-1]] == [
+        type(value) for value in expected_values
+    ]
+    assert casted_values[:7] + casted_values[8:-1] == (
+        expected_values[:7] + expected_values[8:]
+    )
+    assert np.isnan(casted_values[7])
+    assert casted_values[-1] is None
@@ -0,0 +1,37 @@
+import pandas as pd
+
+from research_workflow_tools.validation import LookupValidator
+
+
+def test_lookup_validator():
+    validator = LookupValidator(
+        {"occupation": {"Farmer": 1, "Trader": 2}, "has_land": {"Yes": "1", "No": "0"}}
+    )
+    human_entry_df = pd.DataFrame(
+        {
+            "column_name": ["occupation", "occupation", "occupation", "other_entry"],
+            "unique_value": ["farmer", "trader", "teacher", "x"],
+            "replacement_value": ["1", "Trader", None, "anything"],
+            "new_column_name": [None, None, "has_land", None],
+            "new_column_value": [None, None, "1", None],
+            "delete_column_value": [None, "occupation_other", None, "missing"],
+        }
+    )
+
+    report = validator.validate(
+        human_entry_df,
+        ["occupation", "occupation_other", "has_land"],
+        ["new_column_name"],
+        ["new_column_value"],
+        ["delete_column_value"],
+    )
+
+    assert not report.ok
+    assert report.failures["row"].tolist() == [1, 3]
+    assert report.failures["sheet_column"].tolist() == [
+        "replacement_value",
+        "delete_column_value",
+    ]
+    # The label points at the code
+    assert "label of 2" in report.failures["reason"].iloc[0]
+    assert report.unchecked_columns == ["other_entry"]
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from research_workflow_tools.value_index import ValueIndex
+
+
+def sample_data_frame():
+    return pd.DataFrame(
+        {
+            "hhid": [1, 2, 3, 4, 4],
+            "redcap_event_name": ["visit_1_arm_1"] * 5,
+            "other_entry": ["A", " A", "B ", None, "A"],
+        }
+    )
+
+
+def test_value_index_positions():
+    value_index = ValueIndex(sample_data_frame())
+
+    positions = value_index.positions("other_entry", "A")
+    assert positions.dtype == np.int32
+    assert positions.tolist() == [0, 1, 4]
+    assert value_index.positions("other_entry", "B").tolist() == [2]
+    assert value_index.positions("other_entry", "C").tolist() == []
+    assert value_index.positions("other_entry", np.nan).tolist() == []
+
+
+def test_value_index_hhids():
+    value_index = ValueIndex(sample_data_frame())
+
+    assert value_index.hhids("other_entry", "A") == {1, 2, 4}
+    assert value_index.hhids("other_entry", "C") == set()
+
+
+def test_value_index_value_counts():
+    value_index = ValueIndex(sample_data_frame())
+
+    assert value_index.unique_values("other_entry") == ["A", "B"]
+    assert value_index.value_counts("other_entry").to_dict() == {"A": 3, "B": 1}
@@ -0,0 +1,40 @@
+from pathlib import Path
+
+import openpyxl
+import pandas as pd
+
+from research_workflow_tools.loaders import load_human_entry_file
+from research_workflow_tools.other_entry_handler import build_human_entry_df
+from research_workflow_tools.workbook import (
+    LOOKUP_SHEET_NAME,
+    write_suggestions_workbook,
+)
+
+
+def test_write_suggestions_workbook(tmp_path: Path):
+    human_entry_df = build_human_entry_df(
+        {
+            "other_entry": ["VALUE_1", "=VALUE_2", "VALUE_3"],
+            "field_A": ["VALUE_4"],
+        },
+        suggested_values={"other_entry": ["1", None, None], "field_A": [None]},
+    )
+    workbook_path = write_suggestions_workbook(
+        human_entry_df,
+        tmp_path / "human_entry_suggestions.xlsx",
+        lookup_dictionary={"other_entry": {"One": 1, "Two": 2}},
+    )
+
+    # The suggestions are the first sheet, the formula-like value is kept as text
+    loaded_df = load_human_entry_file(workbook_path)
+    assert loaded_df["unique_value"].tolist() == human_entry_df["unique_value"].tolist()
+    assert loaded_df["delete_value"].tolist() == [False] * 4
+    assert loaded_df["replacement_value"].isna().all()
+
+    workbook = openpyxl.load_workbook(workbook_path)
+    assert workbook[LOOKUP_SHEET_NAME].sheet_state == "hidden"
+    data_validations = workbook.worksheets[0].data_validations.dataValidation
+    assert len(data_validations) == 1
+    assert data_validations[0].formula1 == f"{LOOKUP_SHEET_NAME}!$A$2:$A$3"
+    # Only the replacement_value cells of the other_entry rows get the dropdown
+    assert str(data_validations[0].sqref) == "C2:C4"